@@ -0,0 +1,171 @@
+"""
+待匹配任务（outbox）的执行
+职责：领取 match_jobs 中的任务，用规则智能体匹配，保存匹配记录并通知，与任务完成状态一起提交
+
+进程内的匹配流水线（match_pipeline.py）按物品领取刚发布的任务；
+JobWorker 供 scripts/run_match_worker.py 使用，按批领取所有可执行的任务（包括服务重启前未完成的）。
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Dict, List, Optional
+
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from ..database import models_db, outbox
+from ..database.db_manager import DatabaseManager
+from ..models import CompactLostItem, CompactFoundItem, MatchRecord
+from .notification_agent import NotificationAgent
+from .rule_agent import RuleAgent
+
+logger = logging.getLogger(__name__)
+
+
+def run_match_job(db_manager: DatabaseManager, agent: RuleAgent, notify, session: Session, job: Row,
+                  shared_index: bool = True, max_attempts: int = outbox.MAX_ATTEMPTS) -> Optional[List[MatchRecord]]:
+    """
+    执行一个已领取的任务：匹配、保存匹配记录并发送通知，与任务完成状态在一个事务中提交
+
+    Args:
+        db_manager: 数据库管理器实例
+        agent: 规则智能体
+        notify: 保存匹配时的通知回调（不提交）
+        session: 数据库会话
+        job: claim_jobs 返回的任务行
+        shared_index: 是否使用进程内的匹配索引（调用方须先 refresh_match_index；
+            独立进程中为 False，按类别从数据库查候选）
+        max_attempts: 每个任务最多领取次数
+
+    Returns:
+        保存的匹配；租约已被别的进程接手时返回 None（结果已丢弃）
+
+    Raises:
+        匹配或保存失败时回滚，把任务放回队列（或标记为 failed）后抛出原异常
+    """
+    try:
+        if job.kind == 'lost':
+            row = session.get(models_db.LostItemDB, job.item_id)
+            matches = []
+            if row is not None and not row.is_resolved:
+                index = (db_manager.get_found_index(session) if shared_index
+                         else db_manager.get_category_index(session, 'found', row.category))
+                matches = agent.match_cycle(CompactLostItem.from_row(row), index=index)
+        else:
+            row = session.get(models_db.FoundItemDB, job.item_id)
+            matches = []
+            if row is not None and not row.is_resolved:
+                index = (db_manager.get_lost_index(session) if shared_index
+                         else db_manager.get_category_index(session, 'lost', row.category))
+                matches = agent.reverse_match_cycle(CompactFoundItem.from_row(row), index)
+        if not outbox.complete_job(session, job):
+            session.rollback()
+            return None
+        # 另一侧任务已保存的同一对由唯一索引跳过，只返回这次新保存的匹配；与任务完成状态一起提交
+        saved = {(r.lost_item_id, r.found_item_id)
+                 for r in db_manager.create_match_records(session, matches, notify=notify, commit=False)}
+        session.commit()
+        return [m for m in matches if (m.lost_item_id, m.found_item_id) in saved]
+    except Exception as e:
+        session.rollback()
+        outbox.release_job(session, job, str(e), max_attempts=max_attempts)
+        raise
+
+
+class JobWorker:
+    """按批领取并执行待匹配任务（可在多个进程中同时运行）"""
+
+    def __init__(self, db_manager: DatabaseManager, agent: RuleAgent, notification_agent: NotificationAgent,
+                 batch_size: int = outbox.BATCH_SIZE, lease_seconds: float = outbox.LEASE_SECONDS,
+                 max_attempts: int = outbox.MAX_ATTEMPTS, min_age: float = 0):
+        """
+        Args:
+            db_manager: 数据库管理器实例
+            agent: 规则智能体
+            notification_agent: 通知智能体
+            batch_size: 每次领取的任务数
+            lease_seconds: 租约时长（秒），须覆盖处理一批任务的时间
+            max_attempts: 每个任务最多领取次数
+            min_age: 只领取创建超过该秒数的任务（在服务进程内定时执行时，新任务留给匹配流水线）
+        """
+        self.db_manager = db_manager
+        self.agent = agent
+        self.notify = partial(notification_agent.notify_on_matches, commit=False)
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.min_age = min_age
+
+    def run_once(self) -> Dict[str, int]:
+        """
+        领取并执行一批任务
+
+        Returns:
+            {'claimed': 领取数, 'done': 完成数, 'failed': 失败数, 'lost_lease': 租约被接手而丢弃的数量}
+        """
+        stats = {'claimed': 0, 'done': 0, 'failed': 0, 'lost_lease': 0}
+        session = self.db_manager.get_session()
+        try:
+            created_before = datetime.utcnow() - timedelta(seconds=self.min_age) if self.min_age else None
+            jobs = outbox.claim_jobs(session, limit=self.batch_size, lease_seconds=self.lease_seconds,
+                                     max_attempts=self.max_attempts, created_before=created_before)
+            stats['claimed'] = len(jobs)
+            for job in jobs:
+                try:
+                    matches = run_match_job(self.db_manager, self.agent, self.notify, session, job,
+                                            shared_index=False, max_attempts=self.max_attempts)
+                except Exception as e:
+                    logger.warning("匹配任务 %s（%s %s）失败: %s", job.id, job.kind, job.item_id, e)
+                    stats['failed'] += 1
+                    continue
+                stats['lost_lease' if matches is None else 'done'] += 1
+            return stats
+        finally:
+            session.close()
+
+    def drain(self, progress=None) -> Dict[str, int]:
+        """
+        反复领取并执行，直到没有可执行的任务（失败的任务要等重试时间，不会在本次重复执行）
+
+        Args:
+            progress: 每批完成后的回调，参数为该批的统计
+
+        Returns:
+            累计统计
+        """
+        totals = {'claimed': 0, 'done': 0, 'failed': 0, 'lost_lease': 0}
+        while True:
+            stats = self.run_once()
+            if not stats['claimed']:
+                return totals
+            for key, value in stats.items():
+                totals[key] += value
+            if progress:
+                progress(stats)
+
+    def run(self, poll_interval: float = 1.0, stop: Optional[threading.Event] = None,
+            progress=None) -> Dict[str, int]:
+        """
+        持续领取任务直到 stop 被设置；没有任务时每 poll_interval 秒检查一次
+
+        Args:
+            poll_interval: 空闲时的轮询间隔（秒）
+            stop: 停止信号（None 表示一直运行）
+            progress: 每批完成后的回调，参数为该批的统计
+
+        Returns:
+            累计统计
+        """
+        stop = stop or threading.Event()
+        totals = {'claimed': 0, 'done': 0, 'failed': 0, 'lost_lease': 0}
+        while not stop.is_set():
+            stats = self.run_once()
+            for key, value in stats.items():
+                totals[key] += value
+            if stats['claimed']:
+                if progress:
+                    progress(stats)
+            else:
+                stop.wait(poll_interval)
+        return totals
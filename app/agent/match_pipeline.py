@@ -0,0 +1,207 @@
+"""
+发布后的异步匹配流水线
+职责：发布请求提交物品后立即返回，由后台线程完成匹配评分、保存匹配记录和发送通知
+
+- 队列有上限：队列满时 submit 返回 False，由调用方在请求线程内直接匹配（背压）
+- 失败重试：匹配记录、通知与任务完成状态一次提交，失败时没有写入任何数据，可以安全重试
+- 任务本身记录在 match_jobs（outbox.py）中，与物品一起提交：进程重启时排队中的任务
+  由 JobWorker（服务进程内的定时补做或 scripts/run_match_worker.py）补做；
+  流水线匹配前先领取任务的租约，JobWorker 已领取的任务这里不会重复执行，反之亦然
+- 匹配使用进程内的匹配索引；领取任务后比对 table_versions，其他进程写入过物品表时先同步索引
+- 任务状态保存在内存中（最近 status_capacity 个），供匹配结果页轮询
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+
+from ..database import outbox
+from ..database.db_manager import DatabaseManager
+from ..models import MatchRecord
+from .job_worker import run_match_job
+from .notification_agent import NotificationAgent
+from .rule_agent import RuleAgent
+
+logger = logging.getLogger(__name__)
+
+# 任务：(类型 'lost' / 'found', 物品ID)
+Job = Tuple[str, int]
+
+# 发布后匹配的工作线程数（0 表示在请求线程内同步匹配）
+MATCH_WORKERS = int(os.environ.get('MATCH_WORKERS', '2'))
+
+# 同一个数据库只运行一条流水线：main.py 与 routes.py 共用，状态查询才能看到所有任务
+_pipelines: Dict[Engine, "MatchPipeline"] = {}
+_pipelines_lock = threading.Lock()
+
+
+class MatchPipeline:
+    """发布后匹配的后台工作线程池"""
+
+    def __init__(self, db_manager: DatabaseManager, agent: RuleAgent,
+                 notification_agent: NotificationAgent, workers: int = 2, max_queue: int = 100,
+                 max_retries: int = 3, retry_delay: float = 0.5, status_capacity: int = 1000):
+        """
+        Args:
+            db_manager: 数据库管理器实例
+            agent: 规则智能体（match_cycle / reverse_match_cycle）
+            notification_agent: 通知智能体
+            workers: 工作线程数（0 表示不启动线程，submit 总是返回 False，由调用方同步匹配）
+            max_queue: 队列中最多等待的任务数
+            max_retries: 每个任务最多尝试次数
+            retry_delay: 首次重试前等待的秒数，之后每次翻倍
+            status_capacity: 保留最近多少个任务的状态
+        """
+        self.db_manager = db_manager
+        self.agent = agent
+        self.notify = partial(notification_agent.notify_on_matches, commit=False)
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.status_capacity = status_capacity
+        self._queue: "queue.Queue[Optional[Job]]" = queue.Queue(maxsize=max_queue)
+        self._status: "OrderedDict[Job, Dict]" = OrderedDict()
+        self._status_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._work, name=f"match-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, side: str, item_id: int) -> bool:
+        """
+        提交一个匹配任务（物品必须已提交到数据库）
+
+        Returns:
+            是否已进入队列；队列已满或未启动工作线程时返回 False，调用方应改用 run_now
+        """
+        if not self._threads:
+            return False
+        job = (side, item_id)
+        self._set_status(job, state='queued', attempts=0, matches=None, error=None)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._drop_status(job)
+            return False
+        return True
+
+    def run_now(self, side: str, item_id: int) -> List[MatchRecord]:
+        """在当前线程内执行匹配（队列已满时的退路），返回保存的匹配（已由别的进程执行时为空）"""
+        job = (side, item_id)
+        self._set_status(job, state='running', attempts=1, matches=None, error=None)
+        try:
+            matches = self._process(job)
+        except Exception as e:
+            self._set_status(job, state='failed', error=str(e))
+            raise
+        self._set_status(job, state='done', matches=len(matches) if matches is not None else None)
+        return matches or []
+
+    def status(self, side: str, item_id: int) -> Optional[Dict]:
+        """
+        查询任务状态
+
+        Returns:
+            {'state': queued/running/done/failed, 'attempts', 'matches', 'error'}；
+            不在最近的任务中时返回 None
+        """
+        with self._status_lock:
+            status = self._status.get((side, item_id))
+            return dict(status) if status is not None else None
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def join(self):
+        """等待队列中的任务全部处理完"""
+        self._queue.join()
+
+    def stop(self):
+        """处理完已排队的任务后停止工作线程"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._run_with_retry(job)
+            finally:
+                self._queue.task_done()
+
+    def _run_with_retry(self, job: Job):
+        delay = self.retry_delay
+        for attempt in range(1, self.max_retries + 1):
+            self._set_status(job, state='running', attempts=attempt)
+            try:
+                matches = self._process(job)
+            except Exception as e:
+                logger.warning("匹配任务 %s 第 %d 次失败: %s", job, attempt, e)
+                self._set_status(job, error=str(e))
+                if attempt < self.max_retries:
+                    time.sleep(delay)
+                    delay *= 2
+                continue
+            self._set_status(job, state='done', matches=len(matches) if matches is not None else None,
+                             error=None)
+            return
+        self._set_status(job, state='failed')
+
+    def _process(self, job: Job) -> Optional[List[MatchRecord]]:
+        """
+        领取该物品的待匹配任务并执行（一个事务）
+
+        匹配之前先领取 match_jobs 中的任务（租约）：服务进程内定时补做的 JobWorker 与独立的匹配进程
+        领取同一任务时只有一方成功，没领到的一方不匹配、不保存；租约过期后被别人接手的，
+        complete_job 失败，这次的结果整体回滚。
+
+        Returns:
+            保存的匹配；任务已由别的进程领取或完成时返回 None
+        """
+        side, item_id = job
+        session = self.db_manager.get_session()
+        try:
+            claimed = outbox.claim_jobs(session, limit=1, kind=side, item_id=item_id)
+            if not claimed:
+                return None
+            # 用进程内的匹配索引匹配：其他进程（多个服务进程、匹配进程）写入过物品表时先同步
+            self.db_manager.refresh_match_index(session)
+            return run_match_job(self.db_manager, self.agent, self.notify, session, claimed[0])
+        finally:
+            session.close()
+
+    def _set_status(self, job: Job, **fields):
+        with self._status_lock:
+            status = self._status.setdefault(job, {})
+            status.update(fields)
+            self._status.move_to_end(job)
+            while len(self._status) > self.status_capacity:
+                self._status.popitem(last=False)
+
+    def _drop_status(self, job: Job):
+        with self._status_lock:
+            self._status.pop(job, None)
+
+
+def get_match_pipeline(db_manager: DatabaseManager, agent: RuleAgent,
+                       notification_agent: NotificationAgent, **options) -> MatchPipeline:
+    """获取（不存在时创建）该数据库共用的匹配流水线，options 见 MatchPipeline"""
+    with _pipelines_lock:
+        pipeline = _pipelines.get(db_manager.engine)
+        if pipeline is None:
+            options.setdefault('workers', MATCH_WORKERS)
+            pipeline = MatchPipeline(db_manager, agent, notification_agent, **options)
+            _pipelines[db_manager.engine] = pipeline
+        return pipeline
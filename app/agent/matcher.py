@@ -1,52 +1,111 @@
 from datetime import timedelta
-from typing import List
-from ..models import LostItem, FoundItem
+from functools import lru_cache
+from typing import List, Optional, Sequence
+import numpy as np
+from ..campus import levels_contain, location_levels
+from ..models import LostItem, FoundItem, ItemBlock, MISSING_CODE, to_epoch_us, tokenize
+
+_HOUR_US = 3600 * 1_000_000
+
+
+def _levels_score(lost: Sequence, found: Sequence) -> float:
+    """
+    按地点层级 (校区, 楼宇, 楼层, 区域, 相邻分组) 评分，各级为文本或持久化的编码（空值为 "" 或 None）：
+    同一地点 25，同楼宇且一方是另一方的上级 20，同楼宇 15，相邻楼宇（相邻分组相同）10，其余 5
+    """
+    if lost == found:
+        return 25.0
+    lost_campus, lost_building, found_campus, found_building = lost[0], lost[1], found[0], found[1]
+    if lost_building == found_building:
+        if levels_contain(lost, found) or levels_contain(found, lost):
+            return 20.0
+        if lost_building and (not lost_campus or not found_campus or lost_campus == found_campus):
+            return 15.0
+        return 5.0
+    if lost_building and found_building and lost[4] == found[4]:
+        return 10.0
+    return 5.0
+
+
+@lru_cache(maxsize=65536)
+def _location_score(lost_location: str, found_location: str) -> float:
+    """按地点文本评分（没有持久化层级编码的物品；结果按地点文本对缓存）"""
+    if lost_location == found_location:
+        return 25.0
+    return _levels_score(location_levels(lost_location), location_levels(found_location))
 
 
 class Matcher:
     """Simple implementation of matching rules described in the UML/docs."""
 
+    # 各项规则的最高得分，用于剪枝时估计分数上界
+    MAX_CATEGORY = 40.0
+    MAX_LOCATION = 25.0
+    MAX_TIME = 20.0
+    MAX_FEATURES = 15.0
+    # 不在同一楼宇时地点分的上限（相邻楼宇）
+    MAX_OTHER_BUILDING = 10.0
+    # 时间规则分档：(相差小时数上限, 分数)，超出所有分档得 TIME_FLOOR
+    TIME_TIERS = ((24, 20.0), (72, 15.0), (168, 10.0))
+    TIME_FLOOR = 5.0
+
     def match_by_category(self, lost: LostItem, found: FoundItem) -> float:
         # 如果类别是"其他"，不加分
         if lost.category == "其他" or found.category == "其他":
             return 0.0
         # 类别相同才给分
-        return 40.0 if lost.category == found.category else 0.0
+        return 40.0 if self._same(lost.category_code, found.category_code, lost.category, found.category) else 0.0
 
     def match_by_location(self, lost: LostItem, found: FoundItem) -> float:
-        # Very simple heuristic based on string equality / containment
-        if lost.lost_location == found.found_location:
+        if lost.location_code is not None and lost.location_code == found.location_code:
             return 25.0
-        if lost.lost_location in found.found_location or found.found_location in lost.lost_location:
-            return 20.0
-        if lost.lost_location.split()[0] == found.found_location.split()[0]:
-            return 15.0
-        return 5.0
+        # 两侧都有发布时解析的层级编码时按编码比较，否则解析地点文本
+        if lost.location_levels is not None and found.location_levels is not None:
+            return _levels_score(lost.location_levels, found.location_levels)
+        return self.score_location(lost.lost_location, found.found_location)
+
+    def score_location(self, lost_location: str, found_location: str) -> float:
+        return _location_score(lost_location, found_location)
 
     def match_by_time(self, lost: LostItem, found: FoundItem) -> float:
         diff = abs(found.found_time - lost.lost_time)
         hours = diff.total_seconds() / 3600
-        if hours <= 24:
-            return 20.0
-        if hours <= 72:
-            return 15.0
-        if hours <= 168:
-            return 10.0
-        return 5.0
+        for limit, score in self.TIME_TIERS:
+            if hours <= limit:
+                return score
+        return self.TIME_FLOOR
 
-    def match_by_features(self, lost: LostItem, found: FoundItem) -> float:
+    def match_by_features(self, lost: LostItem, found: FoundItem, common: Optional[int] = None) -> float:
+        """common 为已知的描述共同词数（如由倒排表统计），为 None 时逐对求交集"""
         score = 0.0
-        if lost.color and found.color and lost.color.lower() == found.color.lower():
+        lost_color, lost_brand, lost_words = self._features(lost)
+        found_color, found_brand, found_words = self._features(found)
+        if lost_color and found_color and self._same(lost.color_code, found.color_code, lost_color, found_color):
             score += 5.0
-        if lost.brand and found.brand and lost.brand.lower() == found.brand.lower():
+        if lost_brand and found_brand and self._same(lost.brand_code, found.brand_code, lost_brand, found_brand):
             score += 5.0
         # keyword overlap in description (very small heuristic)
-        lost_words = set(lost.description.lower().split())
-        found_words = set(found.description.lower().split())
-        common = lost_words & found_words
-        score += min(5.0, len(common))
+        if common is None:
+            common = len(lost_words & found_words)
+        score += min(5.0, common)
         return min(score, 15.0)
 
+    @staticmethod
+    def _same(a_code, b_code, a, b) -> bool:
+        """两侧都有持久化的整数编码时比较编码，否则比较（规范化后的）原值"""
+        if a_code is not None and b_code is not None:
+            return a_code == b_code
+        return a == b
+
+    @staticmethod
+    def _features(item):
+        """(小写颜色, 小写品牌, 描述词集合)，优先使用 prepare_item 预先计算的结果"""
+        if item.keywords is not None:
+            return item.color_key, item.brand_key, item.keywords
+        return (item.color.lower() if item.color else None,
+                item.brand.lower() if item.brand else None,
+                set(tokenize(item.description)))
+
     def calculate_total_score(self, lost: LostItem, found: FoundItem) -> float:
         cat = self.match_by_category(lost, found)
         if cat == 0.0:
@@ -55,3 +114,48 @@ class Matcher:
         time = self.match_by_time(lost, found)
         feat = self.match_by_features(lost, found)
         return cat + loc + time + feat
+
+    def calculate_batch_scores(self, lost: LostItem, block: ItemBlock) -> np.ndarray:
+        """
+        批量评分：一个失物对一整块招领物品，语义与 calculate_total_score 逐对计算完全一致
+
+        Returns:
+            与 block 行顺序对应的 float64 分数数组
+        """
+        n = len(block)
+        scores = np.zeros(n, dtype=np.float64)
+        lost_category = block.category_index.get(lost.category)
+        if n == 0 or lost.category == "其他" or lost_category is None:
+            return scores
+        same = block.category_codes == lost_category
+        if not same.any():
+            return scores
+
+        # 地点：同类别行中每个不同地点只算一次，再按编码取值
+        loc_table = np.zeros(len(block.locations), dtype=np.float64)
+        for code in np.unique(block.location_codes[same]):
+            loc_table[code] = self.score_location(lost.lost_location, block.locations[code])
+        loc = loc_table[block.location_codes]
+
+        diff = np.abs(block.times - to_epoch_us(lost.lost_time))
+        time = np.select([diff <= limit * _HOUR_US for limit, _ in self.TIME_TIERS],
+                         [score for _, score in self.TIME_TIERS], default=self.TIME_FLOOR)
+
+        feat = np.zeros(n, dtype=np.float64)
+        if lost.color:
+            color = block.color_index.get(lost.color.lower(), MISSING_CODE)
+            if color != MISSING_CODE:
+                feat += np.where(block.color_codes == color, 5.0, 0.0)
+        if lost.brand:
+            brand = block.brand_index.get(lost.brand.lower(), MISSING_CODE)
+            if brand != MISSING_CODE:
+                feat += np.where(block.brand_codes == brand, 5.0, 0.0)
+        lost_tokens = [block.token_index[w] for w in set(tokenize(lost.description)) if w in block.token_index]
+        if lost_tokens:
+            hit = np.isin(block.token_ids, np.asarray(lost_tokens, dtype=block.token_ids.dtype))
+            common = np.bincount(block.token_owner[hit], minlength=n)
+            feat += np.minimum(common, 5).astype(np.float64)
+        feat = np.minimum(feat, 15.0)
+
+        scores[same] = (40.0 + loc + time + feat)[same]
+        return scores
@@ -2,12 +2,22 @@
 通知型智能体 - 基于规则的实现
 职责：发送匹配通知、提醒、系统消息
 """
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+from sqlalchemy import DateTime, Integer, String, cast, exists, func, insert, literal, select
 from sqlalchemy.orm import Session
 from ..database import models_db
 from ..database.db_manager import DatabaseManager
 
+# 未解决提醒的文案：(物品类型, 档位) -> (标题, 内容中的物品称呼, 建议)
+# 内容为：{称呼}"{物品名称}"已发布{天数}天，{建议}
+REMINDER_TEXTS = {
+    ('lost', 'urgent'): ('⚠️ 紧急提醒：失物信息已超过14天', '您的失物', '仍未解决。建议更新信息或重新发布。'),
+    ('lost', 'reminder'): ('📅 提醒：失物信息已超过7天', '您的失物', '请及时关注匹配结果。'),
+    ('found', 'urgent'): ('⚠️ 紧急提醒：招领信息已超过14天', '您发布的招领信息', '建议更新信息或重新发布。'),
+    ('found', 'reminder'): ('📅 提醒：招领信息已超过7天', '您发布的招领信息', '请及时关注。'),
+}
+
 
 class NotificationAgent:
     """通知型智能体 - 基于规则的简单实现"""
@@ -25,10 +35,13 @@ class NotificationAgent:
             'high_match_threshold': 80.0,  # 高匹配度阈值
             'reminder_days': 7,  # 提醒天数（超过7天未解决）
             'urgent_reminder_days': 14,  # 紧急提醒天数
+            'batch_size': 500,  # 批量写入通知时每批条数（每批提交一次）
+            'reminder_chunk_size': 5000,  # 提醒检查时每段的物品ID数（每段提交一次）
         }
     
     def notify_on_match(self, session: Session, match_record: models_db.MatchRecordDB,
-                       lost_item: models_db.LostItemDB, found_item: models_db.FoundItemDB):
+                       lost_item: models_db.LostItemDB, found_item: models_db.FoundItemDB,
+                       commit: bool = True):
         """
         规则：匹配成功时通知失主和拾主
         
@@ -37,116 +50,146 @@ class NotificationAgent:
             match_record: 匹配记录
             lost_item: 失物信息
             found_item: 招领信息
+            commit: 是否立即提交（批量保存时为 False，由调用方统一提交）
+        """
+        self.notify_on_matches(session, [(match_record, lost_item, found_item)], commit=commit)
+    
+    def notify_on_matches(self, session: Session,
+                          matches: List[Tuple[models_db.MatchRecordDB, models_db.LostItemDB, models_db.FoundItemDB]],
+                          commit: bool = True):
+        """
+        批量发送一次发布产生的匹配通知（规则同 notify_on_match），所有通知一次写入
+        
+        Args:
+            session: 数据库会话
+            matches: (匹配记录, 失物, 招领) 列表
+            commit: 是否立即提交（批量保存时为 False，由调用方统一提交）
         """
+        notifications = []
+        for match_record, lost_item, found_item in matches:
+            sent = self._match_notifications(match_record, lost_item, found_item)
+            # 只把确实发出了通知的匹配记录标记为已通知（匿名失物的普通匹配没有可通知的人）
+            if sent:
+                notifications.extend(sent)
+                match_record.is_notified = True
+        self._write_notifications(session, notifications, commit=False)
+        if commit:
+            session.commit()
+    
+    def _match_notifications(self, match_record: models_db.MatchRecordDB, lost_item: models_db.LostItemDB,
+                             found_item: models_db.FoundItemDB) -> List[Dict]:
+        """按匹配度构造一条匹配要发送的通知（内部方法）"""
+        notifications = []
         # 规则1：如果匹配度 >= 高阈值，发送紧急通知
         if match_record.match_score >= self.rules['high_match_threshold']:
-            # 通知失主
-            self._create_notification(
-                session=session,
-                user_id=lost_item.user_id,
-                notification_type='match',
-                title='🎉 高匹配度！发现可能的失物',
-                content=f'您的失物"{lost_item.item_name}"找到了高匹配度的招领信息（匹配度：{match_record.match_score:.1f}分），请尽快查看！',
-                related_item_id=lost_item.id,
-                related_match_id=match_record.id
-            )
+            # 通知失主（匿名发布的失物没有失主可通知）
+            if lost_item.user_id:
+                notifications.append(self._notification(
+                    user_id=lost_item.user_id,
+                    notification_type='match',
+                    title='🎉 高匹配度！发现可能的失物',
+                    content=f'您的失物"{lost_item.item_name}"找到了高匹配度的招领信息（匹配度：{match_record.match_score:.1f}分），请尽快查看！',
+                    related_item_id=lost_item.id,
+                    related_match_id=match_record.id
+                ))
             
             # 通知拾主
             if found_item.user_id:
-                self._create_notification(
-                    session=session,
+                notifications.append(self._notification(
                     user_id=found_item.user_id,
                     notification_type='match',
                     title='🎯 发现匹配的失物信息',
                     content=f'您拾获的"{found_item.item_name}"可能与失物信息匹配（匹配度：{match_record.match_score:.1f}分），请查看详情。',
                     related_item_id=found_item.id,
                     related_match_id=match_record.id
-                )
+                ))
         else:
             # 规则2：普通匹配度，发送常规通知
             # 通知失主
-            self._create_notification(
-                session=session,
-                user_id=lost_item.user_id,
-                notification_type='match',
-                title='📋 发现可能的匹配',
-                content=f'您的失物"{lost_item.item_name}"找到了可能的招领信息（匹配度：{match_record.match_score:.1f}分），请查看详情。',
-                related_item_id=lost_item.id,
-                related_match_id=match_record.id
-            )
-        
-        # 标记匹配记录为已通知
-        match_record.is_notified = True
-        session.commit()
+            if lost_item.user_id:
+                notifications.append(self._notification(
+                    user_id=lost_item.user_id,
+                    notification_type='match',
+                    title='📋 发现可能的匹配',
+                    content=f'您的失物"{lost_item.item_name}"找到了可能的招领信息（匹配度：{match_record.match_score:.1f}分），请查看详情。',
+                    related_item_id=lost_item.id,
+                    related_match_id=match_record.id
+                ))
+        
+        return notifications
     
-    def check_and_remind_unresolved(self, session: Session):
+    def check_and_remind_unresolved(self, session: Session, now: Optional[datetime] = None):
         """
         规则：检查并提醒未解决的失物/招领
         
+        超过提醒天数发送常规提醒，超过紧急提醒天数发送紧急提醒；每个物品的每档提醒只发一次
+        （记录在 reminder_ledger 中），重复调用不会重复提醒。已超过紧急天数才第一次检查到的物品只发紧急提醒。
+        筛选与写入都在数据库内完成：按物品ID分段，每段用 INSERT ... SELECT 写入通知和发送记录，一段提交一次。
+        
         Args:
             session: 数据库会话
+            now: 当前时间（UTC，默认为现在）
+        
+        Returns:
+            发送的提醒数量
         """
-        now = datetime.utcnow()
+        now = now or datetime.utcnow()
         reminder_threshold = now - timedelta(days=self.rules['reminder_days'])
         urgent_threshold = now - timedelta(days=self.rules['urgent_reminder_days'])
+        # 档位：(发布时间下限, 发布时间上限)
+        tiers = {
+            # 规则3/5：超过紧急提醒天数，发送紧急提醒
+            'urgent': (None, urgent_threshold),
+            # 规则4/6：超过提醒天数，发送常规提醒
+            'reminder': (urgent_threshold, reminder_threshold),
+        }
+        chunk = self.rules['reminder_chunk_size']
+        sent = 0
+        for side, model in (('lost', models_db.LostItemDB), ('found', models_db.FoundItemDB)):
+            max_id = session.execute(select(func.max(model.id))).scalar() or 0
+            for low in range(0, max_id, chunk):
+                for tier, (since, until) in tiers.items():
+                    sent += self._insert_reminders(session, side, model, tier, since, until,
+                                                   low, low + chunk, now)
+                session.commit()
+        return sent
+    
+    @staticmethod
+    def _insert_reminders(session: Session, side: str, model, tier: str, since: Optional[datetime],
+                          until: datetime, low: int, high: int, now: datetime) -> int:
+        """
+        为 ID 在 (low, high] 内、发布时间在 [since, until) 内且未发过该档提醒的未解决物品
+        写入提醒和发送记录（内部方法，不提交）
         
-        # 检查未解决的失物
-        unresolved_lost = session.query(models_db.LostItemDB).filter(
-            models_db.LostItemDB.is_resolved == False
-        ).all()
+        Returns:
+            写入的提醒数量
+        """
+        ledger = models_db.ReminderLedgerDB
+        posted = getattr(model, f'{side}_time')
+        due = [
+            model.is_resolved == False,
+            model.user_id.isnot(None),
+            model.id > low,
+            model.id <= high,
+            posted < until,
+            ~exists().where(ledger.item_type == side, ledger.item_id == model.id, ledger.tier == tier),
+        ]
+        if since is not None:
+            due.append(posted >= since)
         
-        for lost_item in unresolved_lost:
-            days_passed = (now - lost_item.lost_time).days
-            
-            # 规则3：超过紧急提醒天数，发送紧急提醒
-            if lost_item.lost_time < urgent_threshold:
-                self._create_notification(
-                    session=session,
-                    user_id=lost_item.user_id,
-                    notification_type='reminder',
-                    title='⚠️ 紧急提醒：失物信息已超过14天',
-                    content=f'您的失物"{lost_item.item_name}"已发布{days_passed}天，仍未解决。建议更新信息或重新发布。',
-                    related_item_id=lost_item.id
-                )
-            # 规则4：超过提醒天数，发送常规提醒
-            elif lost_item.lost_time < reminder_threshold:
-                self._create_notification(
-                    session=session,
-                    user_id=lost_item.user_id,
-                    notification_type='reminder',
-                    title='📅 提醒：失物信息已超过7天',
-                    content=f'您的失物"{lost_item.item_name}"已发布{days_passed}天，请及时关注匹配结果。',
-                    related_item_id=lost_item.id
-                )
-        
-        # 检查未解决的招领
-        unresolved_found = session.query(models_db.FoundItemDB).filter(
-            models_db.FoundItemDB.is_resolved == False
-        ).all()
-        
-        for found_item in unresolved_found:
-            days_passed = (now - found_item.found_time).days
-            
-            # 规则5：超过紧急提醒天数，发送紧急提醒
-            if found_item.found_time < urgent_threshold:
-                self._create_notification(
-                    session=session,
-                    user_id=found_item.user_id,
-                    notification_type='reminder',
-                    title='⚠️ 紧急提醒：招领信息已超过14天',
-                    content=f'您发布的招领信息"{found_item.item_name}"已发布{days_passed}天，建议更新信息或重新发布。',
-                    related_item_id=found_item.id
-                )
-            # 规则6：超过提醒天数，发送常规提醒
-            elif found_item.found_time < reminder_threshold:
-                self._create_notification(
-                    session=session,
-                    user_id=found_item.user_id,
-                    notification_type='reminder',
-                    title='📅 提醒：招领信息已超过7天',
-                    content=f'您发布的招领信息"{found_item.item_name}"已发布{days_passed}天，请及时关注。',
-                    related_item_id=found_item.id
-                )
+        title, subject, advice = REMINDER_TEXTS[(side, tier)]
+        days = cast(func.julianday(literal(now, DateTime)) - func.julianday(posted), Integer)
+        content = literal(f'{subject}"') + model.item_name + '"已发布' + cast(days, String) + f'天，{advice}'
+        notification = models_db.NotificationDB
+        result = session.execute(insert(notification).from_select(
+            ['user_id', 'notification_type', 'title', 'content', 'related_item_id', 'is_read', 'created_at'],
+            select(model.user_id, literal('reminder'), literal(title), content, model.id,
+                   literal(False), literal(now, DateTime)).where(*due)))
+        # 发送记录与提醒在同一事务中写入，条件相同，因此只覆盖刚提醒的物品
+        session.execute(insert(ledger).from_select(
+            ['item_type', 'item_id', 'tier', 'sent_at'],
+            select(literal(side), model.id, literal(tier), literal(now, DateTime)).where(*due)))
+        return result.rowcount
     
     def send_announcement(self, session: Session, user_ids: List[int], title: str, content: str):
         """
@@ -157,26 +200,24 @@ class NotificationAgent:
             user_ids: 接收公告的用户ID列表（空列表表示所有用户）
             title: 公告标题
             content: 公告内容
+        
+        Returns:
+            发送的公告数量
         """
         if not user_ids:
-            # 如果用户列表为空，发送给所有用户
-            users = session.query(models_db.UserDB).all()
-            user_ids = [user.id for user in users]
-        
-        for user_id in user_ids:
-            self._create_notification(
-                session=session,
-                user_id=user_id,
-                notification_type='announcement',
-                title=title,
-                content=content
-            )
+            # 如果用户列表为空，发送给所有用户（只查询ID，不加载完整的用户对象）
+            user_ids = session.execute(select(models_db.UserDB.id)).scalars().all()
+        
+        return self._write_notifications(session, [
+            self._notification(user_id=user_id, notification_type='announcement', title=title, content=content)
+            for user_id in user_ids
+        ])
     
     def _create_notification(self, session: Session, user_id: int, notification_type: str,
                             title: str, content: str, related_item_id: Optional[int] = None,
-                            related_match_id: Optional[int] = None):
+                            related_match_id: Optional[int] = None, commit: bool = True):
         """
-        创建通知记录（内部方法）
+        创建单条通知记录（内部方法）
         
         Args:
             session: 数据库会话
@@ -186,18 +227,45 @@ class NotificationAgent:
             content: 通知内容
             related_item_id: 相关物品ID
             related_match_id: 相关匹配记录ID
+            commit: 是否立即提交
         """
-        notification = models_db.NotificationDB(
-            user_id=user_id,
-            notification_type=notification_type,
-            title=title,
-            content=content,
-            related_item_id=related_item_id,
-            related_match_id=related_match_id,
-            is_read=False
-        )
-        session.add(notification)
-        session.commit()
+        self._write_notifications(session, [self._notification(
+            user_id, notification_type, title, content, related_item_id, related_match_id
+        )], commit=commit)
+    
+    @staticmethod
+    def _notification(user_id: int, notification_type: str, title: str, content: str,
+                      related_item_id: Optional[int] = None, related_match_id: Optional[int] = None) -> Dict:
+        """构造一条待写入的通知（批量插入的参数行）"""
+        return {
+            'user_id': user_id,
+            'notification_type': notification_type,
+            'title': title,
+            'content': content,
+            'related_item_id': related_item_id,
+            'related_match_id': related_match_id,
+            'is_read': False,
+            'created_at': datetime.utcnow(),
+        }
+    
+    def _write_notifications(self, session: Session, notifications: List[Dict], commit: bool = True) -> int:
+        """
+        批量写入通知（内部方法）：按 batch_size 分块 executemany，commit 为 True 时每块提交一次
+        
+        Args:
+            session: 数据库会话
+            notifications: _notification 构造的通知列表
+            commit: 是否每块提交（为 False 时由调用方统一提交）
+        
+        Returns:
+            写入的通知数量
+        """
+        size = self.rules['batch_size']
+        for i in range(0, len(notifications), size):
+            session.execute(insert(models_db.NotificationDB), notifications[i:i + size])
+            if commit:
+                session.commit()
+        return len(notifications)
     
     def get_user_notifications(self, session: Session, user_id: int, 
                               unread_only: bool = False, limit: int = 20) -> List[models_db.NotificationDB]:
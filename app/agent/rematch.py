@@ -0,0 +1,143 @@
+"""
+全量重新匹配任务
+职责：规则调整或批量导入后，对所有未解决失物 × 未解决招领重新评分并合并到 match_records
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..database.db_manager import DatabaseManager
+from ..database.item_index import UNINDEXED_CATEGORY
+from ..models import ItemBlock, MatchRecord, CompactLostItem, CompactFoundItem
+from .rule_agent import RuleAgent
+
+# 一个分片：(类别, 该类别下的一批失物)
+Shard = Tuple[str, List[CompactLostItem]]
+
+# 工作进程内的全局状态，由 _init_worker 在进程启动时设置一次，
+# 之后每个任务只需传递失物分片，不必重复序列化招领块
+_worker_blocks: Dict[str, ItemBlock] = {}
+_worker_agent: Optional[RuleAgent] = None
+
+
+def _init_worker(blocks: Dict[str, ItemBlock], top_k: Optional[int], threshold: float):
+    global _worker_blocks, _worker_agent
+    _worker_blocks = blocks
+    _worker_agent = RuleAgent(top_k=top_k, threshold=threshold)
+
+
+def _score_shard(shard: Shard) -> Tuple[List[int], List[MatchRecord]]:
+    """对一个分片评分，返回 (分片内失物ID, 匹配结果)"""
+    category, lost_items = shard
+    block = _worker_blocks.get(category)
+    records: List[MatchRecord] = []
+    if block is not None:
+        for lost in lost_items:
+            records.extend(_worker_agent.match_block(lost, block))
+    return [lost.item_id for lost in lost_items], records
+
+
+class RematchJob:
+    """全量重新匹配：按类别把失物切成分片，分发到进程池批量评分"""
+
+    def __init__(self, db_manager: DatabaseManager, agent: Optional[RuleAgent] = None,
+                 workers: Optional[int] = None, shard_size: int = 200, prune: bool = False):
+        """
+        Args:
+            db_manager: 数据库管理器实例
+            agent: 提供匹配阈值与 top_k 配置的规则智能体
+            workers: 工作进程数（None 为 CPU 核数，0 表示在当前进程内执行）
+            shard_size: 每个分片包含的失物数量
+            prune: 是否删除本次未再匹配到的旧匹配记录
+        """
+        self.db_manager = db_manager
+        self.agent = agent or RuleAgent()
+        self.workers = workers
+        self.shard_size = shard_size
+        self.prune = prune
+
+    def run(self, progress: Optional[Callable[[Dict[str, float]], None]] = None) -> Dict[str, float]:
+        """
+        执行重新匹配
+
+        Args:
+            progress: 每合并完一个分片调用一次，参数为当前统计信息
+
+        Returns:
+            统计信息：lost_total, lost_done, found_total, pairs, matches,
+            inserted, updated, deleted, elapsed, lost_per_sec, pairs_per_sec
+        """
+        session = self.db_manager.get_session()
+        try:
+            lost_items = self.db_manager.get_open_lost_items(session)
+            found_items = self.db_manager.get_open_found_items(session)
+        finally:
+            session.close()
+
+        blocks = self._build_blocks(found_items)
+        shards = self._build_shards(lost_items, blocks)
+        stats: Dict[str, float] = {
+            'lost_total': len(lost_items), 'lost_done': 0, 'found_total': len(found_items),
+            'pairs': 0, 'matches': 0, 'inserted': 0, 'updated': 0, 'deleted': 0,
+            'elapsed': 0.0, 'lost_per_sec': 0.0, 'pairs_per_sec': 0.0,
+        }
+        start = time.perf_counter()
+        rules = self.agent.rules
+
+        def merge(shard: Shard, lost_ids: List[int], records: List[MatchRecord]):
+            session = self.db_manager.get_session()
+            try:
+                result = self.db_manager.merge_match_records(session, lost_ids, records, prune=self.prune)
+            finally:
+                session.close()
+            for key, value in result.items():
+                stats[key] += value
+            stats['lost_done'] += len(lost_ids)
+            stats['pairs'] += len(lost_ids) * len(blocks.get(shard[0], ()))
+            stats['matches'] += len(records)
+            self._update_rates(stats, start)
+            if progress:
+                progress(dict(stats))
+
+        if self.workers == 0:
+            _init_worker(blocks, rules['top_k'], rules['match_threshold'])
+            for shard in shards:
+                merge(shard, *_score_shard(shard))
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(blocks, rules['top_k'], rules['match_threshold'])) as pool:
+                futures = {pool.submit(_score_shard, shard): shard for shard in shards}
+                for future in as_completed(futures):
+                    merge(futures[future], *future.result())
+
+        self._update_rates(stats, start)
+        return stats
+
+    @staticmethod
+    def _build_blocks(found_items: List[CompactFoundItem]) -> Dict[str, ItemBlock]:
+        by_category: Dict[str, List[CompactFoundItem]] = {}
+        for f in found_items:
+            if f.category != UNINDEXED_CATEGORY:
+                by_category.setdefault(f.category, []).append(f)
+        return {category: ItemBlock(items) for category, items in by_category.items()}
+
+    def _build_shards(self, lost_items: List[CompactLostItem], blocks: Dict[str, ItemBlock]) -> List[Shard]:
+        """按类别切分失物；没有同类别招领的失物也要参与（prune 时清理旧记录）"""
+        by_category: Dict[str, List[CompactLostItem]] = {}
+        for lost in lost_items:
+            by_category.setdefault(lost.category, []).append(lost)
+        shards: List[Shard] = []
+        # 候选多的类别先派发，减少尾部等待
+        for category in sorted(by_category, key=lambda c: -len(blocks.get(c, ()))):
+            items = by_category[category]
+            for i in range(0, len(items), self.shard_size):
+                shards.append((category, items[i:i + self.shard_size]))
+        return shards
+
+    @staticmethod
+    def _update_rates(stats: Dict[str, float], start: float):
+        elapsed = time.perf_counter() - start
+        stats['elapsed'] = elapsed
+        if elapsed > 0:
+            stats['lost_per_sec'] = stats['lost_done'] / elapsed
+            stats['pairs_per_sec'] = stats['pairs'] / elapsed
@@ -1,21 +1,164 @@
-from typing import List
-from ..models import LostItem, FoundItem, MatchRecord
+import copy
+import heapq
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+import numpy as np
+from ..models import LostItem, FoundItem, ItemBlock, MatchRecord, prepare_item, to_epoch_us
+from ..database.item_index import CategoryIndex
 from .matcher import Matcher
 
+# 一组候选：(已知的时间分或 None, [(seq, 候选物品), ...])
+Tier = Tuple[Optional[float], Sequence[Tuple[int, Union[LostItem, FoundItem]]]]
+
 
 class RuleAgent:
-    def __init__(self):
+    def __init__(self, top_k: Optional[int] = None, threshold: float = 40.0):
+        """
+        Args:
+            top_k: 每次匹配最多保留的结果数（None 表示不限制）
+            threshold: 进入匹配结果的最低分数
+        """
         self.matcher = Matcher()
+        self.rules = {
+            'match_threshold': threshold,
+            'top_k': top_k,
+        }
+
+    def match_cycle(self, lost_item: LostItem, found_items: Iterable[FoundItem] = (),
+                    index: Optional[CategoryIndex] = None) -> List[MatchRecord]:
+        """
+        对一个失物执行匹配，结果按分数从高到低排序
+
+        传入 index 时忽略 found_items：只取同类别的候选，并按时间分档从高分到低分扫描，
+        一旦某档的分数上界已无法进入结果就提前结束。
+        """
+        lost_item = self._prepared(lost_item)
+        if index is not None:
+            return self._match_index(index, lost_item, lost_item.lost_time, lambda f: (lost_item, f))
+        return self._match_tiers([(None, list(enumerate(found_items)))], lambda f: (lost_item, f))
+
+    def reverse_match_cycle(self, found_item: FoundItem, index: CategoryIndex) -> List[MatchRecord]:
+        """
+        反向匹配：新发布的招领与未解决失物索引（time_field="lost_time"）中的同类别失物评分，
+        规则、阈值与 top_k 与 match_cycle 相同
+        """
+        found_item = self._prepared(found_item)
+        return self._match_index(index, found_item, found_item.found_time, lambda lost: (lost, found_item))
+
+    @staticmethod
+    def _prepared(item):
+        """对待匹配物品预先分词（复制一份，不修改调用方的对象）"""
+        if item.keywords is not None:
+            return item
+        return prepare_item(copy.copy(item))
+
+    def _match_index(self, index: CategoryIndex, item, when, pair) -> List[MatchRecord]:
+        """
+        在索引中为 item 匹配：按时间分档取候选；有持久化词ID时沿倒排表一次性统计所有候选的共同词数；
+        有持久化地点层级时同楼宇的候选先评分，其余候选的地点分上限为 MAX_OTHER_BUILDING
+        """
+        m = self.matcher
+        tiers = index.time_tiers(item.category, to_epoch_us(when), m.TIME_TIERS, m.TIME_FLOOR)
+        overlap = None
+        if item.token_ids is not None:
+            overlap = index.keyword_overlap(item.category, item.token_ids)
+        near = None
+        if item.location_levels is not None:
+            near = index.building_members(item.category, item.location_levels[1])
+        return self._match_tiers(tiers, pair, overlap, near)
+
+    def _match_tiers(self, tiers: Iterable[Tier], pair, overlap: Optional[Dict[int, int]] = None,
+                     near: Optional[Set[int]] = None) -> List[MatchRecord]:
+        """
+        按分档评分，pair 把候选转换为 (失物, 招领)；设置了 top_k 时用小顶堆保存当前最好的 K 个结果。
+        先算便宜的类别/时间/地点分，若加上其余规则的分数上限仍进不了结果则跳过特征评分。
+        overlap 为倒排表统计的 {候选ID: 共同词数}，带词ID的候选直接查表，其余逐对计算；
+        near 为同楼宇的候选ID，给出时每档内先评同楼宇的候选，其余候选整组按较低的地点上限剪枝
+        """
+        k = self.rules['top_k']
+        if k is not None and k <= 0:
+            return []
+        threshold = self.rules['match_threshold']
+        m = self.matcher
+        # 堆元素 (score, -seq, record)：同分时先出现的候选优先，与全量排序结果一致
+        heap: List[Tuple[float, int, MatchRecord]] = []
+        for time_score, entries in tiers:
+            if time_score is not None and self._pruned(
+                    heap, k, m.MAX_CATEGORY + m.MAX_LOCATION + time_score + m.MAX_FEATURES, threshold):
+                break
+            groups = [(m.MAX_LOCATION, entries)]
+            if near is not None:
+                groups = [(m.MAX_LOCATION, [e for e in entries if e[1].item_id in near]),
+                          (m.MAX_OTHER_BUILDING, [e for e in entries if e[1].item_id not in near])]
+            for max_location, group in groups:
+                if time_score is not None and self._pruned(
+                        heap, k, m.MAX_CATEGORY + max_location + time_score + m.MAX_FEATURES, threshold):
+                    continue
+                self._score_group(heap, k, threshold, group, pair, time_score, max_location, overlap)
+        heap.sort(reverse=True)
+        return [entry[2] for entry in heap]
+
+    def _score_group(self, heap, k: Optional[int], threshold: float, entries, pair,
+                     time_score: Optional[float], max_location: float, overlap: Optional[Dict[int, int]]):
+        """对一组候选逐个评分并放入堆，max_location 为这组候选地点分的上限"""
+        m = self.matcher
+        for seq, candidate in entries:
+            lost_item, f = pair(candidate)
+            cat = m.match_by_category(lost_item, f)
+            if cat == 0.0:
+                if threshold <= 0.0:
+                    self._push(heap, k, 0.0, seq, lost_item, f)
+                continue
+            partial = cat + (time_score if time_score is not None else m.match_by_time(lost_item, f))
+            if self._pruned(heap, k, partial + max_location + m.MAX_FEATURES, threshold, seq):
+                continue
+            partial += m.match_by_location(lost_item, f)
+            if self._pruned(heap, k, partial + m.MAX_FEATURES, threshold, seq):
+                continue
+            common = None
+            if overlap is not None and candidate.token_ids is not None:
+                common = overlap.get(candidate.item_id, 0)
+            score = partial + m.match_by_features(lost_item, f, common)
+            if score >= threshold:
+                self._push(heap, k, score, seq, lost_item, f)
+
+    @staticmethod
+    def _pruned(heap, k: Optional[int], bound: float, threshold: float, seq: Optional[int] = None) -> bool:
+        """
+        分数上界达不到阈值，或堆已满且上界进不了前 K 名时可以剪枝。
+        候选不一定按 seq 顺序出现：给出 seq 时按 (分数, -seq) 比较，同分的较早候选仍可替换堆顶；
+        整组剪枝（不知道组内 seq）时只有上界严格低于第 K 名才剪
+        """
+        if bound < threshold:
+            return True
+        if len(heap) != k:
+            return False
+        if seq is None:
+            return bound < heap[0][0]
+        return (bound, -seq) <= heap[0][:2]
+
+    def _push(self, heap, k: Optional[int], score: float, seq: int, lost_item: LostItem, found_item: FoundItem):
+        key = (score, -seq)
+        if k is None or len(heap) < k:
+            heapq.heappush(heap, key + (self._make_record(lost_item, found_item, score),))
+        elif key > heap[0][:2]:
+            heapq.heapreplace(heap, key + (self._make_record(lost_item, found_item, score),))
+
+    @staticmethod
+    def _make_record(lost_item: LostItem, found_item: FoundItem, score: float) -> MatchRecord:
+        return MatchRecord(lost_item_id=lost_item.item_id or -1,
+                           found_item_id=found_item.item_id or -1,
+                           match_score=score,
+                           match_reason=f"score={score:.1f}")
 
-    def match_cycle(self, lost_item: LostItem, found_items: List[FoundItem]) -> List[MatchRecord]:
-        matches: List[MatchRecord] = []
-        for f in found_items:
-            score = self.matcher.calculate_total_score(lost_item, f)
-            if score >= 40.0:
-                reason = f"score={score:.1f}"
-                matches.append(MatchRecord(lost_item_id=lost_item.item_id or -1,
-                                           found_item_id=f.item_id or -1,
-                                           match_score=score,
-                                           match_reason=reason))
-        matches.sort(key=lambda m: m.match_score, reverse=True)
-        return matches
+    def match_block(self, lost_item: LostItem, block: ItemBlock) -> List[MatchRecord]:
+        """批量模式：对列式招领块一次性评分，结果与 match_cycle 相同"""
+        scores = self.matcher.calculate_batch_scores(lost_item, block)
+        rows = np.flatnonzero(scores >= self.rules['match_threshold'])
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        if self.rules['top_k'] is not None:
+            rows = rows[:max(self.rules['top_k'], 0)]
+        return [MatchRecord(lost_item_id=lost_item.item_id or -1,
+                            found_item_id=int(block.item_ids[r]) if block.item_ids[r] > 0 else -1,
+                            match_score=float(scores[r]),
+                            match_reason=f"score={scores[r]:.1f}")
+                for r in rows]
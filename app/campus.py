@@ -0,0 +1,136 @@
+"""
+校园地点层级：校区 → 楼宇 → 楼层 → 房间/区域
+
+发布时填写的地点是自由文本（"教学楼A-二楼走廊"、"图书馆 3楼"、"东校区食堂"），
+这里把它解析成统一的层级路径，不再依赖空格切分。
+解析在发布时执行一次：各层级与楼宇的相邻分组按属性编码保存在物品表的
+campus_code / building_code / floor_code / room_code / zone_code 列，匹配时只比较整数编码。
+"""
+import re
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# 位置相近的楼宇分区：同一分区内不同楼宇的地点视为相邻
+CAMPUS_ZONES: Dict[str, List[str]] = {
+    "教学区": ["教学楼A", "教学楼B", "教学楼C", "实验楼", "综合楼"],
+    "图书馆区": ["图书馆", "自习室", "档案馆"],
+    "生活区": ["食堂", "第一食堂", "第二食堂", "超市", "宿舍", "学生公寓"],
+    "运动区": ["体育馆", "操场", "游泳馆", "篮球场"],
+    "行政区": ["行政楼", "校门", "南门", "北门"],
+}
+
+_SEPARATORS = re.compile(r"[\s\-—_/·,，、|]+")
+_CAMPUS = re.compile(r"^(.{1,8}?校区)")
+# 楼宇名称以这些字结尾（后面可跟一个字母编号，如 教学楼A）；之后的部分是楼内区域
+_BUILDING = re.compile(r"^.*?(?:楼|馆|堂|中心|场|门|公寓|宿舍|超市|室)[A-Za-z]?")
+_FLOOR = re.compile(r"(地下)?([0-9]+|[一二三四五六七八九十]+)\s*(楼|层|f|F)(?![A-Za-z0-9])")
+_CN_DIGITS = {"一": 1, "二": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+# 楼宇名称中可去掉的编号（教学楼A → 教学楼，第一食堂 → 食堂），去掉后相同的楼宇视为同一类
+_BUILDING_SUFFIX = re.compile(r"[A-Za-z0-9一二三四五六七八九十]+号?$")
+_BUILDING_PREFIX = re.compile(r"^第?[0-9一二三四五六七八九十]+")
+
+# 持久化的地点层级，顺序与 location_levels 的返回值一致；物品上的列名为 "<层级>_code"
+LOCATION_LEVELS = ("campus", "building", "floor", "room", "zone")
+
+
+class LocationPath(NamedTuple):
+    campus: str
+    building: str
+    floor: str
+    room: str
+
+    def contains(self, other: "LocationPath") -> bool:
+        """self 是 other 的上级地点：self 填写的每一级都与 other 相同（例如 图书馆 包含 图书馆/3F）"""
+        return levels_contain(self, other)
+
+
+def levels_contain(outer: Sequence, inner: Sequence) -> bool:
+    """
+    outer 是 inner 的上级地点：outer 非空的每一级都与 inner 相同
+
+    各级可以是文本，也可以是持久化的编码（空值为 "" 或 None）
+    """
+    return tuple(outer) != tuple(inner) and all(not mine or mine == theirs for mine, theirs in zip(outer, inner))
+
+
+def _floor_number(digits: str) -> int:
+    if digits.isdigit():
+        return int(digits)
+    if "十" not in digits:
+        return _CN_DIGITS.get(digits, 0)
+    tens, _, ones = digits.partition("十")
+    return _CN_DIGITS.get(tens, 1) * 10 + _CN_DIGITS.get(ones, 0)
+
+
+def parse_location(text: Optional[str]) -> LocationPath:
+    """
+    解析地点文本
+
+    Args:
+        text: 地点文本
+
+    Returns:
+        LocationPath；楼层统一为 "3F" / "B1" 形式，无法识别的部分为空字符串
+    """
+    normalized = _SEPARATORS.sub("-", (text or "").strip()).strip("-")
+    campus = ""
+    match = _CAMPUS.match(normalized)
+    if match:
+        campus = match.group(1)
+        normalized = normalized[match.end():].strip("-")
+    floor = ""
+    match = _FLOOR.search(normalized)
+    if match:
+        number = _floor_number(match.group(2))
+        floor = f"B{number}" if match.group(1) else f"{number}F"
+        head, room = normalized[:match.start()], normalized[match.end():]
+    else:
+        head, _, room = normalized.partition("-")
+    head = head.strip("-")
+    # 楼宇名后紧跟的文字（图书馆东门、教学楼A201）归入楼内区域
+    match = _BUILDING.match(head)
+    building = head
+    if match and match.end() < len(head):
+        building = match.group(0)
+        room = "-".join(part for part in (head[match.end():], room.strip("-")) if part)
+    return LocationPath(campus, building, floor, room.strip("-"))
+
+
+def _building_family(building: str) -> str:
+    return _BUILDING_PREFIX.sub("", _BUILDING_SUFFIX.sub("", building)) or building
+
+
+def _zone_table() -> Dict[str, str]:
+    """预先计算 {楼宇或楼宇类别: 分区}：分区内的楼宇，以及去掉编号后的楼宇类别（教学楼A → 教学楼）"""
+    zones = {}
+    for zone, buildings in CAMPUS_ZONES.items():
+        for building in buildings:
+            zones.setdefault(building, zone)
+            zones.setdefault(_building_family(building), zone)
+    return zones
+
+
+BUILDING_ZONES = _zone_table()
+
+
+def building_zone(building: str) -> str:
+    """
+    楼宇的相邻分组：相同分组的不同楼宇视为相邻
+
+    分区内的楼宇（及同类楼宇，如 教学楼D）取所在分区，其余取去掉编号后的楼宇类别（3号楼 → 号楼）；
+    空楼宇返回空字符串
+    """
+    if not building:
+        return ""
+    family = _building_family(building)
+    return BUILDING_ZONES.get(building) or BUILDING_ZONES.get(family) or family
+
+
+def location_levels(text: Optional[str]) -> Tuple[str, str, str, str, str]:
+    """解析地点文本，返回 (校区, 楼宇, 楼层, 区域, 相邻分组)，顺序与 LOCATION_LEVELS 一致"""
+    path = parse_location(text)
+    return (*path, building_zone(path.building))
+
+
+def nearby_buildings(a: str, b: str) -> bool:
+    """两个不同楼宇是否相邻：相邻分组相同（同一分区，或去掉编号后属于同一类）"""
+    return bool(a) and bool(b) and a != b and building_zone(a) == building_zone(b)
@@ -0,0 +1,61 @@
+"""
+条件 GET：用表的变更版本号生成 ETag
+
+客户端带 If-None-Match 轮询时，只读 table_versions 的一行（详情接口再按主键确认物品存在），
+版本未变就直接返回 304，不查询物品表、不生成响应体。
+ETag 为 "表名-epoch-版本号-请求摘要"（从未变更过的表没有 epoch、版本号为 0）：
+- epoch 在 table_versions 的行创建时随机生成，区分重建前后的数据库；
+- 请求摘要由路径和排序后的查询参数算出，同一张表的不同页、不同物品、不同参数各有各的 ETag。
+不发送 Last-Modified：它只精确到秒，同一秒内的两次写入会让 If-Modified-Since 误判为未修改。
+"""
+import hashlib
+from typing import Callable, Optional
+from flask import make_response, request
+from werkzeug.http import is_resource_modified
+
+
+def request_key() -> str:
+    """当前请求的路径与查询参数（按参数名、值排序）的摘要"""
+    args = sorted(request.args.items(multi=True))
+    raw = request.path + '?' + '&'.join(f"{k}={v}" for k, v in args)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def conditional_get(db_manager, model, build: Callable, validate: Optional[Callable] = None):
+    """
+    按表版本处理条件请求
+
+    版本号必须在生成响应之前读取：两者之间若有写入，响应带的是旧 ETag，
+    客户端下次只会多下载一次，而不会把旧数据当成新版本缓存。
+
+    Args:
+        db_manager: 数据库管理器实例
+        model: 响应内容所依赖的表（LostItemDB / FoundItemDB）
+        build: 版本有变化时生成响应的函数，返回值同 Flask 视图
+        validate: 可选，validate(session) 在判断 304 之前检查请求本身（游标格式、物品是否存在），
+            请求无效时返回错误响应（同 Flask 视图的返回值），有效时返回 None；
+            无效的请求即使带着匹配的 If-None-Match 也返回错误而不是 304
+
+    Returns:
+        Flask Response；2xx 响应附带 ETag，并要求客户端每次重新验证
+    """
+    session = db_manager.get_session()
+    try:
+        version, _, epoch = db_manager.get_table_version(session, model)
+        error = validate(session) if validate is not None else None
+    finally:
+        session.close()
+    if error is not None:
+        return make_response(error)
+    # 带上 epoch：数据库重建后版本号从头计数，旧客户端缓存的同号 ETag 不会得到 304
+    prefix = f"{model.__tablename__}-{epoch}" if epoch else model.__tablename__
+    etag = f"{prefix}-{version}-{request_key()}"
+    if not is_resource_modified(request.environ, etag=etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(build())
+        if response.status_code // 100 != 2:
+            return response
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,44 @@
+"""
+用户未读通知计数
+
+users.unread_notifications 由 notifications 上的触发器维护：插入未读通知加一、标记已读减一、
+删除未读通知减一。所有写入路径（ORM、批量 executemany、提醒的 INSERT ... SELECT）都会触发，
+读取未读数量只需读用户的一行，不再对通知表 COUNT(*)。
+"""
+from typing import List
+
+_COUNTER = "unread_notifications"
+
+
+def _count_unread(user: str) -> str:
+    return f"(SELECT COUNT(*) FROM notifications WHERE user_id = {user} AND is_read = 0)"
+
+
+def _counter_ddl() -> List[str]:
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS notifications_unread_ai AFTER INSERT ON notifications "
+        f"WHEN new.is_read = 0 BEGIN "
+        f"UPDATE users SET {_COUNTER} = {_COUNTER} + 1 WHERE id = new.user_id; END",
+        f"CREATE TRIGGER IF NOT EXISTS notifications_unread_ad AFTER DELETE ON notifications "
+        f"WHEN old.is_read = 0 BEGIN "
+        f"UPDATE users SET {_COUNTER} = {_COUNTER} - 1 WHERE id = old.user_id; END",
+        f"CREATE TRIGGER IF NOT EXISTS notifications_unread_au AFTER UPDATE OF is_read, user_id ON notifications "
+        f"BEGIN "
+        f"UPDATE users SET {_COUNTER} = {_COUNTER} - 1 WHERE id = old.user_id AND old.is_read = 0; "
+        f"UPDATE users SET {_COUNTER} = {_COUNTER} + 1 WHERE id = new.user_id AND new.is_read = 0; END",
+        # 通知可能先于用户写入（API 按 user_id 发布），新用户从已有的未读通知开始计数
+        f"CREATE TRIGGER IF NOT EXISTS users_unread_ai AFTER INSERT ON users BEGIN "
+        f"UPDATE users SET {_COUNTER} = {_count_unread('new.id')} WHERE id = new.id; END",
+    ]
+
+
+def create_unread_counter(conn):
+    """创建计数触发器，并按通知表重新计算所有用户的未读数量"""
+    for statement in _counter_ddl():
+        conn.exec_driver_sql(statement)
+    recount_unread(conn)
+
+
+def recount_unread(conn):
+    """按通知表重新计算所有用户的未读数量（修复计数用）"""
+    conn.exec_driver_sql(f"UPDATE users SET {_COUNTER} = {_count_unread('users.id')}")
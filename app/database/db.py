@@ -1,5 +1,7 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from typing import Optional
 import os
 import sys
 
@@ -15,12 +17,76 @@ else:
 DB_PATH = os.path.join(base_path, 'database.db')
 DB_URL = f"sqlite:///{DB_PATH}"
 
-engine = create_engine(DB_URL, echo=False, future=True)
+# 引擎配置档，通过环境变量 DB_PROFILE 选择（默认 default）
+# - default: SQLite 默认设置（回滚日志，每次提交完整 fsync）
+# - production: WAL 日志，读写互不阻塞；synchronous=NORMAL 只在检查点 fsync；
+#   写锁冲突时等待 busy_timeout 而不是立即报 "database is locked"
+ENGINE_PROFILES = {
+    'default': {
+        'pragmas': {},
+        'options': {},
+    },
+    'production': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 10000,  # 毫秒
+            'mmap_size': 256 * 1024 * 1024,  # 字节
+            'cache_size': -64 * 1024,  # 负数表示 KiB，即 64MB
+            'temp_store': 'MEMORY',
+        },
+        'options': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_timeout': 30,
+            'pool_recycle': 3600,
+            'connect_args': {'timeout': 10, 'check_same_thread': False},
+        },
+    },
+}
+DB_PROFILE = os.environ.get('DB_PROFILE', 'default')
+
+
+def _apply_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+    return on_connect
+
+
+def create_db_engine(url: str = DB_URL, profile: Optional[str] = None) -> Engine:
+    """
+    按配置档创建引擎，PRAGMA 在每个新连接建立时设置
+
+    Args:
+        url: 数据库URL
+        profile: 配置档名称（None 时取环境变量 DB_PROFILE）
+
+    Returns:
+        Engine
+    """
+    profile = profile or DB_PROFILE
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"未知的数据库配置档: {profile}（可选: {', '.join(ENGINE_PROFILES)}）")
+    config = ENGINE_PROFILES[profile]
+    db_engine = create_engine(url, echo=False, future=True, **config['options'])
+    if config['pragmas']:
+        event.listen(db_engine, "connect", _apply_pragmas(config['pragmas']))
+    return db_engine
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 Base = declarative_base()
 
-def init_db():
+def init_db(bind=None):
     # Import models to register them with Base metadata
     from . import models_db as _models
-    Base.metadata.create_all(bind=engine)
+    from .migrations import run_migrations
+    Base.metadata.create_all(bind=bind or engine)
+    run_migrations(bind or engine)
 
@@ -1,18 +1,246 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from .db import SessionLocal, init_db
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from .db import engine as default_engine, SessionLocal, init_db
 from . import models_db
-from ..models import LostItem, FoundItem, MatchRecord, User
+from .item_index import CategoryIndex, MatchIndex
+from .outbox import enqueue_match_job
+from .pagination import PAGE_SIZE, Page, decode_cursor, keyset_page
+from .search import apply_search
+from .vocabulary import intern_tokens, item_codes
+from ..models import (LostItem, FoundItem, MatchRecord, User, CompactLostItem, CompactFoundItem,
+                      format_token_ids, parse_token_ids, row_location_levels, tokenize)
+
+# 匹配通知回调：(session, [(匹配记录, 失物, 招领), ...])，一次发布的所有匹配一起通知
+MatchNotifier = Callable[[Session, List[Tuple[models_db.MatchRecordDB, models_db.LostItemDB, models_db.FoundItemDB]]],
+                         None]
+
+# 匹配索引按 engine 在进程内共享：同一数据库的多个 DatabaseManager 共用同一份。
+# 重建与写入后的索引更新都持有 _index_lock，保证重建期间提交的写入不会丢失
+_match_indexes: Dict[Engine, MatchIndex] = {}
+_index_lock = threading.RLock()
+
+# 流式导出每批从数据库读取的行数
+EXPORT_BATCH_SIZE = 1000
+# 批量保存匹配记录时每条 INSERT 的行数（每行6个参数，远低于 SQLite 的参数上限）
+MATCH_INSERT_BATCH = 500
 
 
 class DatabaseManager:
-    def __init__(self):
-        init_db()
+    def __init__(self, engine: Optional[Engine] = None):
+        self.engine = engine or default_engine
+        if engine is None:
+            self._session_factory = SessionLocal
+        else:
+            self._session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+        init_db(self.engine)
 
     def get_session(self) -> Session:
-        return SessionLocal()
+        return self._session_factory()
+
+    # 匹配索引相关操作方法
+    def get_match_index(self, session: Session) -> MatchIndex:
+        """获取匹配索引（未预热时从数据库构建）"""
+        with _index_lock:
+            index = _match_indexes.get(self.engine)
+            if index is None:
+                index = self.rebuild_match_index(session)
+            return index
+
+    def get_found_index(self, session: Session) -> CategoryIndex:
+        """获取未解决招领的类别索引"""
+        return self.get_match_index(session).found
+
+    def get_lost_index(self, session: Session) -> CategoryIndex:
+        """获取未解决失物的类别索引（用于反向匹配）"""
+        return self.get_match_index(session).lost
+
+    def warm_match_index(self) -> MatchIndex:
+        """启动时预热匹配索引"""
+        session = self.get_session()
+        try:
+            return self.get_match_index(session)
+        finally:
+            session.close()
+
+    def rebuild_match_index(self, session: Session) -> MatchIndex:
+        """从数据库重新构建匹配索引并替换当前索引"""
+        with _index_lock:
+            # 先读版本号：读取物品期间的写入会让记录的版本号偏旧，下次 refresh 时再同步一次，不会漏掉
+            versions = self._item_table_versions(session)
+            index = MatchIndex(self.get_open_lost_items(session), self.get_open_found_items(session),
+                               {table: version for table, (version, _) in versions.items()},
+                               {table: epoch for table, (_, epoch) in versions.items()})
+            _match_indexes[self.engine] = index
+            return index
+
+    def refresh_match_index(self, session: Session) -> MatchIndex:
+        """
+        获取匹配索引；其他进程写入过物品表时先同步（比对 table_versions，一条查询）
+
+        每个进程的匹配索引只随本进程的写入同步，多进程部署时看不到其他进程发布或标记解决的物品；
+        用进程内索引匹配前调用本方法。只读取 row_version 大于索引所记版本号的行（ix_*_row_version），
+        按是否已解决加入或移出索引；epoch 变化（数据库已重建）或索引尚未构建时才从头构建。
+        """
+        versions = self._item_table_versions(session)
+        with _index_lock:
+            index = _match_indexes.get(self.engine)
+            if index is None or any(not index.same_epoch(table, epoch) for table, (_, epoch) in versions.items()):
+                return self.rebuild_match_index(session)
+            for side, model, compact in (('lost', models_db.LostItemDB, CompactLostItem),
+                                         ('found', models_db.FoundItemDB, CompactFoundItem)):
+                table = model.__tablename__
+                version, epoch = versions[table]
+                known = index.versions.get(table, 0)
+                if version == known:
+                    continue
+                # 版本号已先读出：之后提交的写入也可能在这里读到，下次同步时重复加入/移除，结果不变
+                target = index.lost if side == 'lost' else index.found
+                for row in session.query(model).filter(model.row_version > known):
+                    if row.is_resolved:
+                        target.remove(row.id)
+                    else:
+                        target.add(compact.from_row(row))
+                index.versions[table] = version
+                index.epochs[table] = epoch
+            return index
+
+    @staticmethod
+    def _item_table_versions(session: Session) -> Dict[str, Tuple[int, Optional[str]]]:
+        """失物表、招领表的 (变更版本号, epoch)（从未变更过为 (0, None)）"""
+        TableVersionDB = models_db.TableVersionDB
+        names = [models_db.LostItemDB.__tablename__, models_db.FoundItemDB.__tablename__]
+        versions = dict.fromkeys(names, (0, None))
+        versions.update((row.name, (row.version, row.epoch)) for row in session.execute(
+            select(TableVersionDB.name, TableVersionDB.version, TableVersionDB.epoch)
+            .where(TableVersionDB.name.in_(names))))
+        return versions
+
+    def check_match_index(self, session: Session) -> Dict[str, Dict[str, List[int]]]:
+        """比对匹配索引与数据库，返回差异（见 MatchIndex.check）"""
+        with _index_lock:
+            index = _match_indexes.get(self.engine)
+            if index is None:
+                index = MatchIndex()
+            return index.check(self.get_open_lost_items(session), self.get_open_found_items(session))
+
+    def get_open_lost_items(self, session: Session) -> List[CompactLostItem]:
+        """获取所有未解决的失物（按ID排序，__slots__ 版本）"""
+        rows = session.query(models_db.LostItemDB).filter_by(is_resolved=False).order_by(models_db.LostItemDB.id).all()
+        return [CompactLostItem.from_row(r) for r in rows]
+
+    def get_open_found_items(self, session: Session) -> List[CompactFoundItem]:
+        """获取所有未解决的招领（按ID排序，__slots__ 版本）"""
+        rows = session.query(models_db.FoundItemDB).filter_by(is_resolved=False).order_by(models_db.FoundItemDB.id).all()
+        return [CompactFoundItem.from_row(r) for r in rows]
+
+    def get_category_index(self, session: Session, side: str, category: str) -> CategoryIndex:
+        """
+        从数据库构建某类别未解决物品的索引（不使用进程内的匹配索引）
+
+        独立的匹配进程看不到网页进程对匹配索引的更新，按任务现查同类别的候选。
+
+        Args:
+            session: 数据库会话
+            side: 'lost' 或 'found'
+            category: 类别
+        """
+        model = models_db.LostItemDB if side == 'lost' else models_db.FoundItemDB
+        compact = CompactLostItem if side == 'lost' else CompactFoundItem
+        rows = session.query(model).filter_by(is_resolved=False, category=category).order_by(model.id).all()
+        return CategoryIndex((compact.from_row(r) for r in rows), time_field=f"{side}_time")
+
+    def _sync_index(self, side: str, item_id: int, item=None, version: Optional[Tuple[int, str]] = None):
+        """
+        写入提交后同步索引：item 为 None 表示移除（索引尚未构建时无需处理）
+
+        version 为 _bump_version 返回的 (这次写入后的表版本号, epoch)：索引已反映之前的所有版本时随之前进；
+        中间有其他进程的写入时保持不变，由 refresh_match_index 补上这之间的变更
+        """
+        with _index_lock:
+            index = _match_indexes.get(self.engine)
+            if index is None:
+                return
+            target = index.lost if side == 'lost' else index.found
+            if item is None:
+                target.remove(item_id)
+            else:
+                target.add(item)
+            table = (models_db.LostItemDB if side == 'lost' else models_db.FoundItemDB).__tablename__
+            if version is not None and index.versions.get(table, 0) == version[0] - 1:
+                index.versions[table], index.epochs[table] = version
+
+    @staticmethod
+    def _bump_version(session: Session, model) -> Tuple[int, str]:
+        """在调用方的事务中把表的变更版本号加一（随写入一起提交），返回 (新的版本号, epoch)；epoch 只在创建该行时生成"""
+        stmt = sqlite_insert(models_db.TableVersionDB).values(
+            name=model.__tablename__, version=1, updated_at=datetime.utcnow())
+        return tuple(session.execute(stmt.on_conflict_do_update(index_elements=['name'], set_={
+            'version': models_db.TableVersionDB.version + 1,
+            'updated_at': stmt.excluded.updated_at,
+        }).returning(models_db.TableVersionDB.version, models_db.TableVersionDB.epoch)).one())
+
+    def get_table_version(self, session: Session, model) -> Tuple[int, Optional[datetime], Optional[str]]:
+        """
+        获取表的变更版本号（只读 table_versions 的一行，不访问物品表）
+
+        Returns:
+            (版本号, 最近变更时间 UTC, 该行创建时生成的 epoch)；从未变更过时为 (0, None, None)
+        """
+        TableVersionDB = models_db.TableVersionDB
+        row = session.execute(select(TableVersionDB.version, TableVersionDB.updated_at, TableVersionDB.epoch)
+                              .where(TableVersionDB.name == model.__tablename__)).first()
+        if row is None:
+            return 0, None, None
+        return row.version, row.updated_at, row.epoch
+
+    @staticmethod
+    def _lost_from_row(r: models_db.LostItemDB) -> LostItem:
+        return LostItem(
+            item_id=r.id,
+            user_id=r.user_id,
+            item_name=r.item_name,
+            category=r.category,
+            lost_location=r.lost_location,
+            lost_time=r.lost_time,
+            description=r.description or "",
+            color=r.color,
+            brand=r.brand,
+            token_ids=parse_token_ids(r.description_tokens),
+            category_code=r.category_code,
+            location_code=r.location_code,
+            color_code=r.color_code,
+            brand_code=r.brand_code,
+            location_levels=row_location_levels(r),
+        )
+
+    @staticmethod
+    def _found_from_row(r: models_db.FoundItemDB) -> FoundItem:
+        return FoundItem(
+            item_id=r.id,
+            user_id=r.user_id,
+            item_name=r.item_name,
+            category=r.category,
+            found_location=r.found_location,
+            found_time=r.found_time,
+            description=r.description or "",
+            color=r.color,
+            brand=r.brand,
+            token_ids=parse_token_ids(r.description_tokens),
+            category_code=r.category_code,
+            location_code=r.location_code,
+            color_code=r.color_code,
+            brand_code=r.brand_code,
+            location_levels=row_location_levels(r),
+        )
 
     def create_lost_item(self, session: Session, lost: LostItem) -> models_db.LostItemDB:
+        # 先取得这次写入的表版本号，与物品一起写入 row_version（其他进程据此增量同步匹配索引）
+        version = self._bump_version(session, models_db.LostItemDB)
         dbitem = models_db.LostItemDB(
             user_id=lost.user_id,
             item_name=lost.item_name,
@@ -20,15 +248,24 @@ class DatabaseManager:
             lost_location=lost.lost_location,
             lost_time=lost.lost_time,
             description=lost.description,
+            description_tokens=format_token_ids(intern_tokens(session, tokenize(lost.description))),
             color=lost.color,
             brand=lost.brand,
+            **item_codes(session, lost.category, lost.lost_location, lost.color, lost.brand),
+            row_version=version[0],
         )
         session.add(dbitem)
+        session.flush()
+        # 待匹配任务与物品一起提交：匹配完成前服务重启也不会丢失
+        enqueue_match_job(session, 'lost', dbitem.id)
         session.commit()
         session.refresh(dbitem)
+        self._sync_index('lost', dbitem.id, CompactLostItem.from_row(dbitem), version)
         return dbitem
 
     def create_found_item(self, session: Session, found: FoundItem) -> models_db.FoundItemDB:
+        # 先取得这次写入的表版本号，与物品一起写入 row_version（其他进程据此增量同步匹配索引）
+        version = self._bump_version(session, models_db.FoundItemDB)
         dbitem = models_db.FoundItemDB(
             user_id=found.user_id,
             item_name=found.item_name,
@@ -36,42 +273,66 @@ class DatabaseManager:
             found_location=found.found_location,
             found_time=found.found_time,
             description=found.description,
+            description_tokens=format_token_ids(intern_tokens(session, tokenize(found.description))),
             color=found.color,
             brand=found.brand,
+            **item_codes(session, found.category, found.found_location, found.color, found.brand),
+            row_version=version[0],
         )
         session.add(dbitem)
+        session.flush()
+        # 待匹配任务与物品一起提交：匹配完成前服务重启也不会丢失
+        enqueue_match_job(session, 'found', dbitem.id)
         session.commit()
         session.refresh(dbitem)
+        self._sync_index('found', dbitem.id, CompactFoundItem.from_row(dbitem), version)
         return dbitem
 
-    def get_all_found_items(self, session: Session) -> List[FoundItem]:
-        rows = session.query(models_db.FoundItemDB).all()
-        return [FoundItem(
-            item_id=r.id,
-            user_id=r.user_id,
-            item_name=r.item_name,
-            category=r.category,
-            found_location=r.found_location,
-            found_time=r.found_time,
-            description=r.description or "",
-            color=r.color,
-            brand=r.brand,
-        ) for r in rows]
+    def get_all_found_items(self, session: Session, include_resolved: bool = False) -> List[FoundItem]:
+        """获取招领信息（默认只取未解决的，按 (is_resolved, found_time) 组合索引的顺序读取，时间相同按ID）"""
+        query = session.query(models_db.FoundItemDB)
+        if not include_resolved:
+            query = query.filter(models_db.FoundItemDB.is_resolved == False)
+        rows = query.order_by(models_db.FoundItemDB.found_time, models_db.FoundItemDB.id).all()
+        return [self._found_from_row(r) for r in rows]
 
-    def get_all_lost_items(self, session: Session) -> List[LostItem]:
-        """获取所有失物信息"""
-        rows = session.query(models_db.LostItemDB).order_by(models_db.LostItemDB.lost_time.desc()).all()
-        return [LostItem(
-            item_id=r.id,
-            user_id=r.user_id,
-            item_name=r.item_name,
-            category=r.category,
-            lost_location=r.lost_location,
-            lost_time=r.lost_time,
-            description=r.description or "",
-            color=r.color,
-            brand=r.brand,
-        ) for r in rows]
+    def get_all_lost_items(self, session: Session, include_resolved: bool = False) -> List[LostItem]:
+        """获取失物信息（默认只取未解决的，按 (is_resolved, lost_time) 组合索引的顺序读取，时间相同按ID）"""
+        query = session.query(models_db.LostItemDB)
+        if not include_resolved:
+            query = query.filter(models_db.LostItemDB.is_resolved == False)
+        rows = query.order_by(models_db.LostItemDB.lost_time, models_db.LostItemDB.id).all()
+        return [self._lost_from_row(r) for r in rows]
+
+    @staticmethod
+    def _found_dict(r: models_db.FoundItemDB) -> dict:
+        return {
+            "id": r.id,
+            "user_id": r.user_id,
+            "item_name": r.item_name,
+            "category": r.category,
+            "found_location": r.found_location,
+            "found_time": r.found_time.isoformat(),
+            "description": r.description or "",
+            "color": r.color,
+            "brand": r.brand,
+            "is_resolved": r.is_resolved,
+        }
+
+    @staticmethod
+    def _lost_dict(r: models_db.LostItemDB) -> dict:
+        return {
+            "id": r.id,
+            "user_id": r.user_id,
+            "item_name": r.item_name,
+            "category": r.category,
+            "lost_location": r.lost_location,
+            "lost_time": r.lost_time.isoformat(),
+            "description": r.description or "",
+            "color": r.color,
+            "brand": r.brand,
+            "is_resolved": r.is_resolved,
+        }
 
     def get_all_found_items_dict(self, session: Session, include_resolved: bool = False):
         """获取所有招领信息（返回字典格式，用于API）"""
@@ -79,21 +340,7 @@ class DatabaseManager:
         if not include_resolved:
             query = query.filter_by(is_resolved=False)
         rows = query.order_by(models_db.FoundItemDB.found_time.desc()).all()
-        return [
-            {
-                "id": r.id,
-                "user_id": r.user_id,
-                "item_name": r.item_name,
-                "category": r.category,
-                "found_location": r.found_location,
-                "found_time": r.found_time.isoformat(),
-                "description": r.description or "",
-                "color": r.color,
-                "brand": r.brand,
-                "is_resolved": r.is_resolved,
-            }
-            for r in rows
-        ]
+        return [self._found_dict(r) for r in rows]
 
     def get_all_lost_items_dict(self, session: Session, include_resolved: bool = False):
         """获取所有失物信息（返回字典格式，用于API）"""
@@ -101,21 +348,108 @@ class DatabaseManager:
         if not include_resolved:
             query = query.filter_by(is_resolved=False)
         rows = query.order_by(models_db.LostItemDB.lost_time.desc()).all()
-        return [
-            {
-                "id": r.id,
-                "user_id": r.user_id,
-                "item_name": r.item_name,
-                "category": r.category,
-                "lost_location": r.lost_location,
-                "lost_time": r.lost_time.isoformat(),
-                "description": r.description or "",
-                "color": r.color,
-                "brand": r.brand,
-                "is_resolved": r.is_resolved,
-            }
-            for r in rows
-        ]
+        return [self._lost_dict(r) for r in rows]
+
+    def iter_items(self, session: Session, side: str, include_resolved: bool = False,
+                   batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+        """
+        按ID顺序逐条产出全部失物或招领（字典格式同 get_all_*_items_dict，用于流式导出）
+
+        只查询需要的列，并用 yield_per 每次从游标取 batch_size 行，
+        内存占用与表的大小无关。迭代结束前 session 必须保持打开。
+
+        Args:
+            session: 数据库会话
+            side: 'lost' 或 'found'
+            include_resolved: 是否包含已解决的
+            batch_size: 每批从数据库读取的行数
+        """
+        model = models_db.LostItemDB if side == 'lost' else models_db.FoundItemDB
+        to_dict = self._lost_dict if side == 'lost' else self._found_dict
+        location, when = ('lost_location', 'lost_time') if side == 'lost' else ('found_location', 'found_time')
+        columns = [getattr(model, name) for name in (
+            'id', 'user_id', 'item_name', 'category', location, when,
+            'description', 'color', 'brand', 'is_resolved')]
+        query = select(*columns).order_by(model.id).execution_options(yield_per=batch_size)
+        if not include_resolved:
+            query = query.where(model.is_resolved == False)
+        for row in session.execute(query):
+            yield to_dict(row)
+
+    def get_items_page(self, session: Session, side: str, cursor: Optional[str] = None,
+                       limit: int = PAGE_SIZE, include_resolved: bool = False) -> Page:
+        """
+        按时间倒序分页获取失物或招领（字典格式，用于API）
+
+        Args:
+            session: 数据库会话
+            side: 'lost' 或 'found'
+            cursor: 上一页返回的 next_cursor，None 表示第一页
+            limit: 每页条数
+            include_resolved: 是否包含已解决的
+
+        Returns:
+            Page，items 为字典列表（格式同 get_all_*_items_dict）
+
+        Raises:
+            ValueError: 游标无效
+        """
+        model = models_db.LostItemDB if side == 'lost' else models_db.FoundItemDB
+        to_dict = self._lost_dict if side == 'lost' else self._found_dict
+        query = session.query(model)
+        if not include_resolved:
+            query = query.filter(model.is_resolved == False)
+        page = keyset_page(query, self._page_columns(side), cursor, limit)
+        return Page([to_dict(r) for r in page.items], page.next_cursor)
+
+    @staticmethod
+    def _page_columns(side: str) -> list:
+        """分页的排序列：(时间, id)"""
+        model = models_db.LostItemDB if side == 'lost' else models_db.FoundItemDB
+        return [model.lost_time if side == 'lost' else model.found_time, model.id]
+
+    def check_items_cursor(self, side: str, cursor: Optional[str]):
+        """
+        只检查分页游标的格式，不查询数据库（条件 GET 在返回 304 之前用它拒绝无效游标）
+
+        Raises:
+            ValueError: 游标无效
+        """
+        if cursor:
+            decode_cursor(cursor, self._page_columns(side))
+
+    def search_items(self, session: Session, side: str, search: str, limit: int = 50,
+                     category: Optional[str] = None, include_resolved: bool = False,
+                     ranked: bool = True) -> List[dict]:
+        """
+        搜索失物或招领（默认按全文索引的 BM25 相关度排序；ranked 为 False 或单字退回 LIKE 时按时间倒序）
+
+        Args:
+            session: 数据库会话
+            side: 'lost' 或 'found'
+            search: 搜索文本
+            limit: 最多返回条数
+            category: 只返回该类别
+            include_resolved: 是否包含已解决的
+            ranked: 是否按相关度排序（False 时按时间倒序，只用索引过滤、不计算得分）
+
+        Returns:
+            字典列表（格式同 get_all_*_items_dict），按相关度排序时附带 score（越大越相关）
+        """
+        model = models_db.LostItemDB if side == 'lost' else models_db.FoundItemDB
+        time_column = model.lost_time if side == 'lost' else model.found_time
+        to_dict = self._lost_dict if side == 'lost' else self._found_dict
+        query = session.query(model)
+        if not include_resolved:
+            query = query.filter(model.is_resolved == False)
+        if category:
+            query = query.filter(model.category == category)
+        query, rank = apply_search(session, query, side, search, ranked)
+        if rank is None:
+            return [to_dict(r) for r in query.order_by(time_column.desc(), model.id.desc()).limit(limit)]
+        rows = query.add_columns(rank).order_by(rank, model.id).limit(limit).all()
+        # bm25() 越小越相关，对外取相反数
+        return [dict(to_dict(r), score=-score) for r, score in rows]
 
     def create_match_record(self, session: Session, record: MatchRecord) -> models_db.MatchRecordDB:
         dbrec = models_db.MatchRecordDB(
@@ -129,6 +463,115 @@ class DatabaseManager:
         session.refresh(dbrec)
         return dbrec
 
+    def create_match_records(self, session: Session, records: List[MatchRecord],
+                             notify: Optional[MatchNotifier] = None,
+                             commit: bool = True) -> List[models_db.MatchRecordDB]:
+        """
+        批量保存一次发布产生的匹配结果，并（可选）发送匹配通知，整个过程只提交一次
+
+        匹配记录用一条多行 INSERT ... ON CONFLICT DO NOTHING 写入、再用一条 IN 查询取回；
+        已保存过的 (失物, 招领) 对（如失物与招领几乎同时发布，两边的任务互相匹配到对方）
+        由唯一索引 ux_match_records_pair 跳过，不重复保存也不重复通知。
+        涉及的失物、招领各用一条 IN 查询取出；notify 以 (session, [(匹配记录, 失物, 招领), ...]) 调用一次，
+        不能自行提交（如 partial(notification_agent.notify_on_matches, commit=False)）。
+        执行的语句条数与匹配数量无关（ORM 逐个对象 flush 时每条记录一条 INSERT）。
+
+        Args:
+            commit: 是否提交；为 False 时由调用方与其他写入一起提交（返回的记录在提交前读取不会再查询）
+
+        Returns:
+            这次新保存的 MatchRecordDB 列表，顺序与 records 一致（已存在的对不在其中）
+        """
+        if not records:
+            return []
+        MatchRecordDB = models_db.MatchRecordDB
+        ids = []
+        for i in range(0, len(records), MATCH_INSERT_BATCH):
+            ids.extend(session.execute(sqlite_insert(MatchRecordDB).values([
+                {
+                    "lost_item_id": r.lost_item_id,
+                    "found_item_id": r.found_item_id,
+                    "match_score": r.match_score,
+                    "match_reason": r.match_reason,
+                    "is_notified": False,
+                    "created_at": datetime.utcnow(),
+                }
+                for r in records[i:i + MATCH_INSERT_BATCH]
+            ]).on_conflict_do_nothing(
+                index_elements=[MatchRecordDB.lost_item_id, MatchRecordDB.found_item_id]
+            ).returning(MatchRecordDB.id)).scalars())
+        if not ids:
+            return []
+        # 同一条 INSERT 中的行按 VALUES 顺序分配递增的ID，按ID排序即 records 的顺序
+        rows = session.query(MatchRecordDB).filter(MatchRecordDB.id.in_(ids)).order_by(MatchRecordDB.id).all()
+        if notify is not None:
+            lost_items = self._rows_by_id(session, models_db.LostItemDB, {r.lost_item_id for r in rows})
+            found_items = self._rows_by_id(session, models_db.FoundItemDB, {r.found_item_id for r in rows})
+            notify(session, [
+                (row, lost_items[row.lost_item_id], found_items[row.found_item_id])
+                for row in rows
+                if row.lost_item_id in lost_items and row.found_item_id in found_items
+            ])
+        if commit:
+            session.commit()
+        return rows
+
+    @staticmethod
+    def _rows_by_id(session: Session, model, ids) -> Dict[int, object]:
+        """按ID批量取出（一条 IN 查询），已在会话中的对象不重复加载"""
+        return {row.id: row for row in session.query(model).filter(model.id.in_(list(ids)))}
+
+    def merge_match_records(self, session: Session, lost_item_ids: List[int],
+                            records: List[MatchRecord], prune: bool = False) -> Dict[str, int]:
+        """
+        批量合并一组失物的匹配结果（单个事务）
+
+        已存在的 (失物, 招领) 记录只更新分数和理由（保留通知状态），不存在的批量插入；
+        prune=True 时删除这些失物下本次未再匹配到的旧记录。
+
+        Returns:
+            {'inserted': n, 'updated': n, 'deleted': n}
+        """
+        MatchRecordDB = models_db.MatchRecordDB
+        existing = {}
+        if lost_item_ids:
+            existing = {
+                (lost_id, found_id): rec_id
+                for rec_id, lost_id, found_id in session.query(
+                    MatchRecordDB.id, MatchRecordDB.lost_item_id, MatchRecordDB.found_item_id
+                ).filter(MatchRecordDB.lost_item_id.in_(lost_item_ids))
+            }
+        updates, inserts = [], []
+        for r in records:
+            rec_id = existing.pop((r.lost_item_id, r.found_item_id), None)
+            if rec_id is None:
+                inserts.append({
+                    "lost_item_id": r.lost_item_id,
+                    "found_item_id": r.found_item_id,
+                    "match_score": r.match_score,
+                    "match_reason": r.match_reason,
+                    "is_notified": False,
+                    "created_at": datetime.utcnow(),
+                })
+            else:
+                updates.append({"id": rec_id, "match_score": r.match_score, "match_reason": r.match_reason})
+        if updates:
+            session.execute(update(MatchRecordDB), updates)
+        if inserts:
+            # 读取已有记录之后、写入之前，发布时的匹配任务可能已保存了同一对：改为更新，不违反唯一索引
+            stmt = sqlite_insert(MatchRecordDB)
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=[MatchRecordDB.lost_item_id, MatchRecordDB.found_item_id],
+                set_={"match_score": stmt.excluded.match_score, "match_reason": stmt.excluded.match_reason},
+            ), inserts)
+        deleted = 0
+        if prune and existing:
+            deleted = session.query(MatchRecordDB).filter(
+                MatchRecordDB.id.in_(list(existing.values()))
+            ).delete(synchronize_session=False)
+        session.commit()
+        return {"inserted": len(inserts), "updated": len(updates), "deleted": deleted}
+
     def get_match_records_by_lost_item(self, session: Session, lost_item_id: int):
         rows = session.query(models_db.MatchRecordDB).filter_by(lost_item_id=lost_item_id).order_by(models_db.MatchRecordDB.match_score.desc()).all()
         return [
@@ -142,6 +585,24 @@ class DatabaseManager:
             for r in rows
         ]
 
+    def get_matches_with_found_items(self, session: Session, lost_item_id: int
+                                     ) -> List[Tuple[models_db.MatchRecordDB, models_db.FoundItemDB]]:
+        """
+        获取某失物的匹配记录及对应的招领（一条 JOIN 查询，按匹配分数从高到低）
+
+        Args:
+            session: 数据库会话
+            lost_item_id: 失物ID
+
+        Returns:
+            (匹配记录, 招领) 列表；招领已被删除的匹配记录不返回
+        """
+        return session.query(models_db.MatchRecordDB, models_db.FoundItemDB).join(
+            models_db.FoundItemDB, models_db.FoundItemDB.id == models_db.MatchRecordDB.found_item_id
+        ).filter(
+            models_db.MatchRecordDB.lost_item_id == lost_item_id
+        ).order_by(models_db.MatchRecordDB.match_score.desc(), models_db.MatchRecordDB.id).all()
+
     # 用户相关操作方法
     def create_user(self, session: Session, user: User, password_hash: str) -> models_db.UserDB:
         """创建新用户"""
@@ -189,7 +650,11 @@ class DatabaseManager:
         return False
 
     def get_unread_notification_count(self, session: Session, user_id: int) -> int:
-        """获取用户未读通知数量"""
+        """获取用户未读通知数量（读取触发器维护的计数；用户不存在时按通知表统计）"""
+        count = session.execute(select(models_db.UserDB.unread_notifications)
+                                .where(models_db.UserDB.id == user_id)).scalar()
+        if count is not None:
+            return count
         return session.query(models_db.NotificationDB).filter(
             models_db.NotificationDB.user_id == user_id,
             models_db.NotificationDB.is_read == False
@@ -202,8 +667,11 @@ class DatabaseManager:
             models_db.LostItemDB.user_id == user_id
         ).first()
         if lost_item:
+            version = self._bump_version(session, models_db.LostItemDB)
             lost_item.is_resolved = resolved
+            lost_item.row_version = version[0]
             session.commit()
+            self._sync_index('lost', lost_item.id, None if resolved else CompactLostItem.from_row(lost_item), version)
             return True
         return False
 
@@ -214,8 +682,11 @@ class DatabaseManager:
             models_db.FoundItemDB.user_id == user_id
         ).first()
         if found_item:
+            version = self._bump_version(session, models_db.FoundItemDB)
             found_item.is_resolved = resolved
+            found_item.row_version = version[0]
             session.commit()
+            self._sync_index('found', found_item.id, None if resolved else CompactFoundItem.from_row(found_item), version)
             return True
         return False
 
@@ -0,0 +1,270 @@
+"""进程内的物品候选索引，供匹配智能体快速筛选候选"""
+import itertools
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+from ..models import AnyFoundItem, AnyLostItem, prepare_item, to_epoch_us
+
+# 类别为"其他"的物品在匹配规则中永远得0分，因此不进入索引
+UNINDEXED_CATEGORY = "其他"
+
+_HOUR_US = 3600 * 1_000_000
+
+# 没有持久化地点层级的物品在楼宇分组中的键：楼宇未知，任何楼宇查询都包含它们
+_UNKNOWN_BUILDING = object()
+
+Item = Union[AnyFoundItem, AnyLostItem]
+
+
+class CategoryIndex:
+    """
+    按类别分区的未解决物品索引
+
+    每个类别内同时维护按时间排序的 (时间戳, 物品ID) 列表，
+    可以用二分查找直接取出某个时间窗口内的候选。
+    每个物品带一个加入序号 seq，用于同分时保持与全量扫描一致的先后顺序。
+    带有持久化词ID（token_ids）的物品还会登记到类别内的倒排表 {词ID: {物品ID}}。
+    按发布时解析的楼宇编码分组 {楼宇: {物品ID}}，匹配时可以先取同楼宇的候选。
+    """
+
+    def __init__(self, items: Iterable[Item] = (), time_field: str = "found_time"):
+        self._time_field = time_field
+        self._location_field = time_field.replace("_time", "_location")
+        self._lock = threading.RLock()
+        self._seq = itertools.count()
+        self._by_category: Dict[str, Dict[int, Tuple[int, Item]]] = {}
+        self._by_time: Dict[str, List[Tuple[int, int]]] = {}
+        self._position: Dict[int, Tuple[str, int]] = {}
+        self._postings: Dict[str, Dict[int, Set[int]]] = {}
+        self._by_building: Dict[str, Dict[Hashable, Set[int]]] = {}
+        self._building: Dict[int, Hashable] = {}
+        # 批量构建：先按类别追加，最后每个类别排序一次（重复ID以最后一次为准，与 add 一致）
+        pending: Dict[int, Item] = {}
+        for item in items:
+            if item.item_id is not None:
+                pending.pop(item.item_id, None)
+                pending[item.item_id] = item
+        for item in pending.values():
+            if item.category != UNINDEXED_CATEGORY:
+                self._insert(item, sort=False)
+        for times in self._by_time.values():
+            times.sort()
+
+    def add(self, item: Item):
+        """加入（或替换）一个物品"""
+        if item.item_id is None:
+            return
+        with self._lock:
+            self.remove(item.item_id)
+            if item.category != UNINDEXED_CATEGORY:
+                self._insert(item, sort=True)
+
+    def _insert(self, item: Item, sort: bool):
+        prepare_item(item)
+        ts = to_epoch_us(getattr(item, self._time_field))
+        self._by_category.setdefault(item.category, {})[item.item_id] = (next(self._seq), item)
+        times = self._by_time.setdefault(item.category, [])
+        if sort:
+            times.insert(bisect_right(times, (ts, item.item_id)), (ts, item.item_id))
+        else:
+            times.append((ts, item.item_id))
+        self._position[item.item_id] = (item.category, ts)
+        levels = item.location_levels
+        building = levels[1] if levels is not None else _UNKNOWN_BUILDING
+        self._by_building.setdefault(item.category, {}).setdefault(building, set()).add(item.item_id)
+        self._building[item.item_id] = building
+        if item.token_ids:
+            postings = self._postings.setdefault(item.category, {})
+            for token in item.token_ids:
+                postings.setdefault(token, set()).add(item.item_id)
+
+    def remove(self, item_id: int):
+        """移除一个物品（不存在时忽略）"""
+        with self._lock:
+            position = self._position.pop(item_id, None)
+            if position is None:
+                return
+            category, ts = position
+            bucket = self._by_category[category]
+            _, item = bucket.pop(item_id)
+            times = self._by_time[category]
+            del times[bisect_left(times, (ts, item_id))]
+            buildings = self._by_building[category]
+            building = self._building.pop(item_id)
+            buildings[building].discard(item_id)
+            if not buildings[building]:
+                del buildings[building]
+            if item.token_ids:
+                postings = self._postings[category]
+                for token in item.token_ids:
+                    owners = postings[token]
+                    owners.discard(item_id)
+                    if not owners:
+                        del postings[token]
+            if not bucket:
+                del self._by_category[category]
+                del self._by_time[category]
+                self._postings.pop(category, None)
+                del self._by_building[category]
+
+    def candidates(self, category: str) -> List[Item]:
+        """返回与该类别可能匹配的物品（按加入顺序）"""
+        return [item for _, item in self.ranked_candidates(category)]
+
+    def ranked_candidates(self, category: str) -> List[Tuple[int, Item]]:
+        """返回 (seq, 物品) 列表（按加入顺序）"""
+        if category == UNINDEXED_CATEGORY:
+            return []
+        with self._lock:
+            return list(self._by_category.get(category, {}).values())
+
+    def time_tiers(self, category: str, when: int, tiers: Sequence[Tuple[int, float]],
+                   floor: float) -> Iterator[Tuple[float, List[Tuple[int, Item]]]]:
+        """
+        按时间分档从高分到低分依次产出候选
+
+        Args:
+            category: 类别
+            when: 参照时间（int64 微秒时间戳）
+            tiers: [(小时上限, 分数), ...]，小时上限递增
+            floor: 超出所有分档时的分数
+
+        Yields:
+            (该档时间分, 该档内的 (seq, 物品) 列表)
+        """
+        if category == UNINDEXED_CATEGORY:
+            return
+        with self._lock:
+            bucket = self._by_category.get(category)
+            if not bucket:
+                return
+            times = self._by_time[category]
+            bounds = []
+            for hours, _ in tiers:
+                span = hours * _HOUR_US
+                bounds.append((bisect_left(times, (when - span,)),
+                               bisect_right(times, (when + span, float("inf")))))
+            slices = []
+            lo, hi = bounds[0]
+            slices.append((tiers[0][1], [times[lo:hi]]))
+            for (outer_lo, outer_hi), (_, score) in zip(bounds[1:], tiers[1:]):
+                slices.append((score, [times[outer_lo:lo], times[hi:outer_hi]]))
+                lo, hi = outer_lo, outer_hi
+            slices.append((floor, [times[:lo], times[hi:]]))
+            tiered = [(score, [bucket[item_id] for part in parts for _, item_id in part])
+                      for score, parts in slices]
+        for score, entries in tiered:
+            if entries:
+                yield score, entries
+
+    def building_members(self, category: str, building: Optional[Hashable]) -> Set[int]:
+        """
+        同类别、同楼宇的物品ID（building 为 location_levels 中的楼宇编码），
+        包括没有持久化地点层级、楼宇未知的物品
+        """
+        with self._lock:
+            buildings = self._by_building.get(category, {})
+            return set(buildings.get(building, ())) | buildings.get(_UNKNOWN_BUILDING, set())
+
+    def keyword_overlap(self, category: str, token_ids: Iterable[int]) -> Dict[int, int]:
+        """
+        沿倒排表统计同类别物品与给定词ID的共同词数
+
+        Args:
+            category: 类别
+            token_ids: 去重后的词ID
+
+        Returns:
+            {物品ID: 共同词数}，只包含至少有一个共同词的物品；
+            没有 token_ids 的物品不在倒排表中，需要逐对计算
+        """
+        counts: Dict[int, int] = {}
+        with self._lock:
+            postings = self._postings.get(category)
+            if not postings:
+                return counts
+            for token in token_ids:
+                for item_id in postings.get(token, ()):
+                    counts[item_id] = counts.get(item_id, 0) + 1
+        return counts
+
+    def snapshot(self) -> Dict[int, Item]:
+        """当前索引内容 {物品ID: 物品}"""
+        with self._lock:
+            return {item_id: item for bucket in self._by_category.values()
+                    for item_id, (_, item) in bucket.items()}
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._position
+
+    def __len__(self) -> int:
+        return len(self._position)
+
+
+class MatchIndex:
+    """
+    常驻内存的匹配索引：未解决失物与未解决招领各一个 CategoryIndex
+
+    由 DatabaseManager 在启动时预热、在发布/标记解决时同步更新，
+    匹配时只读内存，不再访问数据库。
+
+    versions 记录索引已反映的物品表变更版本号（表名 -> table_versions 中的版本号），
+    与数据库中的不一致说明有其他进程写入过，需要补上 row_version 更大的行；
+    epochs 记录对应的 epoch，变化说明数据库已重建，需要从头构建。
+    """
+
+    def __init__(self, lost_items: Iterable[AnyLostItem] = (), found_items: Iterable[AnyFoundItem] = (),
+                 versions: Optional[Dict[str, int]] = None, epochs: Optional[Dict[str, Optional[str]]] = None):
+        self.lost = CategoryIndex(lost_items, time_field="lost_time")
+        self.found = CategoryIndex(found_items, time_field="found_time")
+        self.versions: Dict[str, int] = dict(versions or {})
+        self.epochs: Dict[str, Optional[str]] = dict(epochs or {})
+
+    def same_epoch(self, table: str, epoch: Optional[str]) -> bool:
+        """
+        数据库中该表的 epoch 是否仍是构建索引时的那个
+
+        构建时该表还没有版本行（从未写入过，epoch 为 None）且之后没有同步过本进程写入的，
+        库中的行都带 row_version，可以增量同步
+        """
+        known = self.epochs.get(table)
+        if known is None and self.versions.get(table, 0) == 0:
+            return True
+        return known == epoch
+
+    def check(self, lost_items: Iterable[AnyLostItem], found_items: Iterable[AnyFoundItem]) -> Dict[str, Dict[str, List[int]]]:
+        """
+        与数据库中的未解决物品比对
+
+        Returns:
+            {'lost': {...}, 'found': {...}}，每项包含 missing（库中有索引中无）、
+            extra（索引中有库中无）、stale（内容不一致）三个ID列表
+        """
+        return {
+            'lost': self._diff(self.lost, lost_items),
+            'found': self._diff(self.found, found_items),
+        }
+
+    @staticmethod
+    def _diff(index: CategoryIndex, items: Iterable[Item]) -> Dict[str, List[int]]:
+        indexed = index.snapshot()
+        missing, stale = [], []
+        seen = set()
+        for item in items:
+            seen.add(item.item_id)
+            if item.category == UNINDEXED_CATEGORY:
+                if item.item_id in indexed:
+                    stale.append(item.item_id)
+                continue
+            current = indexed.get(item.item_id)
+            if current is None:
+                missing.append(item.item_id)
+            elif current != item:
+                stale.append(item.item_id)
+        extra = sorted(item_id for item_id in indexed if item_id not in seen)
+        return {'missing': sorted(missing), 'extra': extra, 'stale': sorted(stale)}
+
+    @staticmethod
+    def is_consistent(report: Dict[str, Dict[str, List[int]]]) -> bool:
+        """check() 的结果中没有任何差异"""
+        return not any(ids for side in report.values() for ids in side.values())
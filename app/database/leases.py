@@ -0,0 +1,55 @@
+"""
+定时任务租约
+
+部署多个服务进程时，每个进程都运行调度器；任务到期时先抢租约，只有持有者执行。
+抢租约是一条 INSERT ... ON CONFLICT DO UPDATE：租约已过期或本来就属于自己时才改写，
+SQLite 同一时刻只有一个写事务，同一租约不会被两个进程同时拿到。
+持有者退出后租约到期，其他进程接手。
+"""
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from . import models_db
+
+_Lease = models_db.SchedulerLeaseDB
+
+
+def acquire_lease(session: Session, name: str, owner: str, until: datetime,
+                  now: Optional[datetime] = None) -> bool:
+    """
+    获取或续期租约并提交
+
+    Args:
+        session: 数据库会话
+        name: 租约名称（任务名称）
+        owner: 持有者标识
+        until: 租约到期时间（UTC）
+        now: 当前时间（UTC，测试用）
+
+    Returns:
+        是否持有租约
+    """
+    now = now or datetime.utcnow()
+    stmt = sqlite_insert(_Lease).values(name=name, owner=owner, leased_until=until)
+    result = session.execute(stmt.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'owner': stmt.excluded.owner, 'leased_until': stmt.excluded.leased_until},
+        where=or_(_Lease.leased_until < now, _Lease.owner == owner)))
+    session.commit()
+    return result.rowcount == 1
+
+
+def renew_lease(session: Session, name: str, owner: str, until: datetime) -> bool:
+    """把自己持有的租约改为在 until 到期并提交，返回租约是否仍属于自己"""
+    result = session.execute(update(_Lease).where(_Lease.name == name, _Lease.owner == owner)
+                             .values(leased_until=until).execution_options(synchronize_session=False))
+    session.commit()
+    return result.rowcount == 1
+
+
+def get_leases(session: Session) -> Dict[str, Tuple[str, datetime]]:
+    """所有租约：名称 -> (持有者, 到期时间)"""
+    return {row.name: (row.owner, row.leased_until)
+            for row in session.execute(select(_Lease.name, _Lease.owner, _Lease.leased_until))}
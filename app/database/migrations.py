@@ -0,0 +1,218 @@
+"""
+数据库结构迁移
+
+create_all 只会创建缺失的表，不会给已有的表加列或回填数据。
+这里按版本号依次执行迁移，当前版本记录在 SQLite 的 PRAGMA user_version 中；
+每个迁移都要能在新建的数据库上安全执行（列已存在时跳过，只做回填）。
+"""
+from typing import Callable, List, Tuple
+from sqlalchemy import bindparam, inspect, select, update
+from sqlalchemy.engine import Connection, Engine
+from . import models_db
+from .counters import create_unread_counter
+from .search import create_fulltext_index
+from .vocabulary import attribute_values, intern_codes, intern_vocabulary, level_values
+from ..campus import LOCATION_LEVELS
+from ..models import CODE_KINDS, format_token_ids, tokenize
+
+_BATCH = 1000
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str):
+    """表中没有该列时执行 ALTER TABLE ADD COLUMN"""
+    if column not in {c['name'] for c in inspect(conn).get_columns(table)}:
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+def _backfill_description_tokens(conn: Connection, model):
+    """给尚未分词的物品写入 description_tokens"""
+    while True:
+        rows = conn.execute(select(model.id, model.description)
+                            .where(model.description_tokens.is_(None)).limit(_BATCH)).all()
+        if not rows:
+            return
+        words = {row.id: set(tokenize(row.description)) for row in rows}
+        vocab = intern_vocabulary(conn, (w for ws in words.values() for w in ws))
+        conn.execute(update(model).where(model.id == bindparam('row_id'))
+                     .values(description_tokens=bindparam('tokens')), [
+            {'row_id': item_id, 'tokens': format_token_ids(sorted(vocab[w] for w in ws))}
+            for item_id, ws in words.items()
+        ])
+
+
+def _description_tokens(conn: Connection):
+    """版本1：描述词表 tokens + description_tokens 列"""
+    models_db.TokenDB.__table__.create(conn, checkfirst=True)
+    for model in (models_db.LostItemDB, models_db.FoundItemDB):
+        _add_column(conn, model.__tablename__, 'description_tokens', 'TEXT')
+        _backfill_description_tokens(conn, model)
+
+
+def _backfill_attribute_codes(conn: Connection, model, location_column):
+    """给尚未编码的物品写入类别/地点/颜色/品牌编码"""
+    last_id = 0
+    while True:
+        # 按ID推进（类别为空的行编码后仍为 NULL，不能靠 IS NULL 条件结束循环）
+        rows = conn.execute(select(model.id, model.category, location_column, model.color, model.brand)
+                            .where(model.category_code.is_(None), model.id > last_id)
+                            .order_by(model.id).limit(_BATCH)).all()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        values = {row[0]: attribute_values(*row[1:]) for row in rows}
+        codes = intern_codes(conn, [(kind, value) for vs in values.values()
+                                    for kind, value in vs.items() if value is not None])
+        conn.execute(update(model).where(model.id == bindparam('row_id')).values(
+            **{f"{kind}_code": bindparam(f"new_{kind}") for kind in CODE_KINDS}), [
+            dict(row_id=item_id, **{f"new_{kind}": codes.get((kind, value)) for kind, value in vs.items()})
+            for item_id, vs in values.items()
+        ])
+
+
+def _attribute_codes(conn: Connection):
+    """版本2：属性编码表 attribute_codes + 各物品表的 *_code 列"""
+    models_db.AttributeCodeDB.__table__.create(conn, checkfirst=True)
+    for model, location_column in ((models_db.LostItemDB, models_db.LostItemDB.lost_location),
+                                   (models_db.FoundItemDB, models_db.FoundItemDB.found_location)):
+        for kind in CODE_KINDS:
+            _add_column(conn, model.__tablename__, f"{kind}_code", 'INTEGER')
+        _backfill_attribute_codes(conn, model, location_column)
+
+
+def _backfill_location_levels(conn: Connection, model, location_column):
+    """解析已有物品的地点，写入各层级的编码（空的层级为 NULL，按ID推进）"""
+    last_id = 0
+    while True:
+        rows = conn.execute(select(model.id, location_column)
+                            .where(model.id > last_id).order_by(model.id).limit(_BATCH)).all()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        values = {row[0]: level_values(row[1]) for row in rows}
+        codes = intern_codes(conn, [(level, value) for vs in values.values()
+                                    for level, value in vs.items() if value is not None])
+        conn.execute(update(model).where(model.id == bindparam('row_id')).values(
+            **{f"{level}_code": bindparam(f"new_{level}") for level in LOCATION_LEVELS}), [
+            dict(row_id=item_id, **{f"new_{level}": codes.get((level, value)) for level, value in vs.items()})
+            for item_id, vs in values.items()
+        ])
+
+
+def _location_levels(conn: Connection):
+    """版本3：物品表的地点层级编码列 *_code（发布时解析地点，见 campus.py）"""
+    for model, location_column in ((models_db.LostItemDB, models_db.LostItemDB.lost_location),
+                                   (models_db.FoundItemDB, models_db.FoundItemDB.found_location)):
+        for level in LOCATION_LEVELS:
+            _add_column(conn, model.__tablename__, f"{level}_code", 'INTEGER')
+        _backfill_location_levels(conn, model, location_column)
+
+
+def _query_indexes(conn: Connection):
+    """
+    版本4：热点查询的组合索引（定义见 models_db 各表的 __table_args__）
+
+    唯一索引要先去重（版本9），建在之后的迁移才添加的列上的索引由那个迁移创建（版本7）。
+    """
+    for model in (models_db.LostItemDB, models_db.FoundItemDB, models_db.MatchRecordDB, models_db.NotificationDB):
+        columns = {c['name'] for c in inspect(conn).get_columns(model.__tablename__)}
+        for index in model.__table__.indexes:
+            if not index.unique and all(c.name in columns for c in index.columns):
+                index.create(conn, checkfirst=True)
+
+
+def _fulltext_search(conn: Connection):
+    """版本5：物品全文索引（二元分词 FTS5 表，由 ORM 写入事件同步，见 search.py）"""
+    create_fulltext_index(conn)
+
+
+def _table_versions(conn: Connection):
+    """版本6：表变更版本号 table_versions（条件 GET 的 ETag 来源）"""
+    models_db.TableVersionDB.__table__.create(conn, checkfirst=True)
+
+
+def _item_row_versions(conn: Connection):
+    """
+    版本7：物品表的 row_version 列及索引（其他进程据此增量同步匹配索引）
+
+    已有的行保持 NULL：它们在进程启动构建索引时已全部读入，之后的写入才需要增量同步。
+    """
+    for model in (models_db.LostItemDB, models_db.FoundItemDB):
+        _add_column(conn, model.__tablename__, 'row_version', 'INTEGER')
+        for index in model.__table__.indexes:
+            if [c.name for c in index.columns] == ['row_version']:
+                index.create(conn, checkfirst=True)
+
+
+def _match_jobs(conn: Connection):
+    """版本8：待匹配任务表 match_jobs（outbox，见 outbox.py）"""
+    models_db.MatchJobDB.__table__.create(conn, checkfirst=True)
+
+
+def _unique_match_pairs(conn: Connection):
+    """
+    版本9：match_records 的 (失物, 招领) 唯一索引
+
+    先去掉重复的对：每对保留ID最小的一条，重复记录中有已通知的则保留的一条也算已通知，
+    指向被删记录的通知改为指向保留的一条。
+    """
+    keep = "SELECT MIN(id) FROM match_records GROUP BY lost_item_id, found_item_id"
+    conn.exec_driver_sql(
+        "UPDATE match_records SET is_notified = 1 WHERE id IN ("
+        "SELECT MIN(id) FROM match_records GROUP BY lost_item_id, found_item_id "
+        "HAVING COUNT(*) > 1 AND MAX(is_notified) = 1)")
+    conn.exec_driver_sql(
+        "UPDATE notifications SET related_match_id = ("
+        "SELECT MIN(kept.id) FROM match_records AS dup JOIN match_records AS kept "
+        "ON kept.lost_item_id = dup.lost_item_id AND kept.found_item_id = dup.found_item_id "
+        "WHERE dup.id = notifications.related_match_id) "
+        f"WHERE related_match_id IN (SELECT id FROM match_records WHERE id NOT IN ({keep}))")
+    conn.exec_driver_sql(f"DELETE FROM match_records WHERE id NOT IN ({keep})")
+    for index in models_db.MatchRecordDB.__table__.indexes:
+        if index.unique:
+            index.create(conn, checkfirst=True)
+
+
+def _reminder_ledger(conn: Connection):
+    """版本10：未解决提醒的发送记录 reminder_ledger"""
+    models_db.ReminderLedgerDB.__table__.create(conn, checkfirst=True)
+
+
+def _scheduler_leases(conn: Connection):
+    """版本11：定时任务租约表 scheduler_leases（见 leases.py）"""
+    models_db.SchedulerLeaseDB.__table__.create(conn, checkfirst=True)
+
+
+def _unread_counter(conn: Connection):
+    """版本12：用户未读通知计数列与维护触发器（见 counters.py）"""
+    _add_column(conn, 'users', 'unread_notifications', 'INTEGER NOT NULL DEFAULT 0')
+    create_unread_counter(conn)
+
+
+MIGRATIONS: List[Tuple[int, Callable[[Connection], None]]] = [
+    (1, _description_tokens),
+    (2, _attribute_codes),
+    (3, _location_levels),
+    (4, _query_indexes),
+    (5, _fulltext_search),
+    (6, _table_versions),
+    (7, _item_row_versions),
+    (8, _match_jobs),
+    (9, _unique_match_pairs),
+    (10, _reminder_ledger),
+    (11, _scheduler_leases),
+    (12, _unread_counter),
+]
+
+
+def run_migrations(engine: Engine) -> int:
+    """执行尚未执行的迁移，返回迁移后的版本号"""
+    with engine.connect() as conn:
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+    for target, migrate in MIGRATIONS:
+        if target <= version:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {target}")
+        version = target
+    return version
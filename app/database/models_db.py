@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Text, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .db import Base
 from datetime import datetime
+import secrets
 
 
 class UserDB(Base):
@@ -13,10 +14,22 @@ class UserDB(Base):
     password_hash = Column(String(256), nullable=False)  # 密码哈希
     phone = Column(String(64), nullable=True)  # 联系方式
     created_at = Column(DateTime, default=datetime.utcnow)  # 创建时间
+    # 未读通知数量，由 notifications 上的触发器维护（见 counters.py），不要直接修改
+    unread_notifications = Column(Integer, nullable=False, default=0, server_default='0')
 
 
 class LostItemDB(Base):
     __tablename__ = 'lost_items'
+    __table_args__ = (
+        # 首页/详情页：未解决 + 类别筛选，按时间排序
+        Index('ix_lost_items_open_category_time', 'is_resolved', 'category', 'lost_time'),
+        # 首页不筛选类别时：未解决，按时间排序
+        Index('ix_lost_items_open_time', 'is_resolved', 'lost_time'),
+        # 个人主页：某用户发布的物品，按时间排序
+        Index('ix_lost_items_user_time', 'user_id', 'lost_time'),
+        # 其他进程同步匹配索引：读取某个版本号之后写入的行
+        Index('ix_lost_items_row_version', 'row_version'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=True)
     item_name = Column(String(256), nullable=False)
@@ -24,13 +37,36 @@ class LostItemDB(Base):
     lost_location = Column(String(256), nullable=False)
     lost_time = Column(DateTime, default=datetime.utcnow)
     description = Column(Text, nullable=True)
+    description_tokens = Column(Text, nullable=True)  # 描述分词后的词ID（升序、空格分隔，见 TokenDB）
     color = Column(String(64), nullable=True)
     brand = Column(String(128), nullable=True)
+    # 规范化后属性的整数编码（见 AttributeCodeDB），匹配时按整数比较
+    category_code = Column(Integer, nullable=True)
+    location_code = Column(Integer, nullable=True)
+    color_code = Column(Integer, nullable=True)
+    brand_code = Column(Integer, nullable=True)
+    # 发布时解析的地点层级（见 campus.location_levels）的属性编码，空的层级为 NULL
+    campus_code = Column(Integer, nullable=True)
+    building_code = Column(Integer, nullable=True)
+    floor_code = Column(Integer, nullable=True)
+    room_code = Column(Integer, nullable=True)
+    zone_code = Column(Integer, nullable=True)
     is_resolved = Column(Boolean, default=False)
+    row_version = Column(Integer, nullable=True)  # 最近一次写入该行后的表版本号（见 TableVersionDB）
 
 
 class FoundItemDB(Base):
     __tablename__ = 'found_items'
+    __table_args__ = (
+        # 首页/详情页：未解决 + 类别筛选，按时间排序
+        Index('ix_found_items_open_category_time', 'is_resolved', 'category', 'found_time'),
+        # 首页不筛选类别时：未解决，按时间排序
+        Index('ix_found_items_open_time', 'is_resolved', 'found_time'),
+        # 个人主页：某用户发布的物品，按时间排序
+        Index('ix_found_items_user_time', 'user_id', 'found_time'),
+        # 其他进程同步匹配索引：读取某个版本号之后写入的行
+        Index('ix_found_items_row_version', 'row_version'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=True)
     item_name = Column(String(256), nullable=False)
@@ -38,13 +74,81 @@ class FoundItemDB(Base):
     found_location = Column(String(256), nullable=False)
     found_time = Column(DateTime, default=datetime.utcnow)
     description = Column(Text, nullable=True)
+    description_tokens = Column(Text, nullable=True)  # 描述分词后的词ID（升序、空格分隔，见 TokenDB）
     color = Column(String(64), nullable=True)
     brand = Column(String(128), nullable=True)
+    # 规范化后属性的整数编码（见 AttributeCodeDB），匹配时按整数比较
+    category_code = Column(Integer, nullable=True)
+    location_code = Column(Integer, nullable=True)
+    color_code = Column(Integer, nullable=True)
+    brand_code = Column(Integer, nullable=True)
+    # 发布时解析的地点层级（见 campus.location_levels）的属性编码，空的层级为 NULL
+    campus_code = Column(Integer, nullable=True)
+    building_code = Column(Integer, nullable=True)
+    floor_code = Column(Integer, nullable=True)
+    room_code = Column(Integer, nullable=True)
+    zone_code = Column(Integer, nullable=True)
     is_resolved = Column(Boolean, default=False)
+    row_version = Column(Integer, nullable=True)  # 最近一次写入该行后的表版本号（见 TableVersionDB）
+
+
+class TokenDB(Base):
+    __tablename__ = 'tokens'
+    id = Column(Integer, primary_key=True)
+    word = Column(String(256), unique=True, nullable=False)  # 小写后的描述词
+
+
+class AttributeCodeDB(Base):
+    __tablename__ = 'attribute_codes'
+    __table_args__ = (UniqueConstraint('kind', 'value'),)
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(16), nullable=False)  # category, location, color, brand 及地点层级 campus, building, floor, room, zone
+    value = Column(String(256), nullable=False)  # 规范化后的值（颜色/品牌为小写）
+
+
+def new_epoch() -> str:
+    """生成版本号所属的随机标识（重建数据库后版本号从头计数，ETag 靠它区分）"""
+    return secrets.token_hex(8)
+
+
+class TableVersionDB(Base):
+    """表的变更版本号：物品写入/标记解决时加一，用于 API 的 ETag"""
+    __tablename__ = 'table_versions'
+    name = Column(String(64), primary_key=True)  # 表名
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # 最近一次变更时间（UTC）
+    epoch = Column(String(32), nullable=False, default=new_epoch)  # 创建该行时生成，之后不变
+
+
+class MatchJobDB(Base):
+    """待匹配任务（outbox）：与物品在同一事务中写入，由匹配流水线或 scripts/run_match_worker.py 领取执行"""
+    __tablename__ = 'match_jobs'
+    __table_args__ = (
+        # 领取可执行的任务
+        Index('ix_match_jobs_state_lease', 'state', 'leased_until'),
+        # 按物品领取（发布后的进程内匹配）
+        Index('ix_match_jobs_kind_item', 'kind', 'item_id'),
+    )
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(16), nullable=False)  # 任务类型：lost（为失物匹配招领）、found（为招领反向匹配失物）
+    item_id = Column(Integer, nullable=False)  # 物品ID
+    state = Column(String(16), nullable=False, default='pending')  # pending, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)  # 已领取次数
+    lease_owner = Column(String(32), nullable=True)  # 当前租约的持有者（每次领取生成）
+    leased_until = Column(DateTime, nullable=True)  # running：租约到期时间；pending：最早可重试时间（UTC）
+    last_error = Column(Text, nullable=True)  # 最近一次失败的错误信息
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
 
 class MatchRecordDB(Base):
     __tablename__ = 'match_records'
+    __table_args__ = (
+        # 查看某失物的匹配结果，按分数排序
+        Index('ix_match_records_lost_score', 'lost_item_id', 'match_score'),
+        # 同一对 (失物, 招领) 只保存一条，并发的匹配任务用 INSERT ... ON CONFLICT DO NOTHING 写入
+        Index('ux_match_records_pair', 'lost_item_id', 'found_item_id', unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
     lost_item_id = Column(Integer, nullable=False)
     found_item_id = Column(Integer, nullable=False)
@@ -56,6 +160,12 @@ class MatchRecordDB(Base):
 
 class NotificationDB(Base):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        # 未读通知列表/计数
+        Index('ix_notifications_user_read_time', 'user_id', 'is_read', 'created_at'),
+        # 全部通知列表，按时间排序
+        Index('ix_notifications_user_time', 'user_id', 'created_at'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)  # 接收通知的用户ID
     notification_type = Column(String(64), nullable=False)  # 通知类型：match, reminder, announcement
@@ -65,3 +175,20 @@ class NotificationDB(Base):
     related_match_id = Column(Integer, nullable=True)  # 相关匹配记录ID
     is_read = Column(Boolean, default=False)  # 是否已读
     created_at = Column(DateTime, default=datetime.utcnow)  # 创建时间
+
+
+class ReminderLedgerDB(Base):
+    """已发送的未解决提醒：每个物品的每档提醒只发一次"""
+    __tablename__ = 'reminder_ledger'
+    item_type = Column(String(16), primary_key=True)  # lost / found
+    item_id = Column(Integer, primary_key=True)
+    tier = Column(String(16), primary_key=True)  # 提醒档位：reminder（超过7天）、urgent（超过14天）
+    sent_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class SchedulerLeaseDB(Base):
+    """定时任务的执行租约：多个服务进程中只有租约持有者执行该任务"""
+    __tablename__ = 'scheduler_leases'
+    name = Column(String(64), primary_key=True)  # 任务名称
+    owner = Column(String(128), nullable=False)  # 持有者（主机名:进程号:随机后缀）
+    leased_until = Column(DateTime, nullable=False)  # 租约到期时间（UTC）
@@ -0,0 +1,108 @@
+"""
+待匹配任务表（outbox）
+
+发布物品时在同一事务中写入一条 match_jobs，服务在匹配完成前重启也不会丢失任务。
+任务由发布进程内的匹配流水线或独立的 scripts/run_match_worker.py 领取：
+
+- 领取是一条 UPDATE ... RETURNING：SQLite 同一时刻只有一个写事务，
+  多个进程并发领取时同一任务只会被一个进程拿到
+- 领取时写入租约（lease_owner / leased_until），持有者崩溃后租约到期，任务可被重新领取
+- complete_job 只在租约仍属于自己时生效，并与匹配结果一起提交：
+  租约过期后被别人重新领取的任务，原持有者的结果会被丢弃，不会重复写入匹配和通知
+"""
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+from . import models_db
+
+# 每次领取的任务数
+BATCH_SIZE = 20
+# 租约时长（秒）：须覆盖处理一批任务的时间
+LEASE_SECONDS = 60
+# 每个任务最多领取次数，之后标记为 failed
+MAX_ATTEMPTS = 5
+# 失败后再次可被领取前等待的秒数
+RETRY_DELAY = 30
+
+_Job = models_db.MatchJobDB
+
+
+def enqueue_match_job(session: Session, kind: str, item_id: int):
+    """在调用方的事务中写入一条待匹配任务（随物品一起提交）"""
+    session.add(_Job(kind=kind, item_id=item_id, state='pending', attempts=0))
+
+
+def claim_jobs(session: Session, limit: int = BATCH_SIZE, lease_seconds: float = LEASE_SECONDS,
+               max_attempts: int = MAX_ATTEMPTS, kind: Optional[str] = None, item_id: Optional[int] = None,
+               created_before: Optional[datetime] = None, now: Optional[datetime] = None) -> List[Row]:
+    """
+    领取一批可执行的任务并提交
+
+    可执行：pending 且已到重试时间，或 running 但租约已过期（持有者已退出）。
+    租约过期且次数用完的任务先标记为 failed。
+
+    Args:
+        session: 数据库会话
+        limit: 最多领取的任务数
+        lease_seconds: 租约时长（秒）
+        max_attempts: 每个任务最多领取次数
+        kind, item_id: 只领取指定物品的任务（进程内流水线使用，此时不等待重试时间）
+        created_before: 只领取在此之前创建的任务（留给发布进程内的流水线先处理）
+        now: 当前时间（UTC，测试用）
+
+    Returns:
+        领取到的任务行（id, kind, item_id, attempts, lease_owner），按ID排序
+    """
+    now = now or datetime.utcnow()
+    expired = and_(_Job.state == 'running', _Job.leased_until < now)
+    session.execute(update(_Job).where(expired, _Job.attempts >= max_attempts)
+                    .values(state='failed', updated_at=now)
+                    .execution_options(synchronize_session=False))
+
+    if item_id is None:
+        ready = and_(_Job.state == 'pending', or_(_Job.leased_until.is_(None), _Job.leased_until <= now))
+        ids = select(_Job.id).where(or_(ready, expired), _Job.attempts < max_attempts)
+        if created_before is not None:
+            ids = ids.where(_Job.created_at < created_before)
+    else:
+        ids = select(_Job.id).where(_Job.kind == kind, _Job.item_id == item_id,
+                                    or_(_Job.state == 'pending', expired), _Job.attempts < max_attempts)
+    owner = uuid.uuid4().hex
+    rows = session.execute(
+        update(_Job).where(_Job.id.in_(ids.order_by(_Job.id).limit(limit)))
+        .values(state='running', lease_owner=owner, attempts=_Job.attempts + 1,
+                leased_until=now + timedelta(seconds=lease_seconds), updated_at=now)
+        .returning(_Job.id, _Job.kind, _Job.item_id, _Job.attempts, _Job.lease_owner)
+        .execution_options(synchronize_session=False)).all()
+    session.commit()
+    return sorted(rows, key=lambda row: row.id)
+
+
+def complete_job(session: Session, job: Row) -> bool:
+    """
+    在调用方的事务中把任务标记为 done（与匹配结果一起提交）
+
+    Returns:
+        租约是否仍属于自己；False 时调用方应回滚，任务已由别的进程重新领取
+    """
+    result = session.execute(
+        update(_Job).where(_Job.id == job.id, _Job.state == 'running', _Job.lease_owner == job.lease_owner)
+        .values(state='done', leased_until=None, last_error=None, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False))
+    return result.rowcount == 1
+
+
+def release_job(session: Session, job: Row, error: str, retry_delay: float = RETRY_DELAY,
+                max_attempts: int = MAX_ATTEMPTS):
+    """任务失败：次数未用完时放回 pending，retry_delay 秒后可再次领取；否则标记为 failed。提交"""
+    now = datetime.utcnow()
+    exhausted = job.attempts >= max_attempts
+    session.execute(
+        update(_Job).where(_Job.id == job.id, _Job.lease_owner == job.lease_owner)
+        .values(state='failed' if exhausted else 'pending', last_error=error, updated_at=now,
+                leased_until=None if exhausted else now + timedelta(seconds=retry_delay))
+        .execution_options(synchronize_session=False))
+    session.commit()
@@ -0,0 +1,101 @@
+"""
+游标分页（keyset pagination）
+
+按 (排序列..., id) 排序，下一页的条件是 "排序键在上一页最后一行之后"，
+查询只读取一页的行，翻到多深代价都一样（OFFSET 要先扫过前面所有行）；
+翻页期间插入或删除数据也不会重复或漏掉行。
+
+游标是上一页最后一行排序键的 base64 编码，对客户端不透明。
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Sequence
+from sqlalchemy import literal, tuple_
+
+# 每页默认条数与上限
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class Page(NamedTuple):
+    items: list
+    next_cursor: Optional[str]  # 没有下一页时为 None
+
+
+def page_size(value: Optional[int], default: int = PAGE_SIZE) -> int:
+    """把请求的每页条数限制在 1..MAX_PAGE_SIZE 之间"""
+    if value is None:
+        return default
+    return max(1, min(value, MAX_PAGE_SIZE))
+
+
+def encode_cursor(values: Sequence) -> str:
+    data = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values],
+                      ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str, columns: Sequence) -> list:
+    """
+    解析游标
+
+    Args:
+        token: encode_cursor 生成的游标
+        columns: 排序列（用于把值还原为列的类型）
+
+    Returns:
+        排序键的值列表
+
+    Raises:
+        ValueError: 游标格式不正确或与排序列不对应
+    """
+    try:
+        data = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(data.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"无效的分页游标: {token}") from e
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError(f"无效的分页游标: {token}")
+    result = []
+    for column, value in zip(columns, values):
+        python_type = column.type.python_type
+        # 每个值都必须是该列类型的非空值（bool 是 int 的子类，单独排除）
+        if python_type is datetime:
+            if not isinstance(value, str):
+                raise ValueError(f"无效的分页游标: {token}")
+            value = datetime.fromisoformat(value)
+        elif not isinstance(value, python_type) or (isinstance(value, bool) and python_type is not bool):
+            raise ValueError(f"无效的分页游标: {token}")
+        result.append(value)
+    return result
+
+
+def keyset_page(query, columns: List, cursor: Optional[str] = None, limit: int = PAGE_SIZE,
+                descending: bool = True) -> Page:
+    """
+    按排序列取一页
+
+    Args:
+        query: ORM 查询（不要带 order_by / limit）
+        columns: 排序列，最后一列必须唯一（通常是 id），保证顺序稳定
+        cursor: 上一页返回的 next_cursor，None 表示第一页
+        limit: 每页条数
+        descending: 是否倒序
+
+    Returns:
+        Page
+
+    Raises:
+        ValueError: 游标无效
+    """
+    key = tuple_(*columns)
+    if cursor:
+        values = tuple_(*(literal(v, c.type) for c, v in zip(columns, decode_cursor(cursor, columns))))
+        query = query.filter(key < values if descending else key > values)
+    order = [c.desc() for c in columns] if descending else [c.asc() for c in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return Page(rows, None)
+    rows = rows[:limit]
+    return Page(rows, encode_cursor([getattr(rows[-1], c.key) for c in columns]))
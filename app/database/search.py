@@ -0,0 +1,219 @@
+"""
+物品全文搜索
+
+lost_items / found_items 各有一张 FTS5 表，保存名称、类别、地点、描述的二元分词（bigram）文本：
+每段连续的文字/数字按相邻两个字符切成词（"黑色钱包" -> "黑色 色钱 钱包"），再用 unicode61 分词器建索引。
+中文无需分词即可做子串匹配，两个字的词（如 "钱包"）也能使用索引；结果按 BM25 相关度排序。
+搜索词转换为相邻二元词组成的短语（"校园卡" -> "校园 园卡"）。
+
+索引由 ORM 的写入事件同步（发布、修改名称/类别/地点/描述、删除）；
+绕过 ORM 批量写入物品表后调用 rebuild_fulltext_index。绕过 ORM 删除的物品在索引中留下的行
+不影响结果：命中按主键连接物品表，找不到的不返回。
+单个字符的搜索词无法用二元索引匹配，退回 LIKE 子串匹配。
+"""
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import Float, Integer, and_, event, inspect, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from . import models_db
+
+# 二元索引能匹配的最短词长
+MIN_FTS_TERM = 2
+
+# 连续的文字/数字（不含下划线：unicode61 把下划线当作分隔符）
+_WORD = re.compile(r"[^\W_]+")
+# 相邻两段文字之间插入的分隔词：长度为 3，不会与查询中的二元词相同，短语不会跨段匹配
+_RUN_BREAK = "brk"
+
+
+class FulltextSpec(NamedTuple):
+    model: type
+    columns: Tuple[str, ...]
+    weights: Tuple[float, ...]  # BM25 列权重，与 columns 一一对应
+
+    @property
+    def table(self) -> str:
+        return f"{self.model.__tablename__}_fts"
+
+
+FULLTEXT_SPECS = {
+    'lost': FulltextSpec(models_db.LostItemDB, ('item_name', 'category', 'lost_location', 'description'),
+                         (10.0, 5.0, 2.0, 1.0)),
+    'found': FulltextSpec(models_db.FoundItemDB, ('item_name', 'category', 'found_location', 'description'),
+                          (10.0, 5.0, 2.0, 1.0)),
+}
+
+# 各数据库是否有全文索引表（按 engine 缓存，搜索和写入时不再查询 sqlite_master）
+_fulltext_tables: Dict[Engine, bool] = {}
+
+
+def _bigrams(word: str) -> List[str]:
+    return [word[i:i + 2] for i in range(len(word) - 1)]
+
+
+def bigram_text(value: Optional[str]) -> str:
+    """
+    把一列的内容转换为写入全文索引的二元分词文本
+
+    单个字符的段不写入（查询时单字退回 LIKE），段与段之间用 _RUN_BREAK 隔开
+    """
+    runs = [" ".join(_bigrams(run)) for run in _WORD.findall((value or "").lower()) if len(run) >= MIN_FTS_TERM]
+    return f" {_RUN_BREAK} ".join(runs)
+
+
+def _fulltext_ddl(spec: FulltextSpec) -> List[str]:
+    columns = ", ".join(spec.columns)
+    return [f"CREATE VIRTUAL TABLE IF NOT EXISTS {spec.table} USING fts5({columns}, tokenize='unicode61')"]
+
+
+def create_fulltext_index(conn) -> bool:
+    """
+    创建全文索引表，并从物品表写入索引
+
+    Args:
+        conn: Connection
+
+    Returns:
+        是否创建成功（SQLite 未编译 FTS5 时返回 False，搜索退回 LIKE）
+    """
+    try:
+        for spec in FULLTEXT_SPECS.values():
+            for statement in _fulltext_ddl(spec):
+                conn.exec_driver_sql(statement)
+    except OperationalError as e:
+        if "fts5" not in str(e):
+            raise
+        _fulltext_tables[conn.engine] = False
+        return False
+    _fulltext_tables[conn.engine] = True
+    rebuild_fulltext_index(conn)
+    return True
+
+
+def rebuild_fulltext_index(conn, batch_size: int = 1000):
+    """清空并按物品表重新写入全文索引（绕过 ORM 批量写入物品表后调用）"""
+    if not _has_fulltext_index(conn):
+        return
+    for spec in FULLTEXT_SPECS.values():
+        conn.exec_driver_sql(f"DELETE FROM {spec.table}")
+        columns = [getattr(spec.model, c) for c in spec.columns]
+        last_id = 0
+        while True:
+            rows = conn.execute(spec.model.__table__.select().with_only_columns(spec.model.id, *columns)
+                                .where(spec.model.id > last_id).order_by(spec.model.id).limit(batch_size)).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            conn.execute(_insert_statement(spec), [_index_values(spec, row[0], row[1:]) for row in rows])
+
+
+def _has_fulltext_index(conn) -> bool:
+    engine = conn.engine
+    if engine not in _fulltext_tables:
+        _fulltext_tables[engine] = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FULLTEXT_SPECS['lost'].table}).first() is not None
+    return _fulltext_tables[engine]
+
+
+def has_fulltext_index(session, side: str) -> bool:
+    """数据库中是否存在物品的全文索引表"""
+    return _has_fulltext_index(session.connection())
+
+
+def _insert_statement(spec: FulltextSpec):
+    columns = ", ".join(spec.columns)
+    values = ", ".join(f":{c}" for c in spec.columns)
+    # OR REPLACE：绕过 ORM 删除的物品留在索引中的行，在ID被重新使用时直接覆盖
+    return text(f"INSERT OR REPLACE INTO {spec.table}(rowid, {columns}) VALUES (:item_id, {values})")
+
+
+def _index_values(spec: FulltextSpec, item_id: int, values) -> dict:
+    return dict(item_id=item_id, **{c: bigram_text(v) for c, v in zip(spec.columns, values)})
+
+
+def _listen(spec: FulltextSpec):
+    """在物品的 INSERT / UPDATE / DELETE 语句之后（同一事务中）同步该行的索引"""
+    delete = text(f"DELETE FROM {spec.table} WHERE rowid = :item_id")
+
+    def after_insert(mapper, connection, target):
+        if _has_fulltext_index(connection):
+            connection.execute(_insert_statement(spec), _index_values(
+                spec, target.id, [getattr(target, c) for c in spec.columns]))
+
+    def after_update(mapper, connection, target):
+        # 只在被索引的列变化时更新（标记已解决等操作不触发）
+        attrs = inspect(target).attrs
+        if not any(attrs[c].history.has_changes() for c in spec.columns):
+            return
+        if _has_fulltext_index(connection):
+            connection.execute(_insert_statement(spec), _index_values(
+                spec, target.id, [getattr(target, c) for c in spec.columns]))
+
+    def after_delete(mapper, connection, target):
+        if _has_fulltext_index(connection):
+            connection.execute(delete, {'item_id': target.id})
+
+    event.listen(spec.model, 'after_insert', after_insert)
+    event.listen(spec.model, 'after_update', after_update)
+    event.listen(spec.model, 'after_delete', after_delete)
+
+
+for _spec in FULLTEXT_SPECS.values():
+    _listen(_spec)
+
+
+def fts_query(terms: List[str]) -> Optional[str]:
+    """
+    把搜索词转换为 FTS5 查询（每段文字作为相邻二元词组成的短语，所有短语同时出现）
+
+    Returns:
+        FTS5 查询串；任何一个词含有短于 MIN_FTS_TERM 的段（或不含文字）时返回 None
+    """
+    phrases = []
+    for term in terms:
+        runs = _WORD.findall(term.lower())
+        if not runs or any(len(run) < MIN_FTS_TERM for run in runs):
+            return None
+        phrases.extend('"{}"'.format(" ".join(_bigrams(run))) for run in runs)
+    return " ".join(phrases) or None
+
+
+def apply_search(session, query, side: str, search: str, ranked: bool = True):
+    """
+    给物品查询加上搜索条件
+
+    从全文索引的命中出发，按主键连接物品表（而不是逐行扫描物品表再查索引）。
+
+    Args:
+        session: 数据库会话
+        query: 对 LostItemDB / FoundItemDB 的查询
+        side: 'lost' 或 'found'
+        search: 用户输入的搜索文本（按空白切分为多个词，需全部出现）
+        ranked: 是否计算 BM25 得分；按其他列排序时传 False，
+            只用索引过滤（得分要对每条命中计算，常见词命中多时开销明显）
+
+    Returns:
+        (query, rank)：rank 为 BM25 得分列（越小越相关），未计算或退回 LIKE 时为 None
+    """
+    spec = FULLTEXT_SPECS[side]
+    terms = search.split()
+    if not terms:
+        return query, None
+    match = fts_query(terms)
+    if match is None or not has_fulltext_index(session, side):
+        columns = [getattr(spec.model, c) for c in spec.columns]
+        return query.filter(and_(*(or_(*(c.contains(t, autoescape=True) for c in columns))
+                                   for t in terms))), None
+    if ranked:
+        weights = ", ".join(str(w) for w in spec.weights)
+        hits = text(f"SELECT rowid AS item_id, bm25({spec.table}, {weights}) AS rank "
+                    f"FROM {spec.table} WHERE {spec.table} MATCH :match") \
+            .bindparams(match=match).columns(item_id=Integer, rank=Float).subquery(f"{spec.table}_hits")
+    else:
+        hits = text(f"SELECT rowid AS item_id FROM {spec.table} WHERE {spec.table} MATCH :match") \
+            .bindparams(match=match).columns(item_id=Integer).subquery(f"{spec.table}_hits")
+    # "+ 0" 让连接条件不能按 rowid 查全文索引：否则按时间排序时 SQLite 可能沿时间索引逐行对每个物品执行一次 MATCH，
+    # 罕见词要扫完整张表；这样总是先取出全部命中，再按主键取物品
+    return query.join(hits, spec.model.id == hits.c.item_id + 0), hits.c.rank if ranked else None
@@ -0,0 +1,81 @@
+"""描述词表与属性编码表：把分词结果、类别/地点/颜色/品牌映射为持久化的整数ID"""
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.sqlite import insert
+from .models_db import AttributeCodeDB, TokenDB
+from ..campus import LOCATION_LEVELS, location_levels
+from ..models import CODE_KINDS, normalize_attribute
+
+# SQLite 单条语句的参数个数有限，按块处理
+_CHUNK = 500
+
+
+def intern_tokens(conn, words: Iterable[str]) -> Tuple[int, ...]:
+    """
+    查询（不存在时登记）一组词的ID，与调用方处于同一事务
+
+    Args:
+        conn: Session 或 Connection
+        words: 分词结果（可重复）
+
+    Returns:
+        升序去重的词ID元组
+    """
+    return tuple(sorted(intern_vocabulary(conn, words).values()))
+
+
+def intern_vocabulary(conn, words: Iterable[str]) -> dict:
+    """同 intern_tokens，返回 {词: 词ID}"""
+    unique = sorted(set(words))
+    ids = {}
+    for i in range(0, len(unique), _CHUNK):
+        chunk = unique[i:i + _CHUNK]
+        conn.execute(insert(TokenDB).on_conflict_do_nothing(index_elements=['word']),
+                     [{'word': w} for w in chunk])
+        ids.update(conn.execute(select(TokenDB.word, TokenDB.id).where(TokenDB.word.in_(chunk))).all())
+    return ids
+
+
+def intern_codes(conn, pairs: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+    """
+    查询（不存在时登记）一组 (种类, 规范化后的值) 的编码，与调用方处于同一事务
+
+    Returns:
+        {(种类, 值): 编码}
+    """
+    unique = sorted(set(pairs))
+    codes = {}
+    for i in range(0, len(unique), _CHUNK):
+        chunk = unique[i:i + _CHUNK]
+        conn.execute(insert(AttributeCodeDB).on_conflict_do_nothing(index_elements=['kind', 'value']),
+                     [{'kind': kind, 'value': value} for kind, value in chunk])
+        rows = conn.execute(select(AttributeCodeDB.kind, AttributeCodeDB.value, AttributeCodeDB.id)
+                            .where(tuple_(AttributeCodeDB.kind, AttributeCodeDB.value).in_(chunk)))
+        codes.update(((kind, value), code) for kind, value, code in rows)
+    return codes
+
+
+def attribute_values(category: Optional[str], location: Optional[str],
+                     color: Optional[str], brand: Optional[str]) -> Dict[str, Optional[str]]:
+    """{种类: 规范化后的值}，顺序与 CODE_KINDS 一致"""
+    return {kind: normalize_attribute(kind, value)
+            for kind, value in zip(CODE_KINDS, (category, location, color, brand))}
+
+
+def level_values(location: Optional[str]) -> Dict[str, Optional[str]]:
+    """解析地点文本：{层级: 值}，顺序与 LOCATION_LEVELS 一致，空的层级为 None"""
+    return {level: value or None for level, value in zip(LOCATION_LEVELS, location_levels(location))}
+
+
+def item_codes(conn, category: Optional[str], location: Optional[str],
+               color: Optional[str], brand: Optional[str]) -> Dict[str, Optional[int]]:
+    """
+    一个物品的属性编码与地点层级编码（地点在这里解析一次，匹配时不再解析）
+
+    Returns:
+        {'category_code': ..., 'location_code': ..., 'color_code': ..., 'brand_code': ...,
+         'campus_code': ..., 'building_code': ..., 'floor_code': ..., 'room_code': ..., 'zone_code': ...}，空值为 None
+    """
+    values = {**attribute_values(category, location, color, brand), **level_values(location)}
+    codes = intern_codes(conn, [(kind, value) for kind, value in values.items() if value is not None])
+    return {f"{kind}_code": codes.get((kind, value)) for kind, value in values.items()}
@@ -1,17 +1,41 @@
 """Flask application main entry point"""
-from flask import Flask, request, jsonify
+import json
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from datetime import datetime
+from app.conditional import conditional_get
+from app.database import models_db
 from app.database.db_manager import DatabaseManager
+from app.database.leases import get_leases
+from app.database.pagination import page_size
+from app.agent.job_worker import JobWorker
+from app.agent.match_pipeline import get_match_pipeline
 from app.agent.rule_agent import RuleAgent
 from app.agent.notification_agent import NotificationAgent
 from app.models import LostItem, FoundItem
-from app.web import web_bp
+from app.scheduler import SCHEDULER_ENABLED, Scheduler
+from app.web import web_bp, routes as web_routes
 
 # 初始化服务
 dbm = DatabaseManager()
-agent = RuleAgent()
+# 每次发布最多保存/通知得分最高的20个匹配
+agent = RuleAgent(top_k=20)
 notification_agent = NotificationAgent(dbm)
+# 流式导出时每次写出的行数
+EXPORT_CHUNK_LINES = 200
+# 定时任务：未解决提醒每小时检查一次；每分钟补做创建超过1分钟仍未完成的匹配任务（如重启前未完成的）
+REMINDER_INTERVAL = 3600
+MATCH_JOBS_INTERVAL = 60
+scheduler = Scheduler(dbm)
+
+
+def send_reminders():
+    """定时任务：检查并发送未解决提醒"""
+    session = dbm.get_session()
+    try:
+        return {'sent': notification_agent.check_and_remind_unresolved(session)}
+    finally:
+        session.close()
 
 
 def create_app():
@@ -25,9 +49,23 @@ def create_app():
     # 启用CORS，允许跨域访问（供客户端共享数据）
     CORS(app, resources={r"/api/*": {"origins": "*"}})
     
+    # 发布后的匹配与通知由后台线程完成（与网页路由共用同一条流水线），和定时任务一样在这里启动
+    match_pipeline = get_match_pipeline(dbm, agent, notification_agent)
+    
     # 注册Web蓝图（Blueprint已配置static_url_path='/static'，会自动处理静态资源）
+    web_routes.init_services(dbm, notification_agent, match_pipeline)
     app.register_blueprint(web_bp)
     
+    # 预热匹配索引（未解决的失物/招领常驻内存，匹配时不再读库）
+    dbm.warm_match_index()
+    
+    # 定时任务（部署多个进程时，每个任务只由持有租约的进程执行）
+    scheduler.add_job('reminders', send_reminders, REMINDER_INTERVAL)
+    scheduler.add_job('match_jobs', JobWorker(dbm, agent, notification_agent, min_age=MATCH_JOBS_INTERVAL).drain,
+                      MATCH_JOBS_INTERVAL)
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+    
     # API路由（保留原有API功能）
     @app.route('/api/lost', methods=['POST'])
     def api_post_lost():
@@ -46,24 +84,16 @@ def create_app():
         )
         session = dbm.get_session()
         try:
-            from .database import models_db
-            
             db_lost = dbm.create_lost_item(session, lost)
-            # get found items as dataclasses
-            found_items = dbm.get_all_found_items(session)
-            matches = agent.match_cycle(LostItem(item_id=db_lost.id, user_id=db_lost.user_id, item_name=db_lost.item_name, category=db_lost.category, lost_location=db_lost.lost_location, lost_time=db_lost.lost_time, description=db_lost.description or '', color=db_lost.color, brand=db_lost.brand), found_items)
-            # persist matches
-            for m in matches:
-                db_match = dbm.create_match_record(session, m)
-                # 通知智能体：匹配成功时通知
-                # 获取匹配的招领信息
-                db_found = session.query(models_db.FoundItemDB).filter_by(id=m.found_item_id).first()
-                if db_found:
-                    notification_agent.notify_on_match(session, db_match, db_lost, db_found)
-            
-            return jsonify({'lost_id': db_lost.id, 'matches': [{ 'found_item_id': m.found_item_id, 'score': m.match_score } for m in matches]}), 201
+            lost_id = db_lost.id
         finally:
             session.close()
+        # 物品已提交，匹配交给后台线程；队列已满时在本请求内匹配
+        if match_pipeline.submit('lost', lost_id):
+            return jsonify({'lost_id': lost_id, 'status': 'queued',
+                            'status_url': f'/api/match-status/lost/{lost_id}'}), 202
+        matches = match_pipeline.run_now('lost', lost_id)
+        return jsonify({'lost_id': lost_id, 'matches': [{ 'found_item_id': m.found_item_id, 'score': m.match_score } for m in matches]}), 201
 
     @app.route('/api/found', methods=['POST'])
     def api_post_found():
@@ -83,9 +113,24 @@ def create_app():
         session = dbm.get_session()
         try:
             db_found = dbm.create_found_item(session, found)
-            return jsonify({'found_id': db_found.id}), 201
+            found_id = db_found.id
         finally:
             session.close()
+        # 反向匹配同样交给后台线程
+        if match_pipeline.submit('found', found_id):
+            return jsonify({'found_id': found_id, 'status': 'queued',
+                            'status_url': f'/api/match-status/found/{found_id}'}), 202
+        matches = match_pipeline.run_now('found', found_id)
+        return jsonify({'found_id': found_id, 'matches': [{ 'lost_item_id': m.lost_item_id, 'score': m.match_score } for m in matches]}), 201
+
+    @app.route('/api/match-status/<side>/<int:item_id>', methods=['GET'])
+    def api_match_status(side: str, item_id: int):
+        """API: 查询发布后匹配任务的状态（供匹配结果页轮询）"""
+        if side not in ('lost', 'found'):
+            return jsonify({'success': False, 'error': 'type 必须是 lost 或 found'}), 400
+        # 任务状态只保存在内存中，进程重启或过早的任务返回 unknown
+        status = match_pipeline.status(side, item_id) or {'state': 'unknown'}
+        return jsonify({'success': True, 'type': side, 'id': item_id, **status}), 200
 
     @app.route('/api/matches/<int:lost_id>', methods=['GET'])
     def api_get_matches(lost_id: int):
@@ -97,48 +142,95 @@ def create_app():
         finally:
             session.close()
 
-    @app.route('/api/lost', methods=['GET'])
-    def api_get_all_lost():
-        """API: 获取所有失物列表（供客户端共享数据）"""
+    def check_cursor(side: str):
+        """条件 GET 的请求检查：游标无效时返回 400（即使带着匹配的 If-None-Match）"""
+        def validate(session):
+            try:
+                dbm.check_items_cursor(side, request.args.get('cursor') or None)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            return None
+        return validate
+
+    def check_exists(model, item_id: int, error: str):
+        """条件 GET 的请求检查：物品不存在时返回 404（即使带着匹配的 If-None-Match）"""
+        def validate(session):
+            if session.get(model, item_id) is None:
+                return jsonify({'success': False, 'error': error}), 404
+            return None
+        return validate
+
+    def list_items(side: str):
+        """按时间倒序分页返回失物/招领列表"""
         session = dbm.get_session()
         try:
-            # 支持查询参数：include_resolved（是否包含已解决的）
+            # 支持查询参数：include_resolved（是否包含已解决的）、limit（每页条数）、cursor（上一页的 next_cursor）
             include_resolved = request.args.get('include_resolved', 'false').lower() == 'true'
-            lost_items = dbm.get_all_lost_items_dict(session, include_resolved=include_resolved)
+            limit = page_size(request.args.get('limit', type=int))
+            page = dbm.get_items_page(session, side, cursor=request.args.get('cursor') or None,
+                                      limit=limit, include_resolved=include_resolved)
             return jsonify({
                 'success': True,
-                'count': len(lost_items),
-                'data': lost_items
+                'count': len(page.items),
+                'data': page.items,
+                'next_cursor': page.next_cursor
             }), 200
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
         finally:
             session.close()
 
+    @app.route('/api/lost', methods=['GET'])
+    def api_get_all_lost():
+        """API: 分页获取失物列表（供客户端共享数据，支持 If-None-Match 条件请求）"""
+        return conditional_get(dbm, models_db.LostItemDB, lambda: list_items('lost'), check_cursor('lost'))
+
     @app.route('/api/found', methods=['GET'])
     def api_get_all_found():
-        """API: 获取所有招领列表（供客户端共享数据）"""
-        session = dbm.get_session()
-        try:
-            # 支持查询参数：include_resolved（是否包含已解决的）
-            include_resolved = request.args.get('include_resolved', 'false').lower() == 'true'
-            found_items = dbm.get_all_found_items_dict(session, include_resolved=include_resolved)
-            return jsonify({
-                'success': True,
-                'count': len(found_items),
-                'data': found_items
-            }), 200
-        except Exception as e:
-            return jsonify({'success': False, 'error': str(e)}), 500
-        finally:
-            session.close()
+        """API: 分页获取招领列表（供客户端共享数据，支持 If-None-Match 条件请求）"""
+        return conditional_get(dbm, models_db.FoundItemDB, lambda: list_items('found'), check_cursor('found'))
+
+    def export_items(side: str):
+        """以 NDJSON 流式返回全部失物/招领：每行一个 JSON 对象，边读边发，不在内存中拼出整个响应"""
+        include_resolved = request.args.get('include_resolved', 'false').lower() == 'true'
+
+        def generate():
+            session = dbm.get_session()
+            try:
+                lines = []
+                for item in dbm.iter_items(session, side, include_resolved=include_resolved):
+                    lines.append(json.dumps(item, ensure_ascii=False))
+                    if len(lines) >= EXPORT_CHUNK_LINES:
+                        yield "\n".join(lines) + "\n"
+                        lines = []
+                if lines:
+                    yield "\n".join(lines) + "\n"
+            finally:
+                session.close()
+
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    @app.route('/api/lost/export', methods=['GET'])
+    def api_export_lost():
+        """API: 流式导出全部失物（NDJSON，供客户端全量同步）"""
+        return export_items('lost')
+
+    @app.route('/api/found/export', methods=['GET'])
+    def api_export_found():
+        """API: 流式导出全部招领（NDJSON，供客户端全量同步）"""
+        return export_items('found')
 
     @app.route('/api/lost/<int:lost_id>', methods=['GET'])
     def api_get_lost_by_id(lost_id: int):
-        """API: 根据ID获取单个失物信息"""
+        """API: 根据ID获取单个失物信息（支持 If-None-Match 条件请求）"""
+        return conditional_get(dbm, models_db.LostItemDB, lambda: get_lost_by_id(lost_id),
+                               check_exists(models_db.LostItemDB, lost_id, '失物信息不存在'))
+
+    def get_lost_by_id(lost_id: int):
         session = dbm.get_session()
         try:
-            from .database import models_db
             lost_item = session.query(models_db.LostItemDB).filter_by(id=lost_id).first()
             if not lost_item:
                 return jsonify({'success': False, 'error': '失物信息不存在'}), 404
@@ -164,10 +256,13 @@ def create_app():
 
     @app.route('/api/found/<int:found_id>', methods=['GET'])
     def api_get_found_by_id(found_id: int):
-        """API: 根据ID获取单个招领信息"""
+        """API: 根据ID获取单个招领信息（支持 If-None-Match 条件请求）"""
+        return conditional_get(dbm, models_db.FoundItemDB, lambda: get_found_by_id(found_id),
+                               check_exists(models_db.FoundItemDB, found_id, '招领信息不存在'))
+
+    def get_found_by_id(found_id: int):
         session = dbm.get_session()
         try:
-            from .database import models_db
             found_item = session.query(models_db.FoundItemDB).filter_by(id=found_id).first()
             if not found_item:
                 return jsonify({'success': False, 'error': '招领信息不存在'}), 404
@@ -191,6 +286,31 @@ def create_app():
         finally:
             session.close()
 
+    @app.route('/api/search', methods=['GET'])
+    def api_search():
+        """API: 搜索失物/招领（q 为搜索词，type 为 lost/found，省略时两者都返回；默认按相关度，sort=time 按时间倒序）"""
+        search = request.args.get('q', '').strip()
+        item_type = request.args.get('type', '').strip()
+        if not search:
+            return jsonify({'success': False, 'error': '缺少搜索词 q'}), 400
+        if item_type not in ('', 'lost', 'found'):
+            return jsonify({'success': False, 'error': 'type 只能是 lost 或 found'}), 400
+        limit = page_size(request.args.get('limit', type=int))
+        category = request.args.get('category', '').strip() or None
+        ranked = request.args.get('sort', 'relevance') != 'time'
+        session = dbm.get_session()
+        try:
+            result = {'success': True}
+            for side in ('lost', 'found'):
+                if item_type in ('', side):
+                    result[side] = dbm.search_items(session, side, search, limit=limit,
+                                                    category=category, ranked=ranked)
+            return jsonify(result), 200
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+        finally:
+            session.close()
+
     # 通知相关API
     @app.route('/api/notifications', methods=['GET'])
     def api_get_notifications():
@@ -269,8 +389,31 @@ def create_app():
         """API: 检查并发送提醒（定期任务）"""
         session = dbm.get_session()
         try:
-            notification_agent.check_and_remind_unresolved(session)
-            return jsonify({'success': True, 'message': '提醒检查完成'}), 200
+            sent = notification_agent.check_and_remind_unresolved(session)
+            return jsonify({'success': True, 'message': '提醒检查完成', 'sent': sent}), 200
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+        finally:
+            session.close()
+
+    @app.route('/api/scheduler', methods=['GET'])
+    def api_scheduler():
+        """API: 定时任务运行统计与租约持有者"""
+        session = dbm.get_session()
+        try:
+            leases = get_leases(session)
+            jobs = scheduler.metrics()
+            for job in jobs:
+                # 当前执行该任务的进程（可能是其他进程）
+                leader, lease_until = leases.get(job['name'], (None, None))
+                job['leader'] = leader
+                job['lease_until'] = lease_until.isoformat() if lease_until else None
+            return jsonify({
+                'success': True,
+                'enabled': SCHEDULER_ENABLED,
+                'owner': scheduler.owner,
+                'jobs': jobs
+            }), 200
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
         finally:
@@ -1,6 +1,59 @@
-from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .campus import LOCATION_LEVELS
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch_us(dt: datetime) -> int:
+    """把 datetime 转换为自 1970-01-01 起的整数微秒（保证时间差与 timedelta 完全一致）"""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = dt - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """描述分词规则，与 Matcher.match_by_features 保持一致"""
+    return (text or "").lower().split()
+
+
+# 按整数编码比较的属性种类，编码保存在 attribute_codes 表，物品上的字段名为 "<种类>_code"
+CODE_KINDS = ("category", "location", "color", "brand")
+
+
+def normalize_attribute(kind: str, value: Optional[str]) -> Optional[str]:
+    """
+    编码前的规范化，与 Matcher 的比较方式一致：颜色/品牌不区分大小写，类别/地点按原文比较；
+    空值返回 None（不编码）
+    """
+    if not value:
+        return None
+    return value.lower() if kind in ("color", "brand") else value
+
+
+def row_location_levels(r) -> Optional[Tuple[Optional[int], ...]]:
+    """物品行（或查询结果行）上的地点层级编码；没有这些列时返回 None"""
+    if not hasattr(r, "zone_code"):
+        return None
+    return tuple(getattr(r, f"{level}_code") for level in LOCATION_LEVELS)
+
+
+def format_token_ids(token_ids: Iterable[int]) -> str:
+    """词ID序列 -> description_tokens 列的存储格式（空格分隔）"""
+    return " ".join(str(t) for t in token_ids)
+
+
+def parse_token_ids(text: Optional[str]) -> Optional[Tuple[int, ...]]:
+    """description_tokens 列 -> 词ID元组；None 表示尚未分词（旧数据）"""
+    if text is None:
+        return None
+    return tuple(int(t) for t in text.split())
 
 
 @dataclass
@@ -23,6 +76,19 @@ class LostItem:
     description: str
     color: Optional[str] = None
     brand: Optional[str] = None
+    # 以下字段由 prepare_item 预先计算（入索引时），不参与比较
+    keywords: Optional[FrozenSet[str]] = field(default=None, compare=False, repr=False)
+    color_key: Optional[str] = field(default=None, compare=False, repr=False)
+    brand_key: Optional[str] = field(default=None, compare=False, repr=False)
+    # 持久化的描述词ID（升序去重，见 description_tokens 列），None 表示未分词
+    token_ids: Optional[Tuple[int, ...]] = field(default=None, compare=False, repr=False)
+    # 持久化的整数编码（attribute_codes 表），两侧都有编码时按整数比较
+    category_code: Optional[int] = field(default=None, compare=False, repr=False)
+    location_code: Optional[int] = field(default=None, compare=False, repr=False)
+    color_code: Optional[int] = field(default=None, compare=False, repr=False)
+    brand_code: Optional[int] = field(default=None, compare=False, repr=False)
+    # 发布时解析的地点层级编码（顺序见 campus.LOCATION_LEVELS），None 表示未解析，匹配时解析地点文本
+    location_levels: Optional[Tuple[Optional[int], ...]] = field(default=None, compare=False, repr=False)
 
 
 @dataclass
@@ -36,6 +102,220 @@ class FoundItem:
     description: str
     color: Optional[str] = None
     brand: Optional[str] = None
+    keywords: Optional[FrozenSet[str]] = field(default=None, compare=False, repr=False)
+    color_key: Optional[str] = field(default=None, compare=False, repr=False)
+    brand_key: Optional[str] = field(default=None, compare=False, repr=False)
+    token_ids: Optional[Tuple[int, ...]] = field(default=None, compare=False, repr=False)
+    category_code: Optional[int] = field(default=None, compare=False, repr=False)
+    location_code: Optional[int] = field(default=None, compare=False, repr=False)
+    color_code: Optional[int] = field(default=None, compare=False, repr=False)
+    brand_code: Optional[int] = field(default=None, compare=False, repr=False)
+    # 发布时解析的地点层级编码（顺序见 campus.LOCATION_LEVELS），None 表示未解析，匹配时解析地点文本
+    location_levels: Optional[Tuple[Optional[int], ...]] = field(default=None, compare=False, repr=False)
+
+
+class _CompactItem:
+    """
+    __slots__ 版物品的公共实现：没有实例 __dict__，重复的类别/地点/颜色/品牌字符串被 intern，
+    供常驻内存的索引和批量任务使用；属性与 LostItem/FoundItem 相同，Matcher 可直接使用
+    """
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({values})"
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value else value
+
+
+class CompactLostItem(_CompactItem):
+    """LostItem 的 __slots__ 版本"""
+    __slots__ = ("item_id", "user_id", "item_name", "category", "lost_location", "lost_time",
+                 "description", "color", "brand", "keywords", "color_key", "brand_key", "token_ids",
+                 "category_code", "location_code", "color_code", "brand_code", "location_levels")
+    _fields = __slots__[:9]
+
+    def __init__(self, item_id: Optional[int], user_id: Optional[int], item_name: str, category: str,
+                 lost_location: str, lost_time: datetime, description: str,
+                 color: Optional[str] = None, brand: Optional[str] = None,
+                 token_ids: Optional[Tuple[int, ...]] = None,
+                 category_code: Optional[int] = None, location_code: Optional[int] = None,
+                 color_code: Optional[int] = None, brand_code: Optional[int] = None,
+                 location_levels: Optional[Tuple[Optional[int], ...]] = None):
+        self.item_id = item_id
+        self.user_id = user_id
+        self.item_name = item_name
+        self.category = _intern(category)
+        self.lost_location = _intern(lost_location)
+        self.lost_time = lost_time
+        self.description = description
+        self.color = _intern(color)
+        self.brand = _intern(brand)
+        self.keywords = None
+        self.color_key = None
+        self.brand_key = None
+        self.token_ids = token_ids
+        self.category_code = category_code
+        self.location_code = location_code
+        self.color_code = color_code
+        self.brand_code = brand_code
+        self.location_levels = location_levels
+
+    @classmethod
+    def from_row(cls, r) -> "CompactLostItem":
+        """由 LostItemDB 行构建"""
+        return cls(r.id, r.user_id, r.item_name, r.category, r.lost_location, r.lost_time,
+                   r.description or "", r.color, r.brand,
+                   parse_token_ids(getattr(r, "description_tokens", None)),
+                   *(getattr(r, f"{kind}_code", None) for kind in CODE_KINDS), row_location_levels(r))
+
+
+class CompactFoundItem(_CompactItem):
+    """FoundItem 的 __slots__ 版本"""
+    __slots__ = ("item_id", "user_id", "item_name", "category", "found_location", "found_time",
+                 "description", "color", "brand", "keywords", "color_key", "brand_key", "token_ids",
+                 "category_code", "location_code", "color_code", "brand_code", "location_levels")
+    _fields = __slots__[:9]
+
+    def __init__(self, item_id: Optional[int], user_id: Optional[int], item_name: str, category: str,
+                 found_location: str, found_time: datetime, description: str,
+                 color: Optional[str] = None, brand: Optional[str] = None,
+                 token_ids: Optional[Tuple[int, ...]] = None,
+                 category_code: Optional[int] = None, location_code: Optional[int] = None,
+                 color_code: Optional[int] = None, brand_code: Optional[int] = None,
+                 location_levels: Optional[Tuple[Optional[int], ...]] = None):
+        self.item_id = item_id
+        self.user_id = user_id
+        self.item_name = item_name
+        self.category = _intern(category)
+        self.found_location = _intern(found_location)
+        self.found_time = found_time
+        self.description = description
+        self.color = _intern(color)
+        self.brand = _intern(brand)
+        self.keywords = None
+        self.color_key = None
+        self.brand_key = None
+        self.token_ids = token_ids
+        self.category_code = category_code
+        self.location_code = location_code
+        self.color_code = color_code
+        self.brand_code = brand_code
+        self.location_levels = location_levels
+
+    @classmethod
+    def from_row(cls, r) -> "CompactFoundItem":
+        """由 FoundItemDB 行构建"""
+        return cls(r.id, r.user_id, r.item_name, r.category, r.found_location, r.found_time,
+                   r.description or "", r.color, r.brand,
+                   parse_token_ids(getattr(r, "description_tokens", None)),
+                   *(getattr(r, f"{kind}_code", None) for kind in CODE_KINDS), row_location_levels(r))
+
+
+AnyLostItem = Union[LostItem, CompactLostItem]
+AnyFoundItem = Union[FoundItem, CompactFoundItem]
+
+
+def prepare_item(item):
+    """预先分词并规范化颜色/品牌，匹配时不再对每一对物品重复计算"""
+    item.keywords = frozenset(tokenize(item.description))
+    item.color_key = item.color.lower() if item.color else None
+    item.brand_key = item.brand.lower() if item.brand else None
+    return item
+
+
+# ItemBlock 中缺失的颜色/品牌编码（与任何值都不相等）
+MISSING_CODE = -1
+
+
+def _code(vocab: Dict[str, int], values: List[str], value: str) -> int:
+    code = vocab.get(value)
+    if code is None:
+        code = len(values)
+        vocab[value] = code
+        values.append(sys.intern(value))
+    return code
+
+
+class ItemBlock:
+    """
+    列式物品块：每个字段一个数组，字符串字段用块内字典编码为整数，可被 Matcher 直接批量评分
+
+    - item_ids: 物品ID（缺失为 -1）
+    - category_codes / location_codes: 指向 categories / locations 的下标
+    - color_codes / brand_codes: 指向小写后的 colors / brands，缺失为 MISSING_CODE
+    - times: 丢失/拾获时间的 int64 微秒时间戳
+    - token_ids / token_owner: 每个物品去重后的描述词 id 及其所属行号
+    """
+
+    def __init__(self, items: Sequence[Union[AnyLostItem, AnyFoundItem]] = (), side: str = "found"):
+        location_field, time_field = ("found_location", "found_time") if side == "found" else ("lost_location", "lost_time")
+        self._load(side, ((i.item_id, i.category, getattr(i, location_field), getattr(i, time_field),
+                           i.description, i.color, i.brand) for i in items), len(items))
+
+    @classmethod
+    def from_rows(cls, rows: Sequence, side: str = "found") -> "ItemBlock":
+        """由 FoundItemDB / LostItemDB 行（或同名列的查询结果）直接构建，不经过中间对象"""
+        location_field, time_field = ("found_location", "found_time") if side == "found" else ("lost_location", "lost_time")
+        block = cls.__new__(cls)
+        block._load(side, ((r.id, r.category, getattr(r, location_field), getattr(r, time_field),
+                            r.description, r.color, r.brand) for r in rows), len(rows))
+        return block
+
+    def _load(self, side: str, records: Iterable[tuple], n: int):
+        self.side = side
+        self.categories: List[str] = []
+        self.locations: List[str] = []
+        self.colors: List[str] = []
+        self.brands: List[str] = []
+        self.tokens: List[str] = []
+        self.category_index: Dict[str, int] = {}
+        self.location_index: Dict[str, int] = {}
+        self.color_index: Dict[str, int] = {}
+        self.brand_index: Dict[str, int] = {}
+        self.token_index: Dict[str, int] = {}
+
+        item_ids = np.empty(n, dtype=np.int64)
+        category_codes = np.empty(n, dtype=np.int32)
+        location_codes = np.empty(n, dtype=np.int32)
+        color_codes = np.empty(n, dtype=np.int32)
+        brand_codes = np.empty(n, dtype=np.int32)
+        times = np.empty(n, dtype=np.int64)
+        token_ids: List[int] = []
+        token_owner: List[int] = []
+
+        for row, (item_id, category, location, when, description, color, brand) in enumerate(records):
+            item_ids[row] = item_id if item_id is not None else -1
+            category_codes[row] = _code(self.category_index, self.categories, category)
+            location_codes[row] = _code(self.location_index, self.locations, location)
+            color_codes[row] = _code(self.color_index, self.colors, color.lower()) if color else MISSING_CODE
+            brand_codes[row] = _code(self.brand_index, self.brands, brand.lower()) if brand else MISSING_CODE
+            times[row] = to_epoch_us(when)
+            for word in set(tokenize(description)):
+                token_ids.append(_code(self.token_index, self.tokens, word))
+                token_owner.append(row)
+
+        self.item_ids = item_ids
+        self.category_codes = category_codes
+        self.location_codes = location_codes
+        self.color_codes = color_codes
+        self.brand_codes = brand_codes
+        self.times = times
+        self.token_ids = np.asarray(token_ids, dtype=np.int32)
+        self.token_owner = np.asarray(token_owner, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.item_ids)
 
 
 @dataclass
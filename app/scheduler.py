@@ -0,0 +1,194 @@
+"""
+进程内定时任务调度器
+
+- 每个任务按固定间隔执行，间隔上加随机抖动，避免多个进程/任务在同一时刻一起执行
+- 同一进程内上一次尚未结束时跳过本次（不重叠）
+- 多个服务进程同时运行时，任务到期先抢 scheduler_leases 中该任务的租约（见 database/leases.py），
+  只有持有者执行；执行结束后把租约延到下一个间隔，其他进程在此之前不会执行
+- 每个任务记录执行次数、失败次数、跳过次数和耗时，供 /api/scheduler 查看
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from .database.leases import acquire_lease, renew_lease
+
+logger = logging.getLogger(__name__)
+
+# 是否在服务进程中启动调度器（多个进程都启动也只有租约持有者执行）
+SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', '1') == '1'
+
+
+class ScheduledJob:
+    """一个定时任务及其运行统计"""
+
+    def __init__(self, name: str, func: Callable[[], object], interval: float,
+                 jitter: float, timeout: float):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.running = False
+        self.next_run = 0.0  # time.monotonic() 时刻
+        self.runs = 0
+        self.failures = 0
+        self.skipped_overlap = 0  # 上一次尚未结束而跳过
+        self.skipped_lease = 0  # 租约由其他进程持有而跳过
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.last_duration: Optional[float] = None
+        self.last_started_at: Optional[datetime] = None
+        self.last_result = None
+        self.last_error: Optional[str] = None
+
+    def schedule_next(self, start: float):
+        """从 start 起一个间隔加随机抖动后再次执行"""
+        self.next_run = start + self.interval + random.uniform(0, self.jitter)
+
+    def metrics(self) -> Dict:
+        return {
+            'name': self.name,
+            'interval': self.interval,
+            'running': self.running,
+            'runs': self.runs,
+            'failures': self.failures,
+            'skipped_overlap': self.skipped_overlap,
+            'skipped_lease': self.skipped_lease,
+            'last_started_at': self.last_started_at.isoformat() if self.last_started_at else None,
+            'last_duration': self.last_duration,
+            'avg_duration': self.total_duration / self.runs if self.runs else None,
+            'max_duration': self.max_duration if self.runs else None,
+            'last_result': self.last_result,
+            'last_error': self.last_error,
+            'next_run_in': max(0.0, self.next_run - time.monotonic()),
+        }
+
+
+class Scheduler:
+    """定时任务调度器：一个后台线程检查到期任务，每次执行在单独的线程中进行"""
+
+    def __init__(self, db_manager, owner: Optional[str] = None):
+        """
+        Args:
+            db_manager: 数据库管理器实例（租约读写）
+            owner: 租约持有者标识（默认为 主机名:进程号:随机后缀）
+        """
+        self.db_manager = db_manager
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_job(self, name: str, func: Callable[[], object], interval: float,
+                jitter: Optional[float] = None, timeout: Optional[float] = None):
+        """
+        注册任务
+
+        Args:
+            name: 任务名称（也是租约名称，各进程须一致）
+            func: 无参数的任务函数，返回值记录为 last_result（须可 JSON 序列化）
+            interval: 执行间隔（秒）
+            jitter: 每次间隔上附加的最大随机秒数（默认为间隔的10%）；首次执行在启动后 0~jitter 秒
+            timeout: 执行期间持有租约的秒数（默认等于间隔），超过后其他进程可能开始执行
+        """
+        jitter = interval * 0.1 if jitter is None else jitter
+        job = ScheduledJob(name, func, interval, jitter, timeout or interval)
+        job.next_run = time.monotonic() + random.uniform(0, jitter)
+        self.jobs[name] = job
+
+    def start(self):
+        """启动调度线程"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止调度线程（正在执行的任务会继续完成）"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run_job(self, name: str) -> bool:
+        """
+        立即在当前线程执行一次任务（仍需不重叠且持有租约）
+
+        Returns:
+            是否执行了任务（失败也算执行）
+        """
+        job = self.jobs[name]
+        with self._lock:
+            if job.running:
+                job.skipped_overlap += 1
+                return False
+            job.running = True
+        try:
+            started_at = datetime.utcnow()
+            if not self._acquire(job, started_at):
+                job.skipped_lease += 1
+                return False
+            job.last_started_at = started_at
+            start = time.perf_counter()
+            try:
+                job.last_result = job.func()
+                job.last_error = None
+            except Exception as e:
+                job.failures += 1
+                job.last_error = str(e)
+                logger.exception("定时任务 %s 执行失败", name)
+            duration = time.perf_counter() - start
+            job.runs += 1
+            job.last_duration = duration
+            job.total_duration += duration
+            job.max_duration = max(job.max_duration, duration)
+            self._renew(job, started_at)
+            return True
+        finally:
+            job.running = False
+
+    def metrics(self) -> List[Dict]:
+        """各任务的运行统计"""
+        return [job.metrics() for job in self.jobs.values()]
+
+    def _acquire(self, job: ScheduledJob, now: datetime) -> bool:
+        session = self.db_manager.get_session()
+        try:
+            return acquire_lease(session, job.name, self.owner, now + timedelta(seconds=job.timeout), now=now)
+        except Exception:
+            session.rollback()
+            logger.exception("获取定时任务 %s 的租约失败", job.name)
+            return False
+        finally:
+            session.close()
+
+    def _renew(self, job: ScheduledJob, started_at: datetime):
+        """执行结束后把租约延到本次开始后一个间隔：其他进程在下一个间隔前不会再执行"""
+        session = self.db_manager.get_session()
+        try:
+            renew_lease(session, job.name, self.owner, started_at + timedelta(seconds=job.interval))
+        except Exception:
+            session.rollback()
+            logger.exception("续期定时任务 %s 的租约失败", job.name)
+        finally:
+            session.close()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for job in self.jobs.values():
+                if job.next_run <= now:
+                    job.schedule_next(now)
+                    threading.Thread(target=self.run_job, args=(job.name,),
+                                     name=f"scheduler-{job.name}", daemon=True).start()
+            wait = min((job.next_run for job in self.jobs.values()), default=now + 60) - time.monotonic()
+            self._stop.wait(max(0.05, wait))
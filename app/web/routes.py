@@ -1,48 +1,70 @@
 """Web routes for HTML pages"""
 from flask import render_template, request, redirect, url_for, session, flash, jsonify
 from datetime import datetime
+from typing import Optional
 from . import web_bp
 from ..database.db_manager import DatabaseManager
-from ..agent.rule_agent import RuleAgent
+from ..database.pagination import Page, keyset_page
+from ..database.search import apply_search
+from ..agent.match_pipeline import MatchPipeline
 from ..agent.notification_agent import NotificationAgent
 from ..auth.auth_service import AuthService
 from ..auth.session_manager import login_required, get_current_user
 from ..models import LostItem, FoundItem
 
-# 初始化服务
-db_manager = DatabaseManager()
-agent = RuleAgent()
-notification_agent = NotificationAgent(db_manager)
-auth_service = AuthService(db_manager)
+# 服务由 create_app 调用 init_services 设置：导入本模块不连接数据库，也不启动匹配线程
+db_manager: Optional[DatabaseManager] = None
+notification_agent: Optional[NotificationAgent] = None
+match_pipeline: Optional[MatchPipeline] = None
+auth_service: Optional[AuthService] = None
+
+
+def init_services(dbm: DatabaseManager, notifier: NotificationAgent, pipeline: MatchPipeline):
+    """
+    设置网页路由使用的服务
+
+    Args:
+        dbm: 数据库管理器实例
+        notifier: 通知智能体
+        pipeline: 发布后的匹配流水线（与 API 共用同一条）
+    """
+    global db_manager, notification_agent, match_pipeline, auth_service
+    db_manager = dbm
+    notification_agent = notifier
+    match_pipeline = pipeline
+    auth_service = AuthService(dbm)
 
 
 @web_bp.context_processor
 def inject_unread_count():
     """在所有模板中注入未读通知数量"""
     current_user = get_current_user(db_manager)
-    unread_count = 0
-    if current_user:
-        db_session = db_manager.get_session()
-        try:
-            unread_count = db_manager.get_unread_notification_count(db_session, current_user.id)
-        finally:
-            db_session.close()
+    # 计数随用户行一起取出，不再单独查询通知表
+    unread_count = current_user.unread_notifications if current_user else 0
     return dict(unread_count=unread_count)
 
 
+def _index_page(query, model, time_column, rank, sort: str, cursor, limit: int) -> Page:
+    """按首页的排序方式取一页（相关度排序只显示第一页：得分随索引内容变化，不能作为游标）"""
+    if sort == 'relevance' and rank is not None:
+        return Page(query.order_by(rank, model.id).limit(limit).all(), None)
+    if sort == 'name':
+        return keyset_page(query, [model.item_name, model.id], cursor, limit, descending=False)
+    return keyset_page(query, [time_column, model.id], cursor, limit, descending=sort != 'time_asc')
+
+
 @web_bp.route('/')
 def index():
     """首页 - 显示失物和招领列表（支持搜索和筛选）"""
     db_session = db_manager.get_session()
     try:
         from ..database import models_db
-        from sqlalchemy import or_
         
         # 获取查询参数
         search = request.args.get('search', '').strip()
         category = request.args.get('category', '').strip()
         item_type = request.args.get('type', '').strip()  # lost 或 found
-        sort = request.args.get('sort', 'time_desc').strip()
+        sort = request.args.get('sort', '').strip()
         
         # 构建查询
         lost_query = db_session.query(models_db.LostItemDB).filter(
@@ -52,57 +74,44 @@ def index():
             models_db.FoundItemDB.is_resolved == False
         )
         
-        # 搜索条件
+        # 搜索条件（全文索引，只在按相关度排序时计算 BM25 得分；单字退回 LIKE）
+        # 默认按相关度排序；没有搜索词（或单字退回 LIKE）时没有得分，相关度排序即按时间倒序
+        if not sort:
+            sort = 'relevance'
+        lost_rank = found_rank = None
         if search:
-            search_filter = or_(
-                models_db.LostItemDB.item_name.like(f'%{search}%'),
-                models_db.LostItemDB.category.like(f'%{search}%'),
-                models_db.LostItemDB.lost_location.like(f'%{search}%'),
-                models_db.LostItemDB.description.like(f'%{search}%')
-            )
-            lost_query = lost_query.filter(search_filter)
-            
-            search_filter = or_(
-                models_db.FoundItemDB.item_name.like(f'%{search}%'),
-                models_db.FoundItemDB.category.like(f'%{search}%'),
-                models_db.FoundItemDB.found_location.like(f'%{search}%'),
-                models_db.FoundItemDB.description.like(f'%{search}%')
-            )
-            found_query = found_query.filter(search_filter)
+            ranked = sort == 'relevance'
+            lost_query, lost_rank = apply_search(db_session, lost_query, 'lost', search, ranked)
+            found_query, found_rank = apply_search(db_session, found_query, 'found', search, ranked)
         
         # 类别筛选
         if category:
             lost_query = lost_query.filter(models_db.LostItemDB.category == category)
             found_query = found_query.filter(models_db.FoundItemDB.category == category)
         
-        # 排序
-        if sort == 'time_asc':
-            lost_query = lost_query.order_by(models_db.LostItemDB.lost_time.asc())
-            found_query = found_query.order_by(models_db.FoundItemDB.found_time.asc())
-        elif sort == 'name':
-            lost_query = lost_query.order_by(models_db.LostItemDB.item_name.asc())
-            found_query = found_query.order_by(models_db.FoundItemDB.item_name.asc())
-        else:  # time_desc (默认)
-            lost_query = lost_query.order_by(models_db.LostItemDB.lost_time.desc())
-            found_query = found_query.order_by(models_db.FoundItemDB.found_time.desc())
-        
-        # 根据类型筛选
-        if item_type == 'lost':
-            lost_items = lost_query.limit(50).all()
-            found_items = []
-        elif item_type == 'found':
-            lost_items = []
-            found_items = found_query.limit(50).all()
-        else:
-            # 显示两种类型，各限制数量
-            lost_items = lost_query.limit(25).all()
-            found_items = found_query.limit(25).all()
+        # 根据类型筛选并分页：只看一种类型时每页50条、可翻页，两种都看时各取第一页25条
+        cursor = request.args.get('cursor', '').strip() or None
+        lost_page = found_page = Page([], None)
+        try:
+            if item_type != 'found':
+                lost_page = _index_page(lost_query, models_db.LostItemDB, models_db.LostItemDB.lost_time,
+                                        lost_rank, sort, cursor if item_type == 'lost' else None,
+                                        50 if item_type == 'lost' else 25)
+            if item_type != 'lost':
+                found_page = _index_page(found_query, models_db.FoundItemDB, models_db.FoundItemDB.found_time,
+                                         found_rank, sort, cursor if item_type == 'found' else None,
+                                         50 if item_type == 'found' else 25)
+        except ValueError:
+            flash('分页链接已失效，已返回第一页', 'error')
+            return redirect(url_for('web.index', search=search, category=category, type=item_type, sort=sort))
         
         current_user = get_current_user(db_manager)
         
         return render_template('index.html', 
-                             lost_items=lost_items,
-                             found_items=found_items,
+                             lost_items=lost_page.items,
+                             found_items=found_page.items,
+                             lost_next_cursor=lost_page.next_cursor,
+                             found_next_cursor=found_page.next_cursor,
                              current_user=current_user,
                              search=search,
                              category=category,
@@ -229,37 +238,18 @@ def post_lost():
         
         db_session = db_manager.get_session()
         try:
-            from ..database import models_db
-            
             db_lost = db_manager.create_lost_item(db_session, lost)
-            # 触发智能体匹配
-            found_items = db_manager.get_all_found_items(db_session)
-            matches = agent.match_cycle(
-                LostItem(
-                    item_id=db_lost.id,
-                    user_id=db_lost.user_id,
-                    item_name=db_lost.item_name,
-                    category=db_lost.category,
-                    lost_location=db_lost.lost_location,
-                    lost_time=db_lost.lost_time,
-                    description=db_lost.description or '',
-                    color=db_lost.color,
-                    brand=db_lost.brand
-                ),
-                found_items
-            )
-            # 保存匹配结果并发送通知
-            for m in matches:
-                db_match = db_manager.create_match_record(db_session, m)
-                # 通知智能体：匹配成功时通知
-                db_found = db_session.query(models_db.FoundItemDB).filter_by(id=m.found_item_id).first()
-                if db_found:
-                    notification_agent.notify_on_match(db_session, db_match, db_lost, db_found)
-            
-            flash(f'发布成功！找到 {len(matches)} 个可能的匹配', 'success')
-            return redirect(url_for('web.matches', lost_id=db_lost.id))
+            lost_id = db_lost.id
         finally:
             db_session.close()
+        
+        # 触发智能体匹配：交给后台线程，匹配结果页轮询状态；队列已满时在本请求内匹配
+        if match_pipeline.submit('lost', lost_id):
+            flash('发布成功！正在为您匹配招领信息', 'success')
+        else:
+            matches = match_pipeline.run_now('lost', lost_id)
+            flash(f'发布成功！找到 {len(matches)} 个可能的匹配', 'success')
+        return redirect(url_for('web.matches', lost_id=lost_id))
     
     return render_template('post_lost.html')
 
@@ -310,10 +300,20 @@ def post_found():
         db_session = db_manager.get_session()
         try:
             db_found = db_manager.create_found_item(db_session, found)
-            flash('发布成功！', 'success')
-            return redirect(url_for('web.index'))
+            found_id = db_found.id
         finally:
             db_session.close()
+        
+        # 反向匹配：后台线程评分并通知失主
+        if match_pipeline.submit('found', found_id):
+            flash('发布成功！找到可能的失主后会通知对方', 'success')
+            return redirect(url_for('web.index'))
+        matches = match_pipeline.run_now('found', found_id)
+        if matches:
+            flash(f'发布成功！找到 {len(matches)} 个可能的失主，已通知对方', 'success')
+        else:
+            flash('发布成功！', 'success')
+        return redirect(url_for('web.index'))
     
     return render_template('post_found.html')
 
@@ -332,25 +332,24 @@ def matches(lost_id):
             flash('失物信息不存在', 'error')
             return redirect(url_for('web.index'))
         
-        # 获取匹配记录
-        match_records = db_manager.get_match_records_by_lost_item(db_session, lost_id)
-        
-        # 获取匹配的招领信息
-        found_items = []
-        for match in match_records:
-            found_item = db_session.query(models_db.FoundItemDB).filter_by(
-                id=match['found_item_id']
-            ).first()
-            if found_item:
-                found_items.append({
-                    'item': found_item,
-                    'match_score': match['match_score'],
-                    'match_reason': match['match_reason']
-                })
+        # 获取匹配记录及匹配的招领信息（一条查询）
+        found_items = [
+            {
+                'item': found_item,
+                'match_score': match.match_score,
+                'match_reason': match.match_reason
+            }
+            for match, found_item in db_manager.get_matches_with_found_items(db_session, lost_id)
+        ]
+        
+        # 后台匹配尚未完成时，页面轮询状态接口，完成后刷新
+        status = match_pipeline.status('lost', lost_id)
+        matching = status is not None and status['state'] in ('queued', 'running')
         
         return render_template('matches.html',
                              lost_item=lost_item,
-                             found_items=found_items)
+                             found_items=found_items,
+                             matching=matching)
     finally:
         db_session.close()
 
@@ -417,12 +416,7 @@ def get_unread_count():
     if not current_user:
         return jsonify({'success': False, 'error': '请先登录'}), 401
     
-    db_session = db_manager.get_session()
-    try:
-        count = db_manager.get_unread_notification_count(db_session, current_user.id)
-        return jsonify({'success': True, 'unread_count': count}), 200
-    finally:
-        db_session.close()
+    return jsonify({'success': True, 'unread_count': current_user.unread_notifications}), 200
 
 
 @web_bp.route('/lost/<int:lost_id>')
@@ -438,24 +432,15 @@ def lost_detail(lost_id):
             flash('失物信息不存在', 'error')
             return redirect(url_for('web.index'))
         
-        # 获取匹配记录
-        match_records = db_manager.get_match_records_by_lost_item(db_session, lost_id)
-        
-        # 获取匹配的招领信息
-        match_list = []
-        for match in match_records:
-            found_item = db_session.query(models_db.FoundItemDB).filter_by(
-                id=match['found_item_id']
-            ).first()
-            if found_item:
-                match_list.append({
-                    'found_item': found_item,
-                    'match_score': match['match_score'],
-                    'match_reason': match['match_reason']
-                })
-        
-        # 按匹配度排序
-        match_list.sort(key=lambda x: x['match_score'], reverse=True)
+        # 获取匹配记录及匹配的招领信息（一条查询，已按匹配度排序）
+        match_list = [
+            {
+                'found_item': found_item,
+                'match_score': match.match_score,
+                'match_reason': match.match_reason
+            }
+            for match, found_item in db_manager.get_matches_with_found_items(db_session, lost_id)
+        ]
         
         current_user = get_current_user(db_manager)
         
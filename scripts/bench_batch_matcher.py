@@ -0,0 +1,61 @@
+"""
+性能测试：逐对评分 vs 批量评分
+用法: python scripts/bench_batch_matcher.py [招领数量]
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到路径
+project_root = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.abspath(project_root))
+
+from app.models import LostItem, FoundItem, ItemBlock
+from app.agent.rule_agent import RuleAgent
+
+
+def make_found_items(n, now):
+    rng = random.Random(0)
+    categories = ["钱包", "手机", "钥匙", "证件", "书籍", "电子产品", "其他"]
+    locations = [f"{b} {f}楼" for b in ["图书馆", "教学楼A", "教学楼B", "食堂", "体育馆"] for f in range(1, 6)]
+    words = ["黑色", "白色", "皮质", "身份证", "学生卡", "耳机", "充电器", "钥匙扣", "银行卡", "书包"]
+    return [FoundItem(
+        item_id=i + 1, user_id=2, item_name="物品",
+        category=rng.choice(categories), found_location=rng.choice(locations),
+        found_time=now - timedelta(hours=rng.uniform(0, 720)),
+        description=" ".join(rng.sample(words, 4)),
+        color=rng.choice([None, "黑色", "白色"]), brand=rng.choice([None, "Apple", "华为"])
+    ) for i in range(n)]
+
+
+def run_benchmark(n=30000):
+    now = datetime.now()
+    found_items = make_found_items(n, now)
+    lost = LostItem(item_id=1, user_id=1, item_name="钱包", category="钱包",
+                    lost_location="图书馆 2楼", lost_time=now, description="黑色 皮质 身份证",
+                    color="黑色", brand=None)
+    agent = RuleAgent()
+
+    start = time.perf_counter()
+    expected = agent.match_cycle(lost, found_items)
+    pairwise = time.perf_counter() - start
+
+    start = time.perf_counter()
+    block = ItemBlock(found_items)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = agent.match_block(lost, block)
+    batch = time.perf_counter() - start
+
+    assert actual == expected
+    print(f"招领数量: {n}, 匹配数量: {len(actual)}")
+    print(f"逐对评分 match_cycle: {pairwise * 1000:.1f} ms")
+    print(f"构建列式块（一次性）: {build * 1000:.1f} ms")
+    print(f"批量评分 match_block: {batch * 1000:.1f} ms  (加速 {pairwise / batch:.1f}x)")
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 30000)
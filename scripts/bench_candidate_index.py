@@ -0,0 +1,78 @@
+"""
+性能测试：全量扫描 vs 类别索引
+用法: python scripts/bench_candidate_index.py [招领数量]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# 添加项目根目录到路径
+project_root = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.abspath(project_root))
+
+from app.models import LostItem
+from app.agent.rule_agent import RuleAgent
+from sqlalchemy import create_engine
+from app.database import models_db
+from app.database.db_manager import DatabaseManager
+from app.database.item_index import CategoryIndex
+from bench_batch_matcher import make_found_items
+
+
+def run_benchmark(n=30000, rounds=20):
+    now = datetime.now()
+    found_items = make_found_items(n, now)
+    index = CategoryIndex(found_items)
+    agent = RuleAgent()
+    lost = LostItem(item_id=1, user_id=1, item_name="钱包", category="钱包",
+                    lost_location="图书馆 2楼", lost_time=now, description="黑色 皮质 身份证",
+                    color="黑色", brand=None)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        expected = agent.match_cycle(lost, found_items)
+    scan = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        actual = agent.match_cycle(lost, index=index)
+    indexed = (time.perf_counter() - start) / rounds
+
+    assert actual == expected
+    print(f"招领数量: {n}, 同类别候选: {len(index.candidates(lost.category))}, 匹配数量: {len(actual)}")
+    print(f"全量扫描: {scan * 1000:.1f} ms/次")
+    print(f"类别索引: {indexed * 1000:.1f} ms/次  (加速 {scan / indexed:.1f}x)")
+
+    # 含数据库读取的完整路径：post_lost 原先每次都调用 get_all_found_items
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", future=True)
+        dbm = DatabaseManager(engine)
+        session = dbm.get_session()
+        try:
+            session.execute(models_db.FoundItemDB.__table__.insert(), [{
+                "user_id": f.user_id, "item_name": f.item_name, "category": f.category,
+                "found_location": f.found_location, "found_time": f.found_time,
+                "description": f.description, "color": f.color, "brand": f.brand,
+                "is_resolved": False,
+            } for f in found_items])
+            session.commit()
+            dbm.get_found_index(session)
+
+            start = time.perf_counter()
+            agent.match_cycle(lost, dbm.get_all_found_items(session))
+            full = time.perf_counter() - start
+
+            start = time.perf_counter()
+            agent.match_cycle(lost, index=dbm.get_found_index(session))
+            warm = time.perf_counter() - start
+        finally:
+            session.close()
+            engine.dispose()
+    print(f"含数据库读取 get_all_found_items + match_cycle: {full * 1000:.1f} ms")
+    print(f"含数据库读取 get_found_index(已预热) + match_cycle: {warm * 1000:.1f} ms  (加速 {full / warm:.1f}x)")
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 30000)
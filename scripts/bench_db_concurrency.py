@@ -0,0 +1,91 @@
+"""
+性能测试：并发读写吞吐量，default 与 production 数据库配置档对比
+用法: python scripts/bench_db_concurrency.py [写线程数] [读线程数] [秒数]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# 添加项目根目录到路径
+project_root = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.abspath(project_root))
+
+from sqlalchemy.exc import OperationalError
+from app.models import FoundItem
+from app.database.db import create_db_engine
+from app.database.db_manager import DatabaseManager
+from app.database import models_db
+
+
+def run_profile(profile, writers, readers, seconds):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_db_engine(f"sqlite:///{path}", profile)
+    dbm = DatabaseManager(engine)
+    counts = {'writes': 0, 'reads': 0, 'locked': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def bump(key):
+        with lock:
+            counts[key] += 1
+
+    def writer(n):
+        session = dbm.get_session()
+        try:
+            while time.perf_counter() < deadline:
+                try:
+                    dbm.create_found_item(session, FoundItem(
+                        item_id=None, user_id=n, item_name="钱包", category="钱包", found_location="图书馆",
+                        found_time=datetime.now(), description="黑色 皮质 钱包"))
+                    bump('writes')
+                except OperationalError:
+                    session.rollback()
+                    bump('locked')
+        finally:
+            session.close()
+
+    def reader():
+        session = dbm.get_session()
+        try:
+            while time.perf_counter() < deadline:
+                try:
+                    session.query(models_db.FoundItemDB).filter(
+                        models_db.FoundItemDB.is_resolved == False, models_db.FoundItemDB.category == "钱包"
+                    ).order_by(models_db.FoundItemDB.found_time.desc()).limit(25).all()
+                    session.commit()
+                    bump('reads')
+                except OperationalError:
+                    session.rollback()
+                    bump('locked')
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return counts
+
+
+def run_benchmark(writers=4, readers=8, seconds=5.0):
+    print(f"写线程 {writers}，读线程 {readers}，每个配置档 {seconds:.0f} 秒")
+    for profile in ("default", "production"):
+        counts = run_profile(profile, writers, readers, seconds)
+        print(f"{profile}: 写 {counts['writes'] / seconds:.0f}/s，读 {counts['reads'] / seconds:.0f}/s，"
+              f"database is locked {counts['locked']} 次")
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 4,
+                  int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+                  float(sys.argv[3]) if len(sys.argv) > 3 else 5.0)
@@ -0,0 +1,69 @@
+"""
+性能测试：列表接口一次性生成 JSON vs NDJSON 流式导出的峰值内存，默认20万条失物
+用法: python scripts/bench_export.py [失物数量]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# 添加项目根目录到路径
+project_root = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.abspath(project_root))
+
+from sqlalchemy import create_engine
+from app.database.db_manager import DatabaseManager
+from app.database import models_db
+from bench_search import make_rows
+
+
+def materialized(dbm, session):
+    """旧实现：全部行 → ORM 对象 → 字典 → 一个 JSON 响应体"""
+    items = dbm.get_all_lost_items_dict(session)
+    return len(json.dumps({'success': True, 'count': len(items), 'data': items}, ensure_ascii=False))
+
+
+def streamed(dbm, session):
+    """新实现：按批读取列，逐行编码后立即丢弃（模拟写出到连接）"""
+    size = 0
+    for item in dbm.iter_items(session, 'lost'):
+        size += len(json.dumps(item, ensure_ascii=False)) + 1
+    return size
+
+
+def measure(run, dbm):
+    session = dbm.get_session()
+    try:
+        tracemalloc.start()
+        start = time.perf_counter()
+        size = run(dbm, session)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, peak, size
+    finally:
+        session.close()
+
+
+def run_benchmark(n=200000):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    try:
+        dbm = DatabaseManager(engine)
+        with engine.begin() as conn:
+            conn.execute(models_db.LostItemDB.__table__.insert(), list(make_rows(n, datetime.now())))
+        print(f"失物数量: {n}")
+        for label, run in (("一次性 jsonify", materialized), ("NDJSON 流式", streamed)):
+            elapsed, peak, size = measure(run, dbm)
+            print(f"[{label}] 耗时: {elapsed:.2f} s, 峰值内存: {peak / 2 ** 20:.1f} MB, 输出: {size / 2 ** 20:.1f} MB")
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
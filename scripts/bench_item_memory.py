@@ -0,0 +1,58 @@
+"""
+内存测试：10万条招领分别用 dataclass、__slots__ 物品、ItemBlock 表示时的内存占用
+用法: python scripts/bench_item_memory.py [数量]
+"""
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+from types import SimpleNamespace
+
+# 添加项目根目录到路径
+project_root = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.abspath(project_root))
+
+from app.models import FoundItem, CompactFoundItem, ItemBlock, prepare_item
+from bench_batch_matcher import make_found_items
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def run_benchmark(n=100000):
+    # 模拟数据库行（各行的字符串是独立对象，与 ORM 读出的结果一致）
+    rows = [SimpleNamespace(id=f.item_id, user_id=f.user_id, item_name=f.item_name[:],
+                            category="".join(f.category), found_location="".join(f.found_location),
+                            found_time=f.found_time, description=f.description,
+                            color="".join(f.color) if f.color else None,
+                            brand="".join(f.brand) if f.brand else None)
+            for f in make_found_items(n, datetime.now())]
+
+    def dataclasses():
+        return [prepare_item(FoundItem(item_id=r.id, user_id=r.user_id, item_name=r.item_name, category=r.category,
+                                       found_location=r.found_location, found_time=r.found_time,
+                                       description=r.description, color=r.color, brand=r.brand))
+                for r in rows]
+
+    def compact():
+        return [prepare_item(CompactFoundItem.from_row(r)) for r in rows]
+
+    print(f"物品数量: {n}")
+    for label, build in (("dataclass FoundItem（含预分词）", dataclasses),
+                         ("__slots__ CompactFoundItem（含预分词）", compact),
+                         ("ItemBlock 列式块", lambda: ItemBlock.from_rows(rows))):
+        result, size = measure(build)
+        print(f"{label}: {size / 1024 / 1024:.1f} MB，每条 {size / n:.0f} 字节")
+        del result
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
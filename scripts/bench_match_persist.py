@@ -0,0 +1,77 @@
+"""
+性能测试：逐条保存匹配结果并通知 vs 批量单事务保存
+用法: python scripts/bench_match_persist.py [每次发布的匹配数] [发布次数]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from functools import partial
+
+# 添加项目根目录到路径
+project_root = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.abspath(project_root))
+
+from sqlalchemy import create_engine, event
+from app.models import LostItem, FoundItem, MatchRecord
+from app.agent.notification_agent import NotificationAgent
+from app.database.db_manager import DatabaseManager
+from app.database import models_db
+
+
+def setup(path, matches):
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    dbm = DatabaseManager(engine)
+    session = dbm.get_session()
+    now = datetime.now()
+    found = [dbm.create_found_item(session, FoundItem(
+        item_id=None, user_id=2, item_name="钱包", category="钱包", found_location="图书馆",
+        found_time=now, description="黑色 钱包")) for _ in range(matches)]
+    found_ids = [f.id for f in found]
+    session.close()
+    return engine, dbm, found_ids
+
+
+def post_lost(dbm, session, found_ids, bulk, agent):
+    db_lost = dbm.create_lost_item(session, LostItem(
+        item_id=None, user_id=1, item_name="钱包", category="钱包", lost_location="图书馆",
+        lost_time=datetime.now(), description="黑色 钱包"))
+    matches = [MatchRecord(db_lost.id, found_id, 90.0 - i, f"score={90.0 - i:.1f}")
+               for i, found_id in enumerate(found_ids)]
+    if bulk:
+        dbm.create_match_records(session, matches, notify=partial(agent.notify_on_matches, commit=False))
+        return
+    # 原来的流程：每条匹配 add+commit+refresh，再单独查询招领并通知（通知内部再提交）
+    for m in matches:
+        db_match = dbm.create_match_record(session, m)
+        db_found = session.query(models_db.FoundItemDB).filter_by(id=m.found_item_id).first()
+        if db_found:
+            agent.notify_on_match(session, db_match, db_lost, db_found)
+
+
+def run_benchmark(matches=30, posts=20):
+    print(f"每次发布 {matches} 个匹配，共 {posts} 次发布")
+    for label, bulk in (("逐条保存", False), ("批量单事务", True)):
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        try:
+            engine, dbm, found_ids = setup(path, matches)
+            agent = NotificationAgent(dbm)
+            commits = []
+            event.listen(engine, "commit", lambda conn: commits.append(1))
+            session = dbm.get_session()
+            start = time.perf_counter()
+            for _ in range(posts):
+                post_lost(dbm, session, found_ids, bulk, agent)
+            elapsed = time.perf_counter() - start
+            session.close()
+            engine.dispose()
+        finally:
+            os.remove(path)
+        print(f"{label}: {elapsed / posts * 1000:.1f} ms/次发布，提交 {len(commits) / posts:.0f} 次/发布")
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 30,
+                  int(sys.argv[2]) if len(sys.argv) > 2 else 20)
@@ -0,0 +1,77 @@
+"""
+性能测试：未解决提醒检查，逐行加载+逐条构造 vs 数据库内 INSERT ... SELECT，默认20万条失物
+用法: python scripts/bench_reminders.py [失物数量]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到路径
+project_root = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.abspath(project_root))
+
+from sqlalchemy import create_engine, delete
+from app.database.db_manager import DatabaseManager
+from app.database import models_db
+from app.agent.notification_agent import NotificationAgent
+from bench_search import make_rows
+
+
+def row_by_row(agent, session, now):
+    """旧实现：加载全部未解决失物，在 Python 中判断天数并构造通知（每次调用都重发）"""
+    reminder_threshold = now - timedelta(days=agent.rules['reminder_days'])
+    urgent_threshold = now - timedelta(days=agent.rules['urgent_reminder_days'])
+    notifications = []
+    for item in session.query(models_db.LostItemDB).filter(models_db.LostItemDB.is_resolved == False).all():
+        days_passed = (now - item.lost_time).days
+        if item.lost_time < urgent_threshold:
+            notifications.append(agent._notification(item.user_id, 'reminder', '⚠️ 紧急提醒：失物信息已超过14天',
+                                                     f'您的失物"{item.item_name}"已发布{days_passed}天', item.id))
+        elif item.lost_time < reminder_threshold:
+            notifications.append(agent._notification(item.user_id, 'reminder', '📅 提醒：失物信息已超过7天',
+                                                     f'您的失物"{item.item_name}"已发布{days_passed}天', item.id))
+    return agent._write_notifications(session, notifications)
+
+
+def set_based(agent, session, now):
+    """新实现：阈值在 SQL 中判断，分段 INSERT ... SELECT，已提醒过的跳过"""
+    return agent.check_and_remind_unresolved(session, now=now)
+
+
+def measure(run, agent, dbm, now):
+    session = dbm.get_session()
+    try:
+        start = time.perf_counter()
+        sent = run(agent, session, now)
+        return time.perf_counter() - start, sent
+    finally:
+        session.close()
+
+
+def run_benchmark(n=200000):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    try:
+        dbm = DatabaseManager(engine)
+        agent = NotificationAgent(dbm)
+        now = datetime.utcnow()
+        with engine.begin() as conn:
+            conn.execute(models_db.LostItemDB.__table__.insert(), list(make_rows(n, now)))
+        print(f"失物数量: {n}（发布时间间隔1分钟，约20%已解决）")
+        elapsed, sent = measure(row_by_row, agent, dbm, now)
+        print(f"[逐行加载] 耗时: {elapsed:.2f} s, 提醒: {sent}（每次调用都重发）")
+        with engine.begin() as conn:
+            conn.execute(delete(models_db.NotificationDB))
+        for label in ("INSERT ... SELECT 首次", "INSERT ... SELECT 再次"):
+            elapsed, sent = measure(set_based, agent, dbm, now)
+            print(f"[{label}] 耗时: {elapsed:.2f} s, 提醒: {sent}")
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
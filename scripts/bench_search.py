@@ -0,0 +1,106 @@
+"""
+性能测试：首页搜索 LIKE 全表扫描 vs FTS5 二元分词（bigram）全文索引，默认50万条失物
+用法: python scripts/bench_search.py [失物数量]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到路径
+project_root = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.abspath(project_root))
+
+from sqlalchemy import and_, create_engine, or_
+from app.database.db_manager import DatabaseManager
+from app.database.search import apply_search, fts_query, rebuild_fulltext_index
+from app.database import models_db
+
+NAMES = ["钱包", "校园卡", "身份证", "耳机", "水杯", "雨伞", "钥匙", "充电宝", "笔记本电脑", "课本", "眼镜", "手表"]
+CATEGORIES = ["钱包", "证件", "电子产品", "其他", "钥匙", "书籍"]
+LOCATIONS = ["图书馆", "第一食堂", "第二食堂", "教学楼A", "教学楼B", "体育馆", "宿舍", "实验楼", "操场"]
+WORDS = ["黑色", "白色", "红色", "蓝色", "皮质", "塑料", "金属", "小米", "华为", "苹果", "AirPods", "贴纸",
+         "挂件", "磨损", "全新", "学生证", "银行卡", "现金", "钥匙扣", "保温", "折叠", "透明", "划痕"]
+# 常见词（命中数万条）、罕见词（编号）、无结果、两个字的词、单字（退回 LIKE）
+QUERIES = ["校园卡", "AirPods", "黑色钱包", "华为 充电宝", "编号314159", "不存在的物品", "钱包", "包"]
+
+
+def make_rows(n, now, seed=42):
+    rng = random.Random(seed)
+    for i in range(n):
+        name = rng.choice(NAMES)
+        yield {
+            'user_id': rng.randint(1, 5000),
+            'item_name': f"{rng.choice(WORDS)}{name}" if rng.random() < 0.3 else name,
+            'category': rng.choice(CATEGORIES),
+            'lost_location': f"{rng.choice(LOCATIONS)} {rng.randint(1, 6)}楼",
+            'lost_time': now - timedelta(minutes=i),
+            'description': " ".join(rng.sample(WORDS, rng.randint(2, 6))) + f" 编号{rng.randint(1, 10 ** 6)}",
+            'is_resolved': rng.random() < 0.2,
+        }
+
+
+def like_query(session, search):
+    """旧实现：四列 LIKE '%词%'"""
+    model = models_db.LostItemDB
+    columns = (model.item_name, model.category, model.lost_location, model.description)
+    return (session.query(model).filter(model.is_resolved == False)
+            .filter(and_(*(or_(*(c.like(f'%{t}%') for c in columns)) for t in search.split())))
+            .order_by(model.lost_time.desc()).limit(25).all())
+
+
+def fts_search(session, search, ranked):
+    """新实现：全文索引，按 BM25 相关度或时间排序（单字退回 LIKE）"""
+    model = models_db.LostItemDB
+    query, rank = apply_search(session, session.query(model).filter(model.is_resolved == False),
+                               'lost', search, ranked)
+    order = (rank, model.id) if rank is not None else (model.lost_time.desc(),)
+    return query.order_by(*order).limit(25).all()
+
+
+def timed(run, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = run()
+    return (time.perf_counter() - start) / rounds, result
+
+
+def run_benchmark(n=500000, rounds=5):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    try:
+        dbm = DatabaseManager(engine)
+        rows = list(make_rows(n, datetime.now()))
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(models_db.LostItemDB.__table__.insert(), rows)
+            # 绕过 ORM 批量写入，全文索引不会随之同步
+            rebuild_fulltext_index(conn)
+        load = time.perf_counter() - start
+        with engine.connect() as conn:
+            pages = conn.exec_driver_sql(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name LIKE 'lost_items_fts%'").scalar() or 0
+        print(f"失物数量: {n}, 写入（含重建全文索引）: {load:.1f} s, 索引大小: {pages / 2 ** 20:.0f} MB")
+
+        session = dbm.get_session()
+        try:
+            for search in QUERIES:
+                like_time, like_rows = timed(lambda: like_query(session, search), rounds)
+                ranked_time, ranked_rows = timed(lambda: fts_search(session, search, True), rounds)
+                by_time, time_rows = timed(lambda: fts_search(session, search, False), rounds)
+                assert [r.id for r in time_rows] == [r.id for r in like_rows]
+                mode = "FTS5" if fts_query(search.split()) else "LIKE回退"
+                print(f"[{search}] LIKE: {like_time * 1000:.1f} ms, {mode} 相关度: {ranked_time * 1000:.1f} ms, "
+                      f"{mode} 时间: {by_time * 1000:.1f} ms (返回 {len(like_rows)} 条)")
+        finally:
+            session.close()
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 500000)
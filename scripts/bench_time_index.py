@@ -0,0 +1,51 @@
+"""
+性能测试：按时间分档扫描（二分查找）vs 全量扫描，默认10万条未解决招领
+用法: python scripts/bench_time_index.py [招领数量]
+"""
+import os
+import sys
+import time
+from datetime import datetime
+
+# 添加项目根目录到路径
+project_root = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.abspath(project_root))
+
+from app.models import LostItem
+from app.agent.rule_agent import RuleAgent
+from app.database.item_index import CategoryIndex
+from bench_batch_matcher import make_found_items
+
+
+def run_benchmark(n=100000, rounds=10):
+    now = datetime.now()
+    found_items = make_found_items(n, now)
+    start = time.perf_counter()
+    index = CategoryIndex(found_items)
+    build = time.perf_counter() - start
+    lost = LostItem(item_id=1, user_id=1, item_name="钱包", category="钱包",
+                    lost_location="图书馆 2楼", lost_time=now, description="黑色 皮质 身份证",
+                    color="黑色", brand=None)
+    candidates = index.candidates(lost.category)
+    print(f"招领数量: {n}, 同类别候选: {len(candidates)}, 建索引: {build * 1000:.0f} ms")
+
+    for agent, label in ((RuleAgent(top_k=20), "top_k=20"),
+                         (RuleAgent(top_k=20, threshold=80.0), "top_k=20, threshold=80"),
+                         (RuleAgent(threshold=90.0), "threshold=90")):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            expected = agent.match_cycle(lost, candidates)
+        scan = (time.perf_counter() - start) / rounds
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            actual = agent.match_cycle(lost, index=index)
+        tiered = (time.perf_counter() - start) / rounds
+
+        assert actual == expected
+        print(f"[{label}] 同类别全量扫描: {scan * 1000:.1f} ms, 时间分档: {tiered * 1000:.1f} ms "
+              f"(加速 {scan / tiered:.1f}x, 匹配 {len(actual)} 条)")
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
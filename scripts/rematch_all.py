@@ -0,0 +1,45 @@
+"""
+全量重新匹配：对所有未解决失物 × 未解决招领重新评分，合并到 match_records
+用法: python scripts/rematch_all.py [--workers N] [--shard-size N] [--top-k K] [--threshold S] [--prune]
+"""
+import argparse
+import os
+import sys
+
+# 添加项目根目录到路径
+project_root = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.abspath(project_root))
+
+from app.database.db_manager import DatabaseManager
+from app.agent.rule_agent import RuleAgent
+from app.agent.rematch import RematchJob
+
+
+def print_progress(stats):
+    print(f"  已处理失物 {stats['lost_done']}/{stats['lost_total']}，"
+          f"匹配 {stats['matches']} 条，"
+          f"{stats['lost_per_sec']:.0f} 个失物/秒，{stats['pairs_per_sec']:.0f} 对/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全量重新匹配")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数（默认CPU核数，0为单进程）")
+    parser.add_argument("--shard-size", type=int, default=200, help="每个分片的失物数量")
+    parser.add_argument("--top-k", type=int, default=20, help="每个失物最多保留的匹配数")
+    parser.add_argument("--threshold", type=float, default=40.0, help="匹配阈值")
+    parser.add_argument("--prune", action="store_true", help="删除本次未再匹配到的旧记录")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("全量重新匹配")
+    print("=" * 50)
+    job = RematchJob(DatabaseManager(), RuleAgent(top_k=args.top_k, threshold=args.threshold),
+                     workers=args.workers, shard_size=args.shard_size, prune=args.prune)
+    stats = job.run(progress=print_progress)
+    print(f"\n✅ 完成：失物 {stats['lost_total']} 个，招领 {stats['found_total']} 个，"
+          f"新增 {stats['inserted']} 条，更新 {stats['updated']} 条，删除 {stats['deleted']} 条，"
+          f"耗时 {stats['elapsed']:.1f} 秒")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+匹配任务进程：领取 match_jobs 中待执行的任务（包括服务重启前未完成的），匹配并发送通知
+可同时运行多个进程，同一任务只会被一个进程执行
+用法: python scripts/run_match_worker.py [--batch-size N] [--lease S] [--poll S] [--once]
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+
+# 添加项目根目录到路径
+project_root = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.abspath(project_root))
+
+from app.database import outbox
+from app.database.db_manager import DatabaseManager
+from app.agent.job_worker import JobWorker
+from app.agent.notification_agent import NotificationAgent
+from app.agent.rule_agent import RuleAgent
+
+
+def print_progress(stats):
+    print(f"  领取 {stats['claimed']} 个任务：完成 {stats['done']}，失败 {stats['failed']}，"
+          f"已由其他进程接手 {stats['lost_lease']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="匹配任务进程")
+    parser.add_argument("--batch-size", type=int, default=outbox.BATCH_SIZE, help="每次领取的任务数")
+    parser.add_argument("--lease", type=float, default=outbox.LEASE_SECONDS, help="租约时长（秒）")
+    parser.add_argument("--poll", type=float, default=1.0, help="没有任务时的轮询间隔（秒）")
+    parser.add_argument("--once", action="store_true", help="处理完当前所有任务后退出")
+    args = parser.parse_args()
+
+    dbm = DatabaseManager()
+    # 与网页服务相同：每次发布最多保存/通知得分最高的20个匹配
+    worker = JobWorker(dbm, RuleAgent(top_k=20), NotificationAgent(dbm),
+                       batch_size=args.batch_size, lease_seconds=args.lease)
+
+    print("=" * 50)
+    print(f"匹配任务进程 (pid {os.getpid()})")
+    print("=" * 50)
+    if args.once:
+        totals = worker.drain(progress=print_progress)
+    else:
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+        totals = worker.run(poll_interval=args.poll, stop=stop, progress=print_progress)
+    print(f"\n✅ 退出：共完成 {totals['done']} 个任务，失败 {totals['failed']} 个")
+
+
+if __name__ == '__main__':
+    main()
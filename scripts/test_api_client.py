@@ -9,25 +9,45 @@ from datetime import datetime
 BASE_URL = "http://localhost:5000"
 
 
+def fetch_all(path, **params):
+    """
+    沿 next_cursor 翻页取回列表接口的全部数据（列表接口每页默认只返回50条）
+
+    Args:
+        path: 接口路径，如 /api/lost
+        **params: 其他查询参数
+
+    Returns:
+        (data, pages)：全部条目与请求的页数；请求失败时抛出异常
+    """
+    items, pages, cursor = [], 0, None
+    while True:
+        query = dict(params, limit=200)
+        if cursor:
+            query['cursor'] = cursor
+        response = requests.get(f"{BASE_URL}{path}", params=query)
+        response.raise_for_status()
+        data = response.json()
+        if not data.get('success'):
+            raise RuntimeError(data.get('error', '未知错误'))
+        items.extend(data.get('data', []))
+        pages += 1
+        cursor = data.get('next_cursor')
+        if not cursor:
+            return items, pages
+
+
 def test_get_all_lost():
     """测试获取所有失物列表"""
     print("\n=== 测试：获取所有失物列表 ===")
     try:
-        response = requests.get(f"{BASE_URL}/api/lost")
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('success'):
-                print(f"✅ 成功获取 {data.get('count', 0)} 条失物信息")
-                items = data.get('data', [])
-                for i, item in enumerate(items[:5], 1):  # 只显示前5条
-                    print(f"  {i}. {item['item_name']} - {item['lost_location']} ({item['category']})")
-                if len(items) > 5:
-                    print(f"  ... 还有 {len(items) - 5} 条")
-                return True
-            else:
-                print(f"❌ 失败: {data.get('error', '未知错误')}")
-        else:
-            print(f"❌ HTTP错误: {response.status_code}")
+        items, pages = fetch_all("/api/lost")
+        print(f"✅ 成功获取 {len(items)} 条失物信息（共 {pages} 页）")
+        for i, item in enumerate(items[:5], 1):  # 只显示前5条
+            print(f"  {i}. {item['item_name']} - {item['lost_location']} ({item['category']})")
+        if len(items) > 5:
+            print(f"  ... 还有 {len(items) - 5} 条")
+        return True
     except Exception as e:
         print(f"❌ 请求失败: {e}")
     return False
@@ -37,21 +57,13 @@ def test_get_all_found():
     """测试获取所有招领列表"""
     print("\n=== 测试：获取所有招领列表 ===")
     try:
-        response = requests.get(f"{BASE_URL}/api/found")
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('success'):
-                print(f"✅ 成功获取 {data.get('count', 0)} 条招领信息")
-                items = data.get('data', [])
-                for i, item in enumerate(items[:5], 1):  # 只显示前5条
-                    print(f"  {i}. {item['item_name']} - {item['found_location']} ({item['category']})")
-                if len(items) > 5:
-                    print(f"  ... 还有 {len(items) - 5} 条")
-                return True
-            else:
-                print(f"❌ 失败: {data.get('error', '未知错误')}")
-        else:
-            print(f"❌ HTTP错误: {response.status_code}")
+        items, pages = fetch_all("/api/found")
+        print(f"✅ 成功获取 {len(items)} 条招领信息（共 {pages} 页）")
+        for i, item in enumerate(items[:5], 1):  # 只显示前5条
+            print(f"  {i}. {item['item_name']} - {item['found_location']} ({item['category']})")
+        if len(items) > 5:
+            print(f"  ... 还有 {len(items) - 5} 条")
+        return True
     except Exception as e:
         print(f"❌ 请求失败: {e}")
     return False
@@ -113,19 +125,9 @@ def test_include_resolved():
     """测试包含已解决的数据"""
     print("\n=== 测试：获取包含已解决的数据 ===")
     try:
-        # 测试失物
-        response = requests.get(f"{BASE_URL}/api/lost?include_resolved=true")
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('success'):
-                print(f"✅ 失物总数（含已解决）: {data.get('count', 0)}")
-        
-        # 测试招领
-        response = requests.get(f"{BASE_URL}/api/found?include_resolved=true")
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('success'):
-                print(f"✅ 招领总数（含已解决）: {data.get('count', 0)}")
+        for side, label in (("lost", "失物"), ("found", "招领")):
+            items, _ = fetch_all(f"/api/{side}", include_resolved="true")
+            print(f"✅ {label}总数（含已解决）: {len(items)}")
         return True
     except Exception as e:
         print(f"❌ 请求失败: {e}")
@@ -0,0 +1,46 @@
+"""测试用的临时数据库基类"""
+import os
+import tempfile
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from app.database.db_manager import DatabaseManager
+
+
+class TempDatabaseTestCase(unittest.TestCase):
+    """每个测试使用一个临时 SQLite 数据库文件（self.db_path），测试结束后删除"""
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.addCleanup(self._remove_db_files)
+
+    def new_engine(self) -> Engine:
+        """连接临时数据库的新引擎（多个引擎可模拟多个进程），测试结束时释放"""
+        engine = create_engine(f"sqlite:///{self.db_path}", future=True)
+        self.addCleanup(engine.dispose)
+        return engine
+
+    def _remove_db_files(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+
+
+class DatabaseTestCase(TempDatabaseTestCase):
+    """
+    在临时数据库上建好 self.engine、self.dbm（DatabaseManager）和 self.session
+
+    子类的 setUp 先调用 super().setUp() 再准备数据；会话、引擎和数据库文件在 tearDown 之后依次清理
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.engine = self.new_engine()
+        self.dbm = DatabaseManager(self.engine)
+        self.session = self.dbm.get_session()
+        self.addCleanup(self.session.close)
+
+    def other_manager(self) -> DatabaseManager:
+        """同一数据库的另一个 DatabaseManager（模拟另一个进程，有自己的匹配索引）"""
+        return DatabaseManager(self.new_engine())
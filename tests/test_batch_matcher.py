@@ -0,0 +1,117 @@
+"""测试批量评分"""
+import pickle
+import random
+import unittest
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+from app.models import LostItem, FoundItem, ItemBlock, CompactLostItem, CompactFoundItem
+from app.agent.matcher import Matcher
+from app.agent.rule_agent import RuleAgent
+
+
+CATEGORIES = ["钱包", "手机", "钥匙", "其他"]
+LOCATIONS = ["图书馆", "图书馆一楼", "图书馆 二楼", "教学楼A-二楼走廊", "食堂", "食堂 一楼"]
+COLORS = [None, "", "黑色", "Black", "BLACK", "白色"]
+BRANDS = [None, "LV", "lv", "Apple"]
+WORDS = ["黑色", "钱包", "身份证", "a", "b", "c", "d", "e", "f", "G", "g"]
+
+
+def _random_found(rng, item_id, now):
+    return FoundItem(
+        item_id=item_id, user_id=2, item_name="x",
+        category=rng.choice(CATEGORIES), found_location=rng.choice(LOCATIONS),
+        found_time=now + timedelta(hours=rng.uniform(-400, 400)),
+        description=" ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 8))),
+        color=rng.choice(COLORS), brand=rng.choice(BRANDS)
+    )
+
+
+class TestBatchMatcher(unittest.TestCase):
+    """批量评分测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.matcher = Matcher()
+        self.rng = random.Random(42)
+        self.now = datetime(2024, 5, 1, 12, 0, 0)
+
+    def test_batch_scores_equal_pairwise(self):
+        """测试批量评分 - 与逐对评分结果一致"""
+        found_items = [_random_found(self.rng, i + 1, self.now) for i in range(300)]
+        block = ItemBlock(found_items)
+        for _ in range(30):
+            lost = LostItem(
+                item_id=1, user_id=1, item_name="x",
+                category=self.rng.choice(CATEGORIES), lost_location=self.rng.choice(LOCATIONS),
+                lost_time=self.now, description=" ".join(self.rng.sample(WORDS, 4)),
+                color=self.rng.choice(COLORS), brand=self.rng.choice(BRANDS)
+            )
+            scores = self.matcher.calculate_batch_scores(lost, block)
+            expected = [self.matcher.calculate_total_score(lost, f) for f in found_items]
+            self.assertEqual(scores.tolist(), expected)
+
+    def test_batch_time_tier_boundary(self):
+        """测试批量评分 - 24小时边界与逐对评分一致"""
+        lost = LostItem(
+            item_id=1, user_id=1, item_name="钱包",
+            category="钱包", lost_location="图书馆",
+            lost_time=self.now, description=""
+        )
+        found_items = [
+            FoundItem(
+                item_id=i, user_id=2, item_name="钱包",
+                category="钱包", found_location="图书馆",
+                found_time=self.now + delta, description=""
+            )
+            for i, delta in enumerate([timedelta(hours=24), timedelta(hours=24, microseconds=1),
+                                       -timedelta(hours=72)], start=1)
+        ]
+        scores = self.matcher.calculate_batch_scores(lost, ItemBlock(found_items))
+        self.assertEqual(scores.tolist(), [self.matcher.calculate_total_score(lost, f) for f in found_items])
+
+    def test_match_block_same_as_match_cycle(self):
+        """测试批量匹配 - 结果与 match_cycle 相同"""
+        agent = RuleAgent()
+        found_items = [_random_found(self.rng, i + 1, self.now) for i in range(200)]
+        lost = LostItem(
+            item_id=7, user_id=1, item_name="钱包",
+            category="钱包", lost_location="图书馆",
+            lost_time=self.now, description="黑色 钱包", color="黑色"
+        )
+        expected = agent.match_cycle(lost, found_items)
+        actual = agent.match_block(lost, ItemBlock(found_items))
+        self.assertEqual(actual, expected)
+
+    def test_empty_block(self):
+        """测试批量评分 - 空块"""
+        lost = LostItem(
+            item_id=1, user_id=1, item_name="钱包",
+            category="钱包", lost_location="图书馆",
+            lost_time=self.now, description=""
+        )
+        self.assertEqual(len(self.matcher.calculate_batch_scores(lost, ItemBlock([]))), 0)
+
+    def test_block_from_rows_and_compact_items(self):
+        """测试列式块 - 由数据库行、__slots__ 物品构建的块评分一致"""
+        found_items = [_random_found(self.rng, i + 1, self.now) for i in range(100)]
+        rows = [SimpleNamespace(id=f.item_id, user_id=f.user_id, item_name=f.item_name, category=f.category,
+                                found_location=f.found_location, found_time=f.found_time,
+                                description=f.description, color=f.color, brand=f.brand)
+                for f in found_items]
+        compact = [CompactFoundItem.from_row(r) for r in rows]
+        lost = CompactLostItem(1, 1, "钱包", "钱包", "图书馆", self.now, "黑色 钱包", color="black")
+        expected = [self.matcher.calculate_total_score(lost, f) for f in found_items]
+        self.assertEqual(self.matcher.calculate_batch_scores(lost, ItemBlock.from_rows(rows)).tolist(), expected)
+        self.assertEqual(self.matcher.calculate_batch_scores(lost, ItemBlock(compact)).tolist(), expected)
+        self.assertEqual([self.matcher.calculate_total_score(lost, f) for f in compact], expected)
+
+    def test_compact_item_slots(self):
+        """测试__slots__物品 - 无实例字典，可比较、可序列化"""
+        item = CompactFoundItem(1, 2, "钱包", "钱包", "图书馆", self.now, "黑色")
+        self.assertFalse(hasattr(item, "__dict__"))
+        self.assertEqual(pickle.loads(pickle.dumps(item)), item)
+        self.assertNotEqual(CompactFoundItem(2, 2, "钱包", "钱包", "图书馆", self.now, "黑色"), item)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+"""测试校园地点层级解析"""
+import unittest
+from app.campus import LocationPath, building_zone, location_levels, nearby_buildings, parse_location
+
+
+class TestParseLocation(unittest.TestCase):
+    """地点解析测试类"""
+
+    def test_parse_levels(self):
+        """测试解析 - 校区/楼宇/楼层/区域"""
+        self.assertEqual(parse_location("教学楼A-二楼走廊"), LocationPath("", "教学楼A", "2F", "走廊"))
+        self.assertEqual(parse_location("东校区 图书馆 3楼"), LocationPath("东校区", "图书馆", "3F", ""))
+        self.assertEqual(parse_location("图书馆东门"), LocationPath("", "图书馆", "", "东门"))
+        self.assertEqual(parse_location("第一食堂十二层"), LocationPath("", "第一食堂", "12F", ""))
+        self.assertEqual(parse_location("地下一层停车场"), LocationPath("", "", "B1", "停车场"))
+        self.assertEqual(parse_location(""), LocationPath("", "", "", ""))
+
+    def test_contains(self):
+        """测试上级地点 - 未填写的层级视为包含"""
+        self.assertTrue(parse_location("图书馆").contains(parse_location("图书馆-3楼-自习区")))
+        self.assertFalse(parse_location("图书馆-3楼").contains(parse_location("图书馆-2楼")))
+        self.assertFalse(parse_location("图书馆").contains(parse_location("图书馆")))
+
+    def test_nearby_buildings(self):
+        """测试相邻楼宇 - 同一分区或同类楼宇"""
+        self.assertTrue(nearby_buildings("教学楼A", "实验楼"))
+        self.assertTrue(nearby_buildings("3号楼", "5号楼"))
+        self.assertFalse(nearby_buildings("图书馆", "体育馆"))
+        self.assertFalse(nearby_buildings("图书馆", "图书馆"))
+
+    def test_location_levels(self):
+        """测试层级与相邻分组 - 分区表外的同类楼宇归入同一分区，其余按楼宇类别分组"""
+        self.assertEqual(location_levels("东校区 教学楼D-二楼"), ("东校区", "教学楼D", "2F", "", "教学区"))
+        self.assertEqual(building_zone("第三食堂"), "生活区")
+        self.assertEqual(building_zone("3号楼"), building_zone("5号楼"))
+        self.assertEqual(location_levels("")[1:], ("", "", "", ""))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+"""测试表变更版本号与条件 GET"""
+import unittest
+from datetime import datetime
+from flask import Flask, jsonify, request
+from sqlalchemy import event
+from app.conditional import conditional_get
+from app.models import LostItem, FoundItem
+from app.database import models_db
+from tests.base import DatabaseTestCase
+
+
+class TestConditionalGet(DatabaseTestCase):
+    """条件 GET 测试类"""
+
+    def setUp(self):
+        super().setUp()
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: self.statements.append(statement))
+
+        app = Flask(__name__)
+
+        def check_cursor(session):
+            try:
+                self.dbm.check_items_cursor('lost', request.args.get('cursor'))
+            except ValueError:
+                return jsonify({'success': False}), 400
+            return None
+
+        @app.route('/lost')
+        def lost_list():
+            return conditional_get(self.dbm, models_db.LostItemDB, lambda: jsonify(
+                [item['id'] for item in self.dbm.get_items_page(
+                    self.session, 'lost', cursor=request.args.get('cursor'),
+                    limit=request.args.get('limit', 50, type=int)).items]), check_cursor)
+
+        @app.route('/lost/<int:lost_id>')
+        def lost_detail(lost_id):
+            def check_exists(session):
+                return (jsonify({'success': False}), 404) if session.get(models_db.LostItemDB, lost_id) is None else None
+            return conditional_get(self.dbm, models_db.LostItemDB, lambda: jsonify({'id': lost_id}), check_exists)
+
+        @app.route('/missing')
+        def missing():
+            return conditional_get(self.dbm, models_db.LostItemDB, lambda: (jsonify({'success': False}), 404))
+
+        self.client = app.test_client()
+
+    def _create_lost(self):
+        return self.dbm.create_lost_item(self.session, LostItem(
+            item_id=None, user_id=1, item_name="钱包", category="钱包",
+            lost_location="图书馆", lost_time=datetime(2024, 5, 1, 12), description="黑色"))
+
+    def test_versions_follow_writes(self):
+        """测试版本号 - 发布和标记解决时加一，各表独立，无权限的操作不变"""
+        self.assertEqual(self.dbm.get_table_version(self.session, models_db.LostItemDB), (0, None, None))
+        lost = self._create_lost()
+        self.assertEqual(self.dbm.get_table_version(self.session, models_db.LostItemDB)[0], 1)
+        epoch = self.dbm.get_table_version(self.session, models_db.LostItemDB)[2]
+        self.dbm.mark_lost_item_resolved(self.session, lost.id, 1)
+        self.dbm.mark_lost_item_resolved(self.session, lost.id, 2)
+        version, updated_at, same_epoch = self.dbm.get_table_version(self.session, models_db.LostItemDB)
+        self.assertEqual(version, 2)
+        self.assertIsInstance(updated_at, datetime)
+        self.assertEqual(same_epoch, epoch)
+        self.assertEqual(self.dbm.get_table_version(self.session, models_db.FoundItemDB), (0, None, None))
+        self.dbm.create_found_item(self.session, FoundItem(
+            item_id=None, user_id=2, item_name="钱包", category="钱包",
+            found_location="图书馆", found_time=datetime(2024, 5, 1, 12), description="黑色"))
+        self.assertEqual(self.dbm.get_table_version(self.session, models_db.FoundItemDB)[0], 1)
+
+    def test_not_modified_skips_item_tables(self):
+        """测试条件 GET - ETag 未变返回 304 且不查询物品表，写入后返回新内容"""
+        self._create_lost()
+        first = self.client.get('/lost')
+        etag = first.headers['ETag']
+        epoch = self.dbm.get_table_version(self.session, models_db.LostItemDB)[2]
+        self.assertTrue(etag.startswith(f'"lost_items-{epoch}-1-'))
+        self.assertNotIn('Last-Modified', first.headers)
+        self.assertIn('no-cache', first.headers['Cache-Control'])
+
+        self.statements.clear()
+        cached = self.client.get('/lost', headers={'If-None-Match': etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.headers['ETag'], etag)
+        self.assertEqual(cached.data, b'')
+        self.assertEqual(len(self.statements), 1)
+        self.assertIn("table_versions", self.statements[0])
+
+        self._create_lost()
+        fresh = self.client.get('/lost', headers={'If-None-Match': etag})
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(fresh.get_json(), [2, 1])
+        self.assertTrue(fresh.headers['ETag'].startswith(f'"lost_items-{epoch}-2-'))
+
+    def test_recreated_database_changes_etag(self):
+        """测试条件 GET - 数据库重建后版本号从头计数，旧 ETag 不会得到 304"""
+        self._create_lost()
+        etag = self.client.get('/lost').headers['ETag']
+        # 模拟删库重建：清空物品与版本号后重新发布一条
+        self.session.query(models_db.LostItemDB).delete()
+        self.session.query(models_db.TableVersionDB).delete()
+        self.session.commit()
+        self._create_lost()
+        response = self.client.get('/lost', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertNotEqual(response.headers['ETag'].split('-')[1], etag.split('-')[1])
+
+    def test_etag_depends_on_request(self):
+        """测试条件 GET - 不同页、不同物品的 ETag 不同，参数顺序不影响 ETag"""
+        for _ in range(3):
+            self._create_lost()
+        first = self.client.get('/lost?limit=1')
+        self.assertEqual(first.get_json(), [3])
+        cursor = self.dbm.get_items_page(self.session, 'lost', limit=1).next_cursor
+        second = self.client.get(f'/lost?limit=1&cursor={cursor}',
+                                 headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.get_json(), [2])
+        reordered = self.client.get(f'/lost?cursor={cursor}&limit=1',
+                                    headers={'If-None-Match': second.headers['ETag']})
+        self.assertEqual(reordered.status_code, 304)
+        detail = self.client.get('/lost/1', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(detail.status_code, 200)
+        self.assertNotEqual(detail.headers['ETag'], self.client.get('/lost/2').headers['ETag'])
+
+    def test_invalid_request_never_gets_304(self):
+        """测试条件 GET - 无效游标返回 400、不存在的物品返回 404，即使带着匹配的 If-None-Match"""
+        lost = self._create_lost()
+        etag = self.client.get('/lost').headers['ETag']
+        # If-None-Match: * 与任何 ETag 都匹配，错误请求也不能因此得到 304
+        bad = self.client.get('/lost?cursor=zzz', headers={'If-None-Match': '*'})
+        self.assertEqual(bad.status_code, 400)
+        self.assertNotIn('ETag', bad.headers)
+        missing = self.client.get('/lost/999', headers={'If-None-Match': '*'})
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(self.client.get(f'/lost/{lost.id}', headers={'If-None-Match': '*'}).status_code, 304)
+        self.assertEqual(self.client.get('/lost', headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_if_modified_since_alone_is_ignored(self):
+        """测试条件 GET - 只带 If-Modified-Since 时不返回 304（同一秒内的写入无法区分）"""
+        self._create_lost()
+        self.client.get('/lost')
+        self._create_lost()
+        response = self.client.get('/lost', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), [2, 1])
+
+    def test_errors_have_no_validators(self):
+        """测试条件 GET - 非 2xx 响应不带 ETag"""
+        response = self.client.get('/missing')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
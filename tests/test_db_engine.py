@@ -0,0 +1,45 @@
+"""测试数据库引擎配置档"""
+import unittest
+from sqlalchemy import text
+from app.database.db import create_db_engine, init_db
+from tests.base import TempDatabaseTestCase
+
+
+class TestEngineProfiles(TempDatabaseTestCase):
+    """引擎配置档测试类"""
+
+    def _engine(self, profile):
+        engine = create_db_engine(f"sqlite:///{self.db_path}", profile)
+        self.addCleanup(engine.dispose)
+        return engine
+
+    def test_production_pragmas(self):
+        """测试 production 配置档 - 每个连接都设置 WAL 等 PRAGMA"""
+        engine = self._engine("production")
+        with engine.connect() as conn:
+            self.assertEqual(conn.exec_driver_sql("PRAGMA journal_mode").scalar(), "wal")
+            self.assertEqual(conn.exec_driver_sql("PRAGMA synchronous").scalar(), 1)
+            self.assertEqual(conn.exec_driver_sql("PRAGMA busy_timeout").scalar(), 10000)
+
+    def test_default_profile_and_unknown(self):
+        """测试 default 配置档不改 PRAGMA，未知配置档报错"""
+        with self._engine("default").connect() as conn:
+            self.assertEqual(conn.exec_driver_sql("PRAGMA journal_mode").scalar(), "delete")
+        with self.assertRaises(ValueError):
+            create_db_engine(f"sqlite:///{self.db_path}", "fast")
+
+    def test_reader_not_blocked_by_writer(self):
+        """测试 WAL - 写事务未提交时其他连接仍可读取已提交的数据"""
+        engine = self._engine("production")
+        init_db(engine)
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO users (student_id, name, password_hash) VALUES ('1', 'a', 'x')"))
+        with engine.connect() as writer, engine.connect() as reader:
+            writer.exec_driver_sql("BEGIN IMMEDIATE")
+            writer.execute(text("INSERT INTO users (student_id, name, password_hash) VALUES ('2', 'b', 'x')"))
+            self.assertEqual(reader.execute(text("SELECT COUNT(*) FROM users")).scalar(), 1)
+            writer.rollback()
+
+
+if __name__ == '__main__':
+    unittest.main()
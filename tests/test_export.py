@@ -0,0 +1,48 @@
+"""测试流式导出"""
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.models import LostItem, FoundItem
+from tests.base import DatabaseTestCase
+
+
+class TestIterItems(DatabaseTestCase):
+    """流式导出测试类"""
+
+    def setUp(self):
+        super().setUp()
+        now = datetime(2024, 5, 1, 12)
+        for i in range(5):
+            self.dbm.create_lost_item(self.session, LostItem(
+                item_id=None, user_id=1, item_name=f"钱包{i}", category="钱包",
+                lost_location="图书馆", lost_time=now - timedelta(hours=i), description="黑色",
+                color="黑色" if i % 2 else None))
+        self.dbm.create_found_item(self.session, FoundItem(
+            item_id=None, user_id=2, item_name="水杯", category="其他",
+            found_location="食堂", found_time=now, description=None))
+        self.dbm.mark_lost_item_resolved(self.session, 2, 1)
+
+    def test_same_items_as_list_api(self):
+        """测试流式导出 - 与列表接口的字典相同，按ID排序，默认不含已解决的"""
+        for side, include_resolved in (('lost', False), ('lost', True), ('found', False)):
+            expected = (self.dbm.get_all_lost_items_dict if side == 'lost' else self.dbm.get_all_found_items_dict)(
+                self.session, include_resolved=include_resolved)
+            items = list(self.dbm.iter_items(self.session, side, include_resolved=include_resolved, batch_size=2))
+            self.assertEqual(items, sorted(expected, key=lambda item: item['id']))
+        self.assertEqual([item['id'] for item in self.dbm.iter_items(self.session, 'lost')], [1, 3, 4, 5])
+
+    def test_reads_columns_in_batches(self):
+        """测试流式导出 - 只查询导出的列，按批从游标读取"""
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        items = self.dbm.iter_items(self.session, 'lost', batch_size=2)
+        self.assertEqual(statements, [])
+        self.assertEqual(next(items)['id'], 1)
+        self.assertEqual(len(statements), 1)
+        self.assertNotIn("description_tokens", statements[0])
+        self.assertEqual(len(list(items)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,276 @@
+"""测试候选索引"""
+import random
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.models import LostItem, FoundItem, to_epoch_us
+from app.agent.matcher import Matcher
+from app.agent.rule_agent import RuleAgent
+from app.database import models_db
+from app.database.item_index import CategoryIndex, MatchIndex
+from tests.base import DatabaseTestCase
+
+
+def _found(item_id, category, location="图书馆", found_time=datetime(2024, 5, 1, 12)):
+    return FoundItem(
+        item_id=item_id, user_id=2, item_name="物品",
+        category=category, found_location=location,
+        found_time=found_time, description=""
+    )
+
+
+class TestCategoryIndex(unittest.TestCase):
+    """类别索引测试类"""
+
+    def test_candidates_same_category_only(self):
+        """测试候选 - 只返回同类别物品"""
+        index = CategoryIndex([_found(1, "钱包"), _found(2, "手机"), _found(3, "钱包")])
+        self.assertEqual([f.item_id for f in index.candidates("钱包")], [1, 3])
+        self.assertEqual(index.candidates("钥匙"), [])
+
+    def test_other_category_not_indexed(self):
+        """测试候选 - "其他"类别不入索引"""
+        index = CategoryIndex([_found(1, "其他")])
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.candidates("其他"), [])
+
+    def test_add_replaces_and_remove(self):
+        """测试更新 - 重复加入替换旧类别，移除后不再返回"""
+        index = CategoryIndex([_found(1, "钱包")])
+        index.add(_found(1, "手机"))
+        self.assertEqual(index.candidates("钱包"), [])
+        self.assertEqual([f.item_id for f in index.candidates("手机")], [1])
+        index.remove(1)
+        index.remove(1)
+        self.assertNotIn(1, index)
+        self.assertEqual(len(index), 0)
+
+    def test_time_tiers_match_time_rule(self):
+        """测试时间分档 - 每档物品的时间分与 match_by_time 一致，且覆盖全部物品"""
+        matcher = Matcher()
+        now = datetime(2024, 5, 1, 12)
+        offsets = [0, 24, -24, 25, -71.5, 72, 100, -168, 168.01, -500]
+        items = [_found(i, "钱包", found_time=now + timedelta(hours=h)) for i, h in enumerate(offsets, start=1)]
+        index = CategoryIndex(items)
+        lost = LostItem(item_id=1, user_id=1, item_name="钱包", category="钱包",
+                        lost_location="图书馆", lost_time=now, description="")
+        seen = []
+        scores = []
+        for score, entries in index.time_tiers("钱包", to_epoch_us(now), matcher.TIME_TIERS, matcher.TIME_FLOOR):
+            scores.append(score)
+            for _, item in entries:
+                self.assertEqual(matcher.match_by_time(lost, item), score)
+                seen.append(item.item_id)
+        self.assertEqual(sorted(seen), list(range(1, len(offsets) + 1)))
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_indexed_match_cycle_same_as_scan(self):
+        """测试按时间分档匹配 - 与全量扫描结果一致"""
+        rng = random.Random(3)
+        now = datetime(2024, 5, 1, 12)
+        items = [
+            FoundItem(
+                item_id=i, user_id=2, item_name="物品",
+                category=rng.choice(["钱包", "手机"]),
+                found_location=rng.choice(["图书馆", "图书馆一楼", "食堂"]),
+                found_time=now + timedelta(hours=rng.uniform(-300, 300)),
+                description=rng.choice(["黑色 钱包", "钱包", ""]),
+                color=rng.choice([None, "黑色"])
+            )
+            for i in range(1, 401)
+        ]
+        index = CategoryIndex(items)
+        lost = LostItem(item_id=9, user_id=1, item_name="钱包", category="钱包",
+                        lost_location="图书馆", lost_time=now, description="黑色 钱包", color="黑色")
+        for agent in (RuleAgent(), RuleAgent(top_k=10), RuleAgent(top_k=3, threshold=90.0)):
+            self.assertEqual(agent.match_cycle(lost, index=index), agent.match_cycle(lost, items))
+
+    def test_keyword_overlap_postings(self):
+        """测试倒排表 - 共同词数与逐对求交集一致，移除后不再计数"""
+        vocab = {}
+
+        def with_tokens(item):
+            item.token_ids = tuple(sorted({vocab.setdefault(w, len(vocab) + 1) for w in item.description.lower().split()}))
+            return item
+
+        rng = random.Random(5)
+        words = ["黑色", "钱包", "学生证", "银行卡", "皮质"]
+        items = [with_tokens(FoundItem(item_id=i, user_id=2, item_name="物品", category="钱包",
+                                       found_location="图书馆", found_time=datetime(2024, 5, 1, 12),
+                                       description=" ".join(rng.sample(words, rng.randint(0, 4)))))
+                 for i in range(1, 201)]
+        # 没有词ID的旧数据不进入倒排表，匹配时逐对计算
+        items.append(FoundItem(item_id=201, user_id=2, item_name="物品", category="钱包", found_location="图书馆",
+                               found_time=datetime(2024, 5, 1, 12), description="黑色 钱包 学生证"))
+        index = CategoryIndex(items)
+        lost = with_tokens(LostItem(item_id=9, user_id=1, item_name="钱包", category="钱包", lost_location="图书馆",
+                                    lost_time=datetime(2024, 5, 1), description="黑色 钱包 学生证 钱包"))
+        overlap = index.keyword_overlap("钱包", lost.token_ids)
+        for f in items[:200]:
+            self.assertEqual(overlap.get(f.item_id, 0), len(set(lost.description.split()) & set(f.description.split())))
+        self.assertNotIn(201, overlap)
+        agent = RuleAgent(top_k=20)
+        self.assertEqual(agent.match_cycle(lost, index=index), agent.match_cycle(lost, items))
+
+        for f in items:
+            index.remove(f.item_id)
+        self.assertEqual(index.keyword_overlap("钱包", lost.token_ids), {})
+
+
+class TestDatabaseManagerIndex(DatabaseTestCase):
+    """DatabaseManager 维护索引测试类"""
+
+    def test_index_tracks_create_and_resolve(self):
+        """测试索引 - 发布与标记解决时同步更新"""
+        first = self.dbm.create_found_item(self.session, _found(None, "钱包"))
+        index = self.dbm.get_found_index(self.session)
+        self.assertIn(first.id, index)
+
+        second = self.dbm.create_found_item(self.session, _found(None, "钱包"))
+        self.assertEqual([f.item_id for f in index.candidates("钱包")], [first.id, second.id])
+
+        self.dbm.mark_found_item_resolved(self.session, first.id, user_id=2)
+        self.assertNotIn(first.id, index)
+        self.dbm.mark_found_item_resolved(self.session, first.id, user_id=2, resolved=False)
+        self.assertIn(first.id, index)
+
+    def test_lost_index_tracks_create_and_resolve(self):
+        """测试失物索引 - 发布与标记解决时同步更新"""
+        lost = LostItem(item_id=None, user_id=1, item_name="钱包", category="钱包",
+                        lost_location="图书馆", lost_time=datetime(2024, 5, 1), description="")
+        index = self.dbm.get_lost_index(self.session)
+        db_lost = self.dbm.create_lost_item(self.session, lost)
+        self.assertEqual([l.item_id for l in index.candidates("钱包")], [db_lost.id])
+        self.dbm.mark_lost_item_resolved(self.session, db_lost.id, user_id=1)
+        self.assertEqual(index.candidates("钱包"), [])
+
+    def test_description_tokens_persisted(self):
+        """测试描述词ID - 发布时写入 description_tokens，与词表一致并进入倒排表"""
+        found = _found(None, "钱包")
+        found.description = "黑色 钱包 黑色"
+        db_found = self.dbm.create_found_item(self.session, found)
+        words = {t.id: t.word for t in self.session.query(models_db.TokenDB)}
+        token_ids = [int(t) for t in db_found.description_tokens.split()]
+        self.assertEqual(sorted(words[t] for t in token_ids), ["钱包", "黑色"])
+
+        lost = LostItem(item_id=None, user_id=1, item_name="钱包", category="钱包",
+                        lost_location="图书馆", lost_time=datetime(2024, 5, 1), description="钱包 丢了")
+        db_lost = self.dbm.create_lost_item(self.session, lost)
+        self.assertEqual(len(words), self.session.query(models_db.TokenDB).count() - 1)
+        index = self.dbm.get_found_index(self.session)
+        lost_item = self.dbm._lost_from_row(db_lost)
+        self.assertEqual(index.keyword_overlap("钱包", lost_item.token_ids), {db_found.id: 1})
+
+    def test_attribute_codes_persisted(self):
+        """测试属性编码 - 发布时写入编码，按编码评分与按字符串评分一致"""
+        found = _found(None, "钱包")
+        found.color, found.brand = "black", "LV"
+        db_found = self.dbm.create_found_item(self.session, found)
+        lost = LostItem(item_id=None, user_id=1, item_name="钱包", category="钱包", lost_location="图书馆",
+                        lost_time=datetime(2024, 5, 1), description="", color="Black", brand="Gucci")
+        db_lost = self.dbm.create_lost_item(self.session, lost)
+        lost_item, found_item = self.dbm._lost_from_row(db_lost), self.dbm._found_from_row(db_found)
+        self.assertEqual(lost_item.color_code, found_item.color_code)
+        self.assertNotEqual(lost_item.brand_code, found_item.brand_code)
+        self.assertEqual(lost_item.location_code, found_item.location_code)
+
+        matcher = Matcher()
+        score = matcher.calculate_total_score(lost_item, found_item)
+        for item in (lost_item, found_item):
+            item.category_code = item.location_code = item.color_code = item.brand_code = None
+        self.assertEqual(matcher.calculate_total_score(lost_item, found_item), score)
+        for item in (lost_item, found_item):
+            item.location_levels = None
+        self.assertEqual(matcher.calculate_total_score(lost_item, found_item), score)
+
+    def test_location_levels_persisted(self):
+        """测试地点层级 - 发布时解析并保存编码，按编码评分与解析文本一致，索引按楼宇编码分组"""
+        locations = ["教学楼A-二楼走廊", "教学楼A", "教学楼A-三楼", "教学楼B-一楼", "东校区图书馆", "西校区图书馆", "食堂"]
+        found = [self.dbm._found_from_row(self.dbm.create_found_item(self.session, _found(None, "钱包", location)))
+                 for location in locations]
+        lost = self.dbm._lost_from_row(self.dbm.create_lost_item(self.session, LostItem(
+            item_id=None, user_id=1, item_name="钱包", category="钱包", lost_location="教学楼A-二楼走廊",
+            lost_time=datetime(2024, 5, 1), description="")))
+        self.assertEqual(lost.location_levels, found[0].location_levels)
+        self.assertEqual(found[1].location_levels[2:4], (None, None))
+
+        matcher = Matcher()
+        by_codes = [matcher.match_by_location(lost, f) for f in found]
+        self.assertEqual(by_codes, [matcher.score_location(lost.lost_location, f.found_location) for f in found])
+        self.assertEqual(by_codes, [25.0, 20.0, 15.0, 10.0, 5.0, 5.0, 5.0])
+
+        index = self.dbm.get_match_index(self.session).found
+        self.assertEqual(index.building_members("钱包", lost.location_levels[1]), {f.item_id for f in found[:3]})
+
+    def test_match_index_check_and_rebuild(self):
+        """测试匹配索引 - 绕过 DatabaseManager 的修改能被检查出来，重建后恢复一致"""
+        lost = LostItem(item_id=None, user_id=1, item_name="钱包", category="钱包",
+                        lost_location="图书馆", lost_time=datetime(2024, 5, 1), description="黑色")
+        db_lost = self.dbm.create_lost_item(self.session, lost)
+        db_found = self.dbm.create_found_item(self.session, _found(None, "钱包"))
+        self.dbm.warm_match_index()
+        self.assertTrue(MatchIndex.is_consistent(self.dbm.check_match_index(self.session)))
+
+        # 直接改库：招领被标记解决、失物类别被修改
+        self.session.query(models_db.FoundItemDB).filter_by(id=db_found.id).update({"is_resolved": True})
+        self.session.query(models_db.LostItemDB).filter_by(id=db_lost.id).update({"category": "手机"})
+        self.session.commit()
+        report = self.dbm.check_match_index(self.session)
+        self.assertEqual(report["found"]["extra"], [db_found.id])
+        self.assertEqual(report["lost"]["stale"], [db_lost.id])
+
+        index = self.dbm.rebuild_match_index(self.session)
+        self.assertTrue(MatchIndex.is_consistent(self.dbm.check_match_index(self.session)))
+        self.assertIs(self.dbm.get_match_index(self.session), index)
+        self.assertEqual([l.item_id for l in index.lost.candidates("手机")], [db_lost.id])
+
+    def test_refresh_after_other_process_writes(self):
+        """测试匹配索引 - 本进程的写入不触发同步，其他进程写入后 refresh 只读取新写入的行"""
+        lost = LostItem(item_id=None, user_id=1, item_name="钱包", category="钱包",
+                        lost_location="图书馆", lost_time=datetime(2024, 5, 1), description="黑色")
+        index = self.dbm.refresh_match_index(self.session)
+        db_lost = self.dbm.create_lost_item(self.session, lost)
+        self.dbm.mark_lost_item_resolved(self.session, db_lost.id, 1)
+        self.assertIs(self.dbm.refresh_match_index(self.session), index)
+
+        other = self.other_manager()
+        with other.get_session() as session:
+            old_found_id = other.create_found_item(session, _found(None, "钱包")).id
+        self.dbm.refresh_match_index(self.session)
+        with other.get_session() as session:
+            found_id = other.create_found_item(session, _found(None, "钱包")).id
+            other.mark_found_item_resolved(session, old_found_id, 2)
+            lost_id = other.create_lost_item(session, lost).id
+        self.assertEqual([f.item_id for f in index.found.candidates("钱包")], [old_found_id])
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(self.engine, "before_cursor_execute", listener)
+        try:
+            refreshed = self.dbm.refresh_match_index(self.session)
+        finally:
+            event.remove(self.engine, "before_cursor_execute", listener)
+        self.assertIs(refreshed, index)
+        self.assertEqual([f.item_id for f in index.found.candidates("钱包")], [found_id])
+        self.assertEqual([l.item_id for l in index.lost.candidates("钱包")], [lost_id])
+        # 一条版本查询 + 每张表一条按 row_version 的增量查询
+        self.assertEqual(len(statements), 3)
+        self.assertTrue(all("row_version >" in st for st in statements[1:]))
+        self.assertTrue(MatchIndex.is_consistent(self.dbm.check_match_index(self.session)))
+
+    def test_refresh_rebuilds_when_epoch_changes(self):
+        """测试匹配索引 - 数据库重建（epoch 变化）后 refresh 从头构建"""
+        self.dbm.create_found_item(self.session, _found(None, "钱包"))
+        index = self.dbm.refresh_match_index(self.session)
+        self.session.query(models_db.FoundItemDB).delete()
+        self.session.query(models_db.TableVersionDB).delete()
+        self.session.commit()
+        other = self.other_manager()
+        with other.get_session() as session:
+            found_id = other.create_found_item(session, _found(None, "钱包")).id
+        refreshed = self.dbm.refresh_match_index(self.session)
+        self.assertIsNot(refreshed, index)
+        self.assertEqual([f.item_id for f in refreshed.found.candidates("钱包")], [found_id])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""测试批量保存匹配结果"""
+import unittest
+from datetime import datetime
+from functools import partial
+from sqlalchemy import event
+from app.models import LostItem, FoundItem, MatchRecord
+from app.agent.notification_agent import NotificationAgent
+from app.database import models_db
+from tests.base import DatabaseTestCase
+
+
+class TestCreateMatchRecords(DatabaseTestCase):
+    """批量保存匹配结果测试类"""
+
+    def setUp(self):
+        """测试前准备：临时数据库，一个失物和三个招领"""
+        super().setUp()
+        self.agent = NotificationAgent(self.dbm)
+        now = datetime(2024, 5, 1, 12)
+        self.lost = self.dbm.create_lost_item(self.session, LostItem(
+            item_id=None, user_id=1, item_name="钱包", category="钱包",
+            lost_location="图书馆", lost_time=now, description="黑色"))
+        self.found = [self.dbm.create_found_item(self.session, FoundItem(
+            item_id=None, user_id=user_id, item_name="钱包", category="钱包",
+            found_location="图书馆", found_time=now, description="黑色"))
+            for user_id in (2, None, 3)]
+        self.records = [MatchRecord(self.lost.id, f.id, score, f"score={score:.1f}")
+                        for f, score in zip(self.found, (95.0, 85.0, 60.0))]
+
+    def _notifications(self):
+        return sorted((n.user_id, n.title, n.related_item_id)
+                      for n in self.session.query(models_db.NotificationDB))
+
+    def test_same_result_as_loop_in_one_commit(self):
+        """测试批量保存 - 记录与通知和逐条保存一致，只提交一次"""
+        commits = []
+        event.listen(self.engine, "commit", lambda conn: commits.append(1))
+        rows = self.dbm.create_match_records(
+            self.session, self.records, notify=partial(self.agent.notify_on_matches, commit=False))
+        self.assertEqual(len(commits), 1)
+        self.assertEqual([(r.found_item_id, r.match_score, r.is_notified) for r in rows],
+                         [(f.id, r.match_score, True) for f, r in zip(self.found, self.records)])
+        batched = self._notifications()
+
+        # 逐条保存的旧流程
+        self.session.query(models_db.NotificationDB).delete()
+        self.session.query(models_db.MatchRecordDB).delete()
+        self.session.commit()
+        for m, db_found in zip(self.records, self.found):
+            db_match = self.dbm.create_match_record(self.session, m)
+            self.agent.notify_on_match(self.session, db_match, self.lost, db_found)
+        self.assertEqual(self._notifications(), batched)
+        self.assertEqual(len(batched), 4)
+
+    def test_anonymous_lost_marks_only_notified_records(self):
+        """测试批量保存 - 匿名失物没有可通知的人时，匹配记录不标记为已通知"""
+        self.lost.user_id = None
+        self.session.commit()
+        rows = self.dbm.create_match_records(
+            self.session, self.records, notify=partial(self.agent.notify_on_matches, commit=False))
+        # 95 分通知拾主2；85 分的拾主匿名；60 分只通知失主（匿名）
+        self.assertEqual([r.is_notified for r in rows], [True, False, False])
+        self.assertEqual([n[0] for n in self._notifications()], [2])
+
+    def test_existing_pairs_are_skipped(self):
+        """测试批量保存 - 已保存的 (失物, 招领) 对由唯一索引跳过，不重复保存也不重复通知"""
+        notify = partial(self.agent.notify_on_matches, commit=False)
+        self.dbm.create_match_records(self.session, self.records[:1], notify=notify)
+        before = self._notifications()
+        rows = self.dbm.create_match_records(self.session, self.records, notify=notify)
+        self.assertEqual([r.found_item_id for r in rows], [f.id for f in self.found[1:]])
+        self.assertEqual(self.session.query(models_db.MatchRecordDB).count(), 3)
+        self.assertEqual(self.dbm.create_match_records(self.session, self.records, notify=notify), [])
+        self.assertEqual(len(self._notifications()), len(before) + 2)
+
+    def test_without_notify_and_empty(self):
+        """测试批量保存 - 不通知时只写匹配记录，空列表不访问数据库"""
+        self.assertEqual(self.dbm.create_match_records(self.session, []), [])
+        rows = self.dbm.create_match_records(self.session, self.records)
+        self.assertEqual([r.is_notified for r in rows], [False] * 3)
+        self.assertEqual(self._notifications(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+"""测试发布后的异步匹配流水线"""
+import threading
+import unittest
+from datetime import datetime
+from app.models import LostItem, FoundItem
+from app.agent.job_worker import JobWorker, run_match_job
+from app.agent.match_pipeline import MatchPipeline
+from app.agent.notification_agent import NotificationAgent
+from app.agent.rule_agent import RuleAgent
+from app.database import models_db, outbox
+from tests.base import DatabaseTestCase
+
+
+class TestMatchPipeline(DatabaseTestCase):
+    """异步匹配流水线测试类"""
+
+    def setUp(self):
+        super().setUp()
+        self.notification_agent = NotificationAgent(self.dbm)
+        self.now = datetime(2024, 5, 1, 12)
+        self.pipeline = None
+
+    def tearDown(self):
+        if self.pipeline is not None:
+            self.pipeline.stop()
+
+    def _start(self, **options) -> MatchPipeline:
+        options.setdefault('retry_delay', 0)
+        self.pipeline = MatchPipeline(self.dbm, RuleAgent(), self.notification_agent, **options)
+        return self.pipeline
+
+    def _create_pair(self):
+        found = self.dbm.create_found_item(self.session, FoundItem(
+            item_id=None, user_id=2, item_name="黑色钱包", category="钱包",
+            found_location="图书馆", found_time=self.now, description="黑色皮质钱包", color="黑色"))
+        lost = self.dbm.create_lost_item(self.session, LostItem(
+            item_id=None, user_id=1, item_name="黑色钱包", category="钱包",
+            lost_location="图书馆", lost_time=self.now, description="黑色皮质钱包", color="黑色"))
+        return lost.id, found.id
+
+    def _match_count(self) -> int:
+        self.session.expire_all()
+        return self.session.query(models_db.MatchRecordDB).count()
+
+    def test_background_match_and_notify(self):
+        """测试后台匹配 - 任务完成后保存匹配记录并发送通知"""
+        pipeline = self._start(workers=2)
+        lost_id, found_id = self._create_pair()
+        self.assertTrue(pipeline.submit('lost', lost_id))
+        pipeline.join()
+        status = pipeline.status('lost', lost_id)
+        self.assertEqual(status['state'], 'done')
+        self.assertEqual(status['matches'], 1)
+        self.assertEqual(self._match_count(), 1)
+        self.assertGreater(self.session.query(models_db.NotificationDB).count(), 0)
+        self.assertIsNone(pipeline.status('found', found_id))
+
+    def test_anonymous_lost_item(self):
+        """测试匿名失物 - 没有失主时只通知拾主，匹配照常保存；招领反向匹配到匿名失物也一样"""
+        pipeline = self._start(workers=0)
+        lost = self.dbm.create_lost_item(self.session, LostItem(
+            item_id=None, user_id=None, item_name="黑色钱包", category="钱包",
+            lost_location="图书馆", lost_time=self.now, description="黑色皮质钱包", color="黑色"))
+        found = self.dbm.create_found_item(self.session, FoundItem(
+            item_id=None, user_id=2, item_name="黑色钱包", category="钱包",
+            found_location="图书馆", found_time=self.now, description="黑色皮质钱包", color="黑色"))
+        self.assertEqual(len(pipeline.run_now('found', found.id)), 1)
+        self.assertEqual(len(pipeline.run_now('lost', lost.id)), 0)
+        self.assertEqual(self._match_count(), 1)
+        self.assertEqual({n.user_id for n in self.session.query(models_db.NotificationDB)}, {2})
+        jobs = self.session.query(models_db.MatchJobDB.state, models_db.MatchJobDB.attempts).all()
+        self.assertEqual(jobs, [('done', 1), ('done', 1)])
+
+    def test_sees_items_from_other_process(self):
+        """测试多进程 - 另一个进程发布的招领不在本进程的匹配索引中，匹配前重建索引后能匹配到"""
+        pipeline = self._start(workers=0)
+        self.dbm.warm_match_index()
+        other = self.other_manager()
+        with other.get_session() as session:
+            found_id = other.create_found_item(session, FoundItem(
+                item_id=None, user_id=2, item_name="黑色钱包", category="钱包",
+                found_location="图书馆", found_time=self.now, description="黑色皮质钱包", color="黑色")).id
+        lost = self.dbm.create_lost_item(self.session, LostItem(
+            item_id=None, user_id=1, item_name="黑色钱包", category="钱包",
+            lost_location="图书馆", lost_time=self.now, description="黑色皮质钱包", color="黑色"))
+        matches = pipeline.run_now('lost', lost.id)
+        self.assertEqual([m.found_item_id for m in matches], [found_id])
+        self.assertEqual(self._match_count(), 1)
+
+    def test_never_shares_a_job_with_job_worker(self):
+        """测试与 JobWorker 并存 - 同一物品的任务只由先领取租约的一方匹配、保存和通知一次"""
+        pipeline = self._start(workers=0)
+        worker = JobWorker(self.dbm, RuleAgent(), self.notification_agent)
+        lost_id, found_id = self._create_pair()
+        # 定时补做已领取了失物的任务、尚未完成：流水线领不到，不匹配
+        claimed = outbox.claim_jobs(self.session, limit=1, kind='lost', item_id=lost_id)
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(pipeline.run_now('lost', lost_id), [])
+        self.assertEqual(self._match_count(), 0)
+        # 流水线处理完招领的任务后，补做不会再领取它
+        self.assertEqual(len(pipeline.run_now('found', found_id)), 1)
+        self.assertEqual(worker.drain()['claimed'], 0)
+        notifications = self.session.query(models_db.NotificationDB).count()
+        # 补做进程拿着失物任务的租约完成匹配：这一对已保存，不重复保存和通知
+        self.assertEqual(run_match_job(self.dbm, RuleAgent(), worker.notify, self.session, claimed[0]), [])
+        self.assertEqual(self._match_count(), 1)
+        self.assertEqual(self.session.query(models_db.NotificationDB).count(), notifications)
+        jobs = self.session.query(models_db.MatchJobDB.state, models_db.MatchJobDB.attempts).all()
+        self.assertEqual(jobs, [('done', 1), ('done', 1)])
+
+    def test_retry_after_transient_failure(self):
+        """测试重试 - 通知失败时整个事务回滚，重试后只保存一次"""
+        calls = []
+        notify = self.notification_agent.notify_on_matches
+
+        def flaky(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("通知服务暂不可用")
+            return notify(*args, **kwargs)
+
+        self.notification_agent.notify_on_matches = flaky
+        pipeline = self._start(workers=1)
+        lost_id, _ = self._create_pair()
+        pipeline.submit('lost', lost_id)
+        pipeline.join()
+        status = pipeline.status('lost', lost_id)
+        self.assertEqual((status['state'], status['attempts']), ('done', 2))
+        self.assertEqual(self._match_count(), 1)
+
+    def test_gives_up_after_max_retries(self):
+        """测试重试 - 一直失败时标记为 failed 并保留错误信息"""
+        def broken(*args, **kwargs):
+            raise RuntimeError("通知服务暂不可用")
+
+        self.notification_agent.notify_on_matches = broken
+        pipeline = self._start(workers=1, max_retries=3)
+        _, found_id = self._create_pair()
+        pipeline.submit('found', found_id)
+        pipeline.join()
+        status = pipeline.status('found', found_id)
+        self.assertEqual((status['state'], status['attempts']), ('failed', 3))
+        self.assertIn("通知服务暂不可用", status['error'])
+        self.assertEqual(self._match_count(), 0)
+
+    def test_backpressure_when_queue_full(self):
+        """测试背压 - 队列已满时 submit 返回 False，由调用方同步匹配"""
+        started, release = threading.Event(), threading.Event()
+        notify = self.notification_agent.notify_on_matches
+
+        def blocking(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            return notify(*args, **kwargs)
+
+        self.notification_agent.notify_on_matches = blocking
+        pipeline = self._start(workers=1, max_queue=1)
+        lost_id, found_id = self._create_pair()
+        self.assertTrue(pipeline.submit('lost', lost_id))
+        self.assertTrue(started.wait(5))
+        self.assertTrue(pipeline.submit('found', found_id))
+        self.assertFalse(pipeline.submit('lost', lost_id + 100))
+        self.assertIsNone(pipeline.status('lost', lost_id + 100))
+        self.assertEqual(pipeline.queue_depth(), 1)
+        release.set()
+        pipeline.join()
+        self.assertEqual(pipeline.status('found', found_id)['state'], 'done')
+
+    def test_inline_without_workers(self):
+        """测试 workers=0 - 不入队，run_now 在当前线程内匹配"""
+        pipeline = self._start(workers=0)
+        lost_id, _ = self._create_pair()
+        self.assertFalse(pipeline.submit('lost', lost_id))
+        matches = pipeline.run_now('lost', lost_id)
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(pipeline.status('lost', lost_id)['state'], 'done')
+        self.assertEqual(self._match_count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
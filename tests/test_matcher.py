@@ -1,7 +1,7 @@
 """测试匹配引擎"""
 import unittest
 from datetime import datetime, timedelta
-from app.models import LostItem, FoundItem
+from app.models import LostItem, FoundItem, prepare_item
 from app.agent.matcher import Matcher
 
 
@@ -72,6 +72,17 @@ class TestMatcher(unittest.TestCase):
         score = self.matcher.match_by_location(lost, found)
         self.assertEqual(score, 20.0)
     
+    def test_score_location_hierarchy(self):
+        """测试地点匹配 - 无空格的中文地点按 校区/楼宇/楼层 层级评分"""
+        score = self.matcher.score_location
+        self.assertEqual(score("教学楼A-二楼走廊", "教学楼A 2楼 走廊"), 25.0)
+        self.assertEqual(score("教学楼A", "教学楼A-二楼走廊"), 20.0)
+        self.assertEqual(score("教学楼A-二楼走廊", "教学楼A-三楼"), 15.0)
+        self.assertEqual(score("教学楼A-二楼走廊", "教学楼B-一楼"), 10.0)
+        self.assertEqual(score("第一食堂", "超市"), 10.0)
+        self.assertEqual(score("图书馆三楼", "体育馆"), 5.0)
+        self.assertEqual(score("东校区图书馆", "西校区图书馆"), 5.0)
+
     def test_match_by_time_24h(self):
         """测试时间匹配 - 24小时内"""
         now = datetime.now()
@@ -175,6 +186,27 @@ class TestMatcher(unittest.TestCase):
         score = self.matcher.calculate_total_score(lost, found)
         self.assertEqual(score, 0.0)
 
+    def test_match_by_features_prepared(self):
+        """测试特征匹配 - 预先分词的物品与原始物品得分一致"""
+        lost = LostItem(
+            item_id=1, user_id=1, item_name="钱包",
+            category="钱包", lost_location="图书馆",
+            lost_time=datetime.now(), description="Black 钱包 身份证",
+            color="Black", brand="LV"
+        )
+        found = FoundItem(
+            item_id=1, user_id=2, item_name="钱包",
+            category="钱包", found_location="图书馆",
+            found_time=datetime.now(), description="black 钱包",
+            color="BLACK", brand=""
+        )
+        expected = self.matcher.match_by_features(lost, found)
+        prepare_item(found)
+        self.assertEqual(self.matcher.match_by_features(lost, found), expected)
+        prepare_item(lost)
+        self.assertEqual(self.matcher.match_by_features(lost, found), expected)
+        self.assertEqual(expected, 7.0)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,134 @@
+"""测试数据库迁移"""
+import unittest
+from app.database.db_manager import DatabaseManager
+from app.database.migrations import MIGRATIONS, run_migrations
+from app.database import models_db
+from tests.base import TempDatabaseTestCase
+
+
+class TestMigrations(TempDatabaseTestCase):
+    """迁移测试类"""
+
+    def setUp(self):
+        """测试前准备：建立一个没有新增列的旧版数据库"""
+        super().setUp()
+        self.engine = self.new_engine()
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE TABLE lost_items (id INTEGER PRIMARY KEY, user_id INTEGER, item_name VARCHAR(256) NOT NULL, "
+                "category VARCHAR(64) NOT NULL, lost_location VARCHAR(256) NOT NULL, lost_time DATETIME, "
+                "description TEXT, color VARCHAR(64), brand VARCHAR(128), is_resolved BOOLEAN)")
+            conn.exec_driver_sql(
+                "INSERT INTO lost_items (item_name, category, lost_location, lost_time, description, color, is_resolved) "
+                "VALUES ('钱包', '钱包', '图书馆', '2024-05-01 12:00:00.000000', '黑色 钱包 黑色', 'Black', 0), "
+                "('水杯', '其他', '食堂', '2024-05-01 12:00:00.000000', NULL, 'black', 0)")
+            conn.exec_driver_sql(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, student_id VARCHAR(64) NOT NULL UNIQUE, "
+                "name VARCHAR(128) NOT NULL, email VARCHAR(256), password_hash VARCHAR(256) NOT NULL, "
+                "phone VARCHAR(64), created_at DATETIME)")
+            conn.exec_driver_sql("INSERT INTO users (id, student_id, name, password_hash) "
+                                 "VALUES (1, '20240001', '用户1', 'x'), (2, '20240002', '用户2', 'x')")
+            conn.exec_driver_sql(
+                "CREATE TABLE notifications (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+                "notification_type VARCHAR(64) NOT NULL, title VARCHAR(256) NOT NULL, content TEXT NOT NULL, "
+                "related_item_id INTEGER, related_match_id INTEGER, is_read BOOLEAN, created_at DATETIME)")
+            conn.exec_driver_sql("INSERT INTO notifications (user_id, notification_type, title, content, is_read) "
+                                 "VALUES (1, 'match', 't', 'c', 0), (1, 'match', 't', 'c', 0), (1, 'match', 't', 'c', 1)")
+
+    def test_upgrade_backfills_description_tokens(self):
+        """测试迁移 - 旧库补列并回填描述词ID，重复执行不产生变化"""
+        dbm = DatabaseManager(self.engine)
+        session = dbm.get_session()
+        try:
+            words = {t.id: t.word for t in session.query(models_db.TokenDB)}
+            rows = session.query(models_db.LostItemDB).order_by(models_db.LostItemDB.id).all()
+            self.assertEqual(sorted(words[int(t)] for t in rows[0].description_tokens.split()), ["钱包", "黑色"])
+            self.assertEqual(rows[1].description_tokens, "")
+            self.assertEqual([l.token_ids for l in dbm.get_open_lost_items(session)],
+                             [tuple(sorted(words)), ()])
+        finally:
+            session.close()
+
+    def test_upgrade_backfills_attribute_codes(self):
+        """测试迁移 - 旧库回填属性编码，颜色不区分大小写，空值不编码"""
+        dbm = DatabaseManager(self.engine)
+        session = dbm.get_session()
+        try:
+            first, second = session.query(models_db.LostItemDB).order_by(models_db.LostItemDB.id).all()
+            self.assertEqual(first.color_code, second.color_code)
+            self.assertNotEqual(first.category_code, second.category_code)
+            self.assertIsNone(first.brand_code)
+            code = session.query(models_db.AttributeCodeDB).filter_by(id=first.location_code).one()
+            self.assertEqual((code.kind, code.value), ("location", "图书馆"))
+        finally:
+            session.close()
+
+    def test_upgrade_backfills_location_levels(self):
+        """测试迁移 - 旧库解析地点并回填层级编码，空的层级为 NULL"""
+        dbm = DatabaseManager(self.engine)
+        session = dbm.get_session()
+        try:
+            first, second = session.query(models_db.LostItemDB).order_by(models_db.LostItemDB.id).all()
+            codes = {row.id: (row.kind, row.value) for row in session.query(models_db.AttributeCodeDB)}
+            self.assertEqual(codes[first.building_code], ("building", "图书馆"))
+            self.assertEqual(codes[first.zone_code], ("zone", "图书馆区"))
+            self.assertEqual(codes[second.zone_code], ("zone", "生活区"))
+            self.assertEqual((first.campus_code, first.floor_code, first.room_code), (None, None, None))
+            self.assertEqual(len(dbm.get_open_lost_items(session)[0].location_levels), 5)
+        finally:
+            session.close()
+
+    def test_upgrade_creates_query_indexes(self):
+        """测试迁移 - 旧库补建组合索引"""
+        DatabaseManager(self.engine)
+        with self.engine.connect() as conn:
+            names = set(conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'lost_items'").scalars())
+        self.assertTrue({"ix_lost_items_open_category_time", "ix_lost_items_open_time",
+                         "ix_lost_items_user_time", "ix_lost_items_row_version"} <= names)
+
+    def test_upgrade_backfills_unread_counts(self):
+        """测试迁移 - 旧库补加未读计数列并按通知表回填，之后由触发器维护"""
+        dbm = DatabaseManager(self.engine)
+        session = dbm.get_session()
+        try:
+            self.assertEqual([dbm.get_unread_notification_count(session, user_id) for user_id in (1, 2)], [2, 0])
+            session.execute(models_db.NotificationDB.__table__.insert(), [
+                {'user_id': 2, 'notification_type': 'match', 'title': 't', 'content': 'c', 'is_read': False}])
+            session.commit()
+            self.assertEqual(dbm.get_unread_notification_count(session, 2), 1)
+        finally:
+            session.close()
+
+    def test_upgrade_dedupes_match_pairs(self):
+        """测试迁移 - 重复的匹配对只保留ID最小的一条，合并通知状态并改指通知，之后建唯一索引"""
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE TABLE match_records (id INTEGER PRIMARY KEY, lost_item_id INTEGER NOT NULL, "
+                "found_item_id INTEGER NOT NULL, match_score FLOAT NOT NULL, match_reason TEXT, "
+                "is_notified BOOLEAN, created_at DATETIME)")
+            conn.exec_driver_sql("INSERT INTO match_records (id, lost_item_id, found_item_id, match_score, is_notified) "
+                                 "VALUES (1, 1, 1, 80, 0), (2, 1, 2, 70, 0), (3, 1, 1, 80, 1), (4, 2, 1, 60, 0)")
+            conn.exec_driver_sql("UPDATE notifications SET related_match_id = 3 WHERE id = 1")
+        DatabaseManager(self.engine)
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.exec_driver_sql(
+                "SELECT id, lost_item_id, found_item_id, is_notified FROM match_records ORDER BY id").all(),
+                [(1, 1, 1, 1), (2, 1, 2, 0), (4, 2, 1, 0)])
+            self.assertEqual(conn.exec_driver_sql(
+                "SELECT related_match_id FROM notifications WHERE id = 1").scalar(), 1)
+            names = set(conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'match_records'").scalars())
+        self.assertIn("ux_match_records_pair", names)
+
+    def test_rerun_is_noop(self):
+        """测试迁移 - 已是最新版本时不再执行"""
+        DatabaseManager(self.engine)
+        latest = MIGRATIONS[-1][0]
+        self.assertEqual(run_migrations(self.engine), latest)
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.exec_driver_sql("PRAGMA user_version").scalar(), latest)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""测试通知智能体的批量写入"""
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.models import LostItem, FoundItem, User
+from app.agent.notification_agent import NotificationAgent
+from app.database import models_db
+from tests.base import DatabaseTestCase
+
+
+class TestNotificationBatches(DatabaseTestCase):
+    """通知批量写入测试类"""
+
+    def setUp(self):
+        """测试前准备：临时数据库，5个用户，每批2条"""
+        super().setUp()
+        self.agent = NotificationAgent(self.dbm)
+        self.agent.rules['batch_size'] = 2
+        self.user_ids = [self.dbm.create_user(self.session, User(None, f"2024{i:04d}", f"用户{i}"), "x").id
+                         for i in range(5)]
+        self.commits = []
+        event.listen(self.engine, "commit", lambda conn: self.commits.append(1))
+
+    def test_announcement_to_all_users(self):
+        """测试系统公告 - 发给所有用户，每批提交一次"""
+        sent = self.agent.send_announcement(self.session, [], "系统维护", "今晚22点维护")
+        self.assertEqual(sent, 5)
+        self.assertEqual(len(self.commits), 3)
+        rows = self.session.query(models_db.NotificationDB).all()
+        self.assertEqual(sorted(n.user_id for n in rows), self.user_ids)
+        self.assertTrue(all(n.notification_type == 'announcement' and not n.is_read for n in rows))
+
+    def test_reminders(self):
+        """测试未解决提醒 - 超过7天常规提醒，超过14天紧急提醒，每段提交一次"""
+        now = datetime.utcnow()
+        for days in (1, 8, 15):
+            self.dbm.create_lost_item(self.session, LostItem(
+                item_id=None, user_id=self.user_ids[0], item_name="钱包", category="钱包",
+                lost_location="图书馆", lost_time=now - timedelta(days=days), description=""))
+        self.dbm.create_found_item(self.session, FoundItem(
+            item_id=None, user_id=self.user_ids[1], item_name="钥匙", category="钥匙",
+            found_location="食堂", found_time=now - timedelta(days=20), description=""))
+        self.agent.rules['reminder_chunk_size'] = 2
+        self.commits.clear()
+        self.assertEqual(self.agent.check_and_remind_unresolved(self.session, now=now), 3)
+        self.assertEqual(len(self.commits), 3)
+        rows = self.session.query(models_db.NotificationDB).order_by(models_db.NotificationDB.title).all()
+        self.assertEqual(sorted(n.title for n in rows), sorted(['📅 提醒：失物信息已超过7天', '⚠️ 紧急提醒：失物信息已超过14天',
+                                                               '⚠️ 紧急提醒：招领信息已超过14天']))
+        self.assertIn('您的失物"钱包"已发布8天，请及时关注匹配结果。', [n.content for n in rows])
+        self.assertTrue(all(n.notification_type == 'reminder' and not n.is_read for n in rows))
+
+    def test_reminders_sent_once(self):
+        """测试未解决提醒 - 重复检查不重复提醒，超过14天时再发一次紧急提醒，已解决的不提醒"""
+        now = datetime.utcnow()
+        lost = self.dbm.create_lost_item(self.session, LostItem(
+            item_id=None, user_id=self.user_ids[0], item_name="钱包", category="钱包",
+            lost_location="图书馆", lost_time=now - timedelta(days=8), description=""))
+        resolved = self.dbm.create_lost_item(self.session, LostItem(
+            item_id=None, user_id=self.user_ids[0], item_name="水杯", category="其他",
+            lost_location="食堂", lost_time=now - timedelta(days=8), description=""))
+        self.dbm.mark_lost_item_resolved(self.session, resolved.id, self.user_ids[0])
+        self.assertEqual(self.agent.check_and_remind_unresolved(self.session, now=now), 1)
+        self.assertEqual(self.agent.check_and_remind_unresolved(self.session, now=now), 0)
+        self.assertEqual(self.agent.check_and_remind_unresolved(self.session, now=now + timedelta(days=7)), 1)
+        self.assertEqual(self.agent.check_and_remind_unresolved(self.session, now=now + timedelta(days=8)), 0)
+        ledger = self.session.query(models_db.ReminderLedgerDB.item_id, models_db.ReminderLedgerDB.tier).all()
+        self.assertEqual(sorted(ledger), [(lost.id, 'reminder'), (lost.id, 'urgent')])
+
+if __name__ == '__main__':
+    unittest.main()
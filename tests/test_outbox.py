@@ -0,0 +1,134 @@
+"""测试待匹配任务表（outbox）与匹配任务进程"""
+import threading
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app.models import LostItem, FoundItem
+from app.agent.job_worker import JobWorker
+from app.agent.notification_agent import NotificationAgent
+from app.agent.rule_agent import RuleAgent
+from app.database import models_db, outbox
+from tests.base import DatabaseTestCase
+
+
+class TestOutbox(DatabaseTestCase):
+    """待匹配任务测试类"""
+
+    def setUp(self):
+        super().setUp()
+        self.now = datetime(2024, 5, 1, 12)
+
+    def _create_lost(self, name="黑色钱包"):
+        return self.dbm.create_lost_item(self.session, LostItem(
+            item_id=None, user_id=1, item_name=name, category="钱包",
+            lost_location="图书馆", lost_time=self.now, description="黑色皮质钱包", color="黑色"))
+
+    def _create_found(self, name="黑色钱包"):
+        return self.dbm.create_found_item(self.session, FoundItem(
+            item_id=None, user_id=2, item_name=name, category="钱包",
+            found_location="图书馆", found_time=self.now, description="黑色皮质钱包", color="黑色"))
+
+    def _jobs(self):
+        self.session.expire_all()
+        return self.session.query(models_db.MatchJobDB).order_by(models_db.MatchJobDB.id).all()
+
+    def test_enqueued_with_item(self):
+        """测试写入任务 - 发布物品时同一事务写入待匹配任务"""
+        lost = self._create_lost()
+        found = self._create_found()
+        self.assertEqual([(j.kind, j.item_id, j.state, j.attempts) for j in self._jobs()],
+                         [('lost', lost.id, 'pending', 0), ('found', found.id, 'pending', 0)])
+
+    def test_done_without_matches(self):
+        """测试任务进程 - 没有匹配的任务也标记为 done"""
+        self._create_lost()
+        worker = JobWorker(self.dbm, RuleAgent(), NotificationAgent(self.dbm))
+        self.assertEqual(worker.run_once()['done'], 1)
+        self.assertEqual(self._jobs()[0].state, 'done')
+        self.assertEqual(worker.run_once()['claimed'], 0)
+
+    def test_min_age_leaves_new_jobs(self):
+        """测试任务进程 - min_age 内新建的任务留给发布进程内的流水线"""
+        self._create_lost()
+        worker = JobWorker(self.dbm, RuleAgent(), NotificationAgent(self.dbm), min_age=60)
+        self.assertEqual(worker.drain()['claimed'], 0)
+        self.assertEqual(self._jobs()[0].state, 'pending')
+
+    def test_claim_is_exclusive_until_lease_expires(self):
+        """测试领取 - 同一任务只被领取一次，租约过期后可被接手，原持有者不能再完成"""
+        self._create_lost()
+        first = outbox.claim_jobs(self.session, now=self.now)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(outbox.claim_jobs(self.session, now=self.now + timedelta(seconds=30)), [])
+
+        second = outbox.claim_jobs(self.session, now=self.now + timedelta(seconds=outbox.LEASE_SECONDS + 1))
+        self.assertEqual([j.id for j in second], [first[0].id])
+        self.assertEqual(second[0].attempts, 2)
+        self.assertNotEqual(second[0].lease_owner, first[0].lease_owner)
+
+        self.assertFalse(outbox.complete_job(self.session, first[0]))
+        self.session.rollback()
+        self.assertTrue(outbox.complete_job(self.session, second[0]))
+        self.session.commit()
+        self.assertEqual(self._jobs()[0].state, 'done')
+
+    def test_release_waits_then_fails(self):
+        """测试失败 - 放回队列后等待重试时间，次数用完后标记为 failed"""
+        self._create_lost()
+        job = outbox.claim_jobs(self.session, max_attempts=2)[0]
+        outbox.release_job(self.session, job, "超时", retry_delay=60, max_attempts=2)
+        self.assertEqual(outbox.claim_jobs(self.session, max_attempts=2), [])
+        later = datetime.utcnow() + timedelta(seconds=61)
+        job = outbox.claim_jobs(self.session, max_attempts=2, now=later)[0]
+        outbox.release_job(self.session, job, "超时", max_attempts=2)
+        state = self._jobs()[0]
+        self.assertEqual((state.state, state.attempts, state.last_error), ('failed', 2, "超时"))
+
+    def test_worker_sees_items_from_other_processes(self):
+        """测试任务进程 - 按类别从数据库取候选，不依赖本进程的匹配索引；两侧任务匹配到同一对只保存一次"""
+        worker_dbm = self.other_manager()
+        worker_dbm.warm_match_index()
+        found = self._create_found()
+        lost = self._create_lost()
+        worker = JobWorker(worker_dbm, RuleAgent(), NotificationAgent(worker_dbm))
+        self.assertEqual(worker.run_once(), {'claimed': 2, 'done': 2, 'failed': 0, 'lost_lease': 0})
+        self.session.expire_all()
+        pairs = self.session.query(models_db.MatchRecordDB.lost_item_id, models_db.MatchRecordDB.found_item_id).all()
+        self.assertEqual(pairs, [(lost.id, found.id)])
+        self.assertEqual({j.state for j in self._jobs()}, {'done'})
+
+    def test_concurrent_workers_no_double_processing(self):
+        """测试并发 - 多个任务进程同时领取，每个任务只执行一次"""
+        for i in range(15):
+            self._create_lost(f"钱包{i}")
+            self._create_found(f"钱包{i}")
+        totals = []
+
+        def drain(dbm):
+            worker = JobWorker(dbm, RuleAgent(), NotificationAgent(dbm), batch_size=3)
+            done = 0
+            while True:
+                stats = worker.run_once()
+                if not stats['claimed']:
+                    break
+                done += stats['done']
+            totals.append(done)
+
+        threads = [threading.Thread(target=drain, args=(self.other_manager(),)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sum(totals), 30)
+        jobs = self._jobs()
+        self.assertEqual({j.state for j in jobs}, {'done'})
+        self.assertEqual({j.attempts for j in jobs}, {1})
+        self.session.expire_all()
+        duplicates = self.session.query(models_db.MatchRecordDB.lost_item_id, models_db.MatchRecordDB.found_item_id) \
+            .group_by(models_db.MatchRecordDB.lost_item_id, models_db.MatchRecordDB.found_item_id) \
+            .having(func.count() > 1).all()
+        self.assertEqual(duplicates, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""测试游标分页"""
+import base64
+import json
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.models import LostItem
+from app.database.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, page_size
+from app.database import models_db
+from tests.base import DatabaseTestCase
+
+
+class TestKeysetPagination(DatabaseTestCase):
+    """游标分页测试类"""
+
+    def setUp(self):
+        """测试前准备：7条失物，其中3条时间相同"""
+        super().setUp()
+        self.now = datetime(2024, 5, 1, 12)
+        for minutes in (0, 10, 10, 10, 20, 30, 40):
+            self._create(self.now - timedelta(minutes=minutes))
+        self.dbm.mark_lost_item_resolved(self.session, 7, 1)
+
+    def _create(self, when):
+        return self.dbm.create_lost_item(self.session, LostItem(
+            item_id=None, user_id=1, item_name="钱包", category="钱包",
+            lost_location="图书馆", lost_time=when, description="黑色"))
+
+    def _all_pages(self, limit, **kwargs):
+        pages, cursor = [], None
+        while True:
+            page = self.dbm.get_items_page(self.session, 'lost', cursor=cursor, limit=limit, **kwargs)
+            pages.append([item['id'] for item in page.items])
+            if page.next_cursor is None:
+                return pages
+            cursor = page.next_cursor
+
+    def test_pages_follow_time_then_id(self):
+        """测试分页 - 按 (时间, ID) 倒序，相同时间不重复不遗漏，最后一页没有游标"""
+        self.assertEqual(self._all_pages(3), [[1, 4, 3], [2, 5, 6]])
+        self.assertEqual(self._all_pages(2, include_resolved=True), [[1, 4], [3, 2], [5, 6], [7]])
+        self.assertEqual(self._all_pages(6), [[1, 4, 3, 2, 5, 6]])
+
+    def test_writes_between_pages(self):
+        """测试分页 - 翻页期间新增更新的物品不会让下一页重复"""
+        first = self.dbm.get_items_page(self.session, 'lost', limit=3)
+        self._create(self.now + timedelta(minutes=5))
+        second = self.dbm.get_items_page(self.session, 'lost', cursor=first.next_cursor, limit=3)
+        self.assertEqual([item['id'] for item in second.items], [2, 5, 6])
+
+    def test_cursor_and_page_size(self):
+        """测试分页 - 游标往返，无效游标报错，每页条数受上限约束"""
+        columns = [models_db.LostItemDB.lost_time, models_db.LostItemDB.id]
+        self.assertEqual(decode_cursor(encode_cursor([self.now, 3]), columns), [self.now, 3])
+        for token in ("not-a-cursor", encode_cursor([3]), encode_cursor(["x", 3])):
+            with self.assertRaises(ValueError):
+                self.dbm.get_items_page(self.session, 'lost', cursor=token)
+        # 构造的游标：时间字段是数字、空值，ID 是布尔值或字符串，或不是列表
+        for values in ([1714564800, 3], [None, 3], [self.now, True], [self.now, "3"], {"t": 1}):
+            token = base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+            with self.assertRaises(ValueError):
+                decode_cursor(token, columns)
+            with self.assertRaises(ValueError):
+                self.dbm.get_items_page(self.session, 'lost', cursor=token)
+        self.assertEqual(page_size(None), 50)
+        self.assertEqual(page_size(0), 1)
+        self.assertEqual(page_size(10 ** 6), MAX_PAGE_SIZE)
+
+    def test_page_query_uses_index(self):
+        """测试分页 - 翻页查询走 (is_resolved, 时间) 索引，不需要排序"""
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, parameters, context, many:
+                     statements.append((statement, parameters)))
+        first = self.dbm.get_items_page(self.session, 'lost', limit=3)
+        self.dbm.get_items_page(self.session, 'lost', cursor=first.next_cursor, limit=3)
+        statement, parameters = statements[-1]
+        with self.engine.connect() as conn:
+            plan = "\n".join(row[-1] for row in conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + statement, parameters))
+        self.assertIn("ix_lost_items_open_time", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
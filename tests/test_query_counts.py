@@ -0,0 +1,118 @@
+"""测试匹配结果相关页面与发布流程的查询条数不随匹配数量增长"""
+import unittest
+from datetime import datetime
+from flask import Flask
+from sqlalchemy import event
+from app.models import LostItem, FoundItem
+from app.agent.match_pipeline import MatchPipeline
+from app.agent.notification_agent import NotificationAgent
+from app.agent.rule_agent import RuleAgent
+from app.auth.auth_service import AuthService
+from app.database import models_db
+from app.web import web_bp, routes
+from tests.base import DatabaseTestCase
+
+# 每组的匹配数量（少于 RuleAgent(top_k=20) 的上限）
+MANY = 12
+
+
+class TestQueryCounts(DatabaseTestCase):
+    """查询条数测试类：通过 Flask 测试客户端访问真实的网页路由，统计执行的全部 SQL 语句"""
+
+    def setUp(self):
+        """测试前准备：临时数据库上的网页应用（workers=0，发布时在请求内匹配），两个已登录用户"""
+        super().setUp()
+        notification_agent = NotificationAgent(self.dbm)
+        self.pipeline = MatchPipeline(self.dbm, RuleAgent(top_k=20), notification_agent, workers=0)
+        routes.init_services(self.dbm, notification_agent, self.pipeline)
+        app = Flask(__name__)
+        app.config['SECRET_KEY'] = 'test'
+        app.register_blueprint(web_bp)
+        # 与 create_app 一样启动时预热匹配索引，第一次发布不再从数据库构建
+        self.dbm.warm_match_index()
+        auth = AuthService(self.dbm)
+        self.users = [auth.register_user(self.session, student_id, name, "password")[2].id
+                      for student_id, name in (("2024001", "张三"), ("2024002", "李四"))]
+        self.clients = []
+        for user_id in self.users:
+            client = app.test_client()
+            with client.session_transaction() as flask_session:
+                flask_session['user_id'] = user_id
+            self.clients.append(client)
+        self.now = datetime(2024, 5, 1, 12)
+        self.counts = []
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._capture)
+
+    def tearDown(self):
+        event.remove(self.engine, "before_cursor_execute", self._capture)
+
+    def _capture(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def _request(self, client, method: str, url: str, **kwargs):
+        """发送一个请求，把执行的语句条数记入 self.counts"""
+        self.statements.clear()
+        response = client.open(url, method=method, **kwargs)
+        self.counts.append(len(self.statements))
+        self.assertIn(response.status_code, (200, 302))
+        return response
+
+    def _lost(self, category: str, user_index: int = 0) -> LostItem:
+        return LostItem(item_id=None, user_id=self.users[user_index], item_name=category, category=category,
+                        lost_location="图书馆", lost_time=self.now, description="黑色")
+
+    def _found(self, category: str, user_index: int = 1) -> FoundItem:
+        return FoundItem(item_id=None, user_id=self.users[user_index], item_name=category, category=category,
+                         found_location="图书馆", found_time=self.now, description="黑色")
+
+    def _form(self, side: str, category: str):
+        return {'item_name': category, 'category': category, f'{side}_location': "图书馆",
+                f'{side}_time': self.now.isoformat(), 'description': "黑色"}
+
+    def _match_count(self, **filters) -> int:
+        self.session.expire_all()
+        return self.session.query(models_db.MatchRecordDB).filter_by(**filters).count()
+
+    def test_match_pages(self):
+        """测试匹配结果页与失物详情页 - 1 个与多个匹配执行的语句条数相同"""
+        lost_ids = []
+        for category, n in (("钱包", 1), ("钥匙", MANY)):
+            for _ in range(n):
+                self.dbm.create_found_item(self.session, self._found(category))
+            lost_ids.append(self.dbm.create_lost_item(self.session, self._lost(category)).id)
+            self.assertEqual(len(self.pipeline.run_now('lost', lost_ids[-1])), n)
+        for url in ('/matches/{}', '/lost/{}'):
+            self.counts = []
+            for lost_id in lost_ids:
+                response = self._request(self.clients[0], 'GET', url.format(lost_id))
+                self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.counts[0], self.counts[1], url)
+
+    def test_post_lost(self):
+        """测试发布失物 - 保存匹配并通知，1 个与多个匹配执行的语句条数相同"""
+        for category, n in (("钱包", 1), ("钥匙", MANY)):
+            for _ in range(n):
+                self.dbm.create_found_item(self.session, self._found(category))
+            # 先发布一次同样的失物，让词表、属性编码都已存在，两组只比较匹配数量的影响
+            self.dbm.create_lost_item(self.session, self._lost(category))
+            self._request(self.clients[0], 'POST', '/post_lost', data=self._form('lost', category))
+        self.assertEqual(self.counts[0], self.counts[1])
+        lost_ids = [r.id for r in self.session.query(models_db.LostItemDB.id)
+                    .filter_by(user_id=self.users[0]).order_by(models_db.LostItemDB.id)]
+        self.assertEqual([self._match_count(lost_item_id=i) for i in lost_ids], [0, 1, 0, MANY])
+
+    def test_post_found(self):
+        """测试发布招领 - 反向匹配并通知多个失主，1 个与多个匹配执行的语句条数相同"""
+        for category, n in (("钱包", 1), ("钥匙", MANY)):
+            for _ in range(n):
+                self.dbm.create_lost_item(self.session, self._lost(category))
+            self.dbm.create_found_item(self.session, self._found(category))
+            self._request(self.clients[1], 'POST', '/post_found', data=self._form('found', category))
+        self.assertEqual(self.counts[0], self.counts[1])
+        found_ids = [r.id for r in self.session.query(models_db.FoundItemDB.id).order_by(models_db.FoundItemDB.id)]
+        self.assertEqual([self._match_count(found_item_id=i) for i in found_ids], [0, 1, 0, MANY])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""测试热点查询的执行计划（EXPLAIN QUERY PLAN）"""
+import unittest
+from sqlalchemy import event
+from app.database import models_db
+from tests.base import DatabaseTestCase
+
+
+class TestQueryPlans(DatabaseTestCase):
+    """执行计划测试类：热点查询应走组合索引，且排序不需要临时B树"""
+
+    def setUp(self):
+        super().setUp()
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._capture)
+
+    def tearDown(self):
+        event.remove(self.engine, "before_cursor_execute", self._capture)
+
+    def _capture(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append((statement, parameters))
+
+    def _plan(self, run) -> str:
+        """执行 run()，返回其最后一条 SELECT 的执行计划"""
+        self.statements.clear()
+        run()
+        statement, parameters = self.statements[-1]
+        with self.engine.connect() as conn:
+            rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        return "\n".join(row[-1] for row in rows)
+
+    def assertUsesIndex(self, plan: str, index: str):
+        self.assertIn(f"INDEX {index}", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_open_items_by_category_and_time(self):
+        """测试首页/详情页 - 未解决 + 类别，按时间倒序"""
+        for model, time_column, index in (
+                (models_db.LostItemDB, models_db.LostItemDB.lost_time, "ix_lost_items_open_category_time"),
+                (models_db.FoundItemDB, models_db.FoundItemDB.found_time, "ix_found_items_open_category_time")):
+            plan = self._plan(lambda: self.session.query(model).filter(
+                model.is_resolved == False, model.category == "钱包"
+            ).order_by(time_column.desc()).limit(25).all())
+            self.assertUsesIndex(plan, index)
+
+    def test_open_items_by_time(self):
+        """测试首页 - 未解决，按时间倒序（不筛选类别）"""
+        plan = self._plan(lambda: self.session.query(models_db.FoundItemDB).filter(
+            models_db.FoundItemDB.is_resolved == False
+        ).order_by(models_db.FoundItemDB.found_time.desc()).limit(25).all())
+        self.assertUsesIndex(plan, "ix_found_items_open_time")
+        self.assertUsesIndex(self._plan(lambda: self.dbm.get_all_found_items(self.session)),
+                             "ix_found_items_open_time")
+        self.assertUsesIndex(self._plan(lambda: self.dbm.get_all_lost_items(self.session)),
+                             "ix_lost_items_open_time")
+
+    def test_profile_items(self):
+        """测试个人主页 - 某用户发布的物品，按时间倒序"""
+        plan = self._plan(lambda: self.session.query(models_db.LostItemDB).filter(
+            models_db.LostItemDB.user_id == 1
+        ).order_by(models_db.LostItemDB.lost_time.desc()).all())
+        self.assertUsesIndex(plan, "ix_lost_items_user_time")
+
+    def test_notifications(self):
+        """测试通知 - 未读列表、全部列表与未读计数"""
+        plan = self._plan(lambda: self.dbm.get_user_notifications(self.session, 1, unread_only=True))
+        self.assertUsesIndex(plan, "ix_notifications_user_read_time")
+        plan = self._plan(lambda: self.dbm.get_user_notifications(self.session, 1))
+        self.assertUsesIndex(plan, "ix_notifications_user_time")
+        plan = self._plan(lambda: self.dbm.get_unread_notification_count(self.session, 1))
+        self.assertIn("COVERING INDEX ix_notifications_user_read_time", plan)
+
+    def test_match_records_by_lost_item(self):
+        """测试匹配结果 - 按失物查询，按分数倒序"""
+        plan = self._plan(lambda: self.dbm.get_match_records_by_lost_item(self.session, 1))
+        self.assertUsesIndex(plan, "ix_match_records_lost_score")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""测试全量重新匹配任务"""
+import unittest
+from datetime import datetime, timedelta
+from app.models import LostItem, FoundItem, MatchRecord
+from app.database import models_db
+from app.agent.rule_agent import RuleAgent
+from app.agent.rematch import RematchJob
+from tests.base import DatabaseTestCase
+
+
+class TestRematchJob(DatabaseTestCase):
+    """全量重新匹配测试类"""
+
+    def setUp(self):
+        """测试前准备：使用临时数据库"""
+        super().setUp()
+        now = datetime(2024, 5, 1, 12)
+        self.lost_ids = []
+        for i, category in enumerate(["钱包", "钱包", "手机", "其他"]):
+            db_lost = self.dbm.create_lost_item(self.session, LostItem(
+                item_id=None, user_id=1, item_name="物品", category=category,
+                lost_location="图书馆", lost_time=now - timedelta(hours=i * 30), description="黑色"
+            ))
+            self.lost_ids.append(db_lost.id)
+        for i, category in enumerate(["钱包", "手机", "钱包", "钥匙"]):
+            self.dbm.create_found_item(self.session, FoundItem(
+                item_id=None, user_id=2, item_name="物品", category=category,
+                found_location="图书馆一楼" if i % 2 else "图书馆", found_time=now, description="黑色"
+            ))
+
+    def _expected(self, agent):
+        found_items = self.dbm.get_all_found_items(self.session)
+        expected = set()
+        for lost in self.dbm.get_open_lost_items(self.session):
+            for m in agent.match_cycle(lost, found_items):
+                expected.add((m.lost_item_id, m.found_item_id, m.match_score))
+        return expected
+
+    def _stored(self):
+        return {(r.lost_item_id, r.found_item_id, r.match_score)
+                for r in self.session.query(models_db.MatchRecordDB).all()}
+
+    def test_rematch_inline_matches_rule_agent(self):
+        """测试重新匹配 - 单进程结果与 match_cycle 一致，重复执行只更新不重复插入"""
+        agent = RuleAgent()
+        seen = []
+        stats = RematchJob(self.dbm, agent, workers=0, shard_size=1).run(progress=seen.append)
+        self.assertEqual(self._stored(), self._expected(agent))
+        self.assertEqual(stats['lost_done'], len(self.lost_ids))
+        self.assertEqual(stats['inserted'], len(self._stored()))
+        self.assertEqual(seen[-1]['lost_done'], len(self.lost_ids))
+
+        stats = RematchJob(self.dbm, agent, workers=0).run()
+        self.assertEqual(stats['inserted'], 0)
+        self.assertEqual(stats['updated'], len(self._stored()))
+
+    def test_rematch_process_pool_and_prune(self):
+        """测试重新匹配 - 进程池执行，prune 删除不再匹配的旧记录"""
+        stale_id = self.dbm.create_match_record(self.session, MatchRecord(
+            lost_item_id=self.lost_ids[2], found_item_id=999, match_score=50.0, match_reason="old"
+        )).id
+        agent = RuleAgent(top_k=1)
+        stats = RematchJob(self.dbm, agent, workers=2, shard_size=1, prune=True).run()
+        self.session.expire_all()
+        self.assertEqual(self._stored(), self._expected(agent))
+        self.assertEqual(stats['deleted'], 1)
+        self.assertIsNone(self.session.get(models_db.MatchRecordDB, stale_id))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 """测试规则型智能体"""
 import unittest
 from datetime import datetime, timedelta
+from app.campus import location_levels
 from app.models import LostItem, FoundItem
 from app.agent.rule_agent import RuleAgent
+from app.database.item_index import CategoryIndex
 
 
 class TestRuleAgent(unittest.TestCase):
@@ -74,6 +76,128 @@ class TestRuleAgent(unittest.TestCase):
         if len(matches) >= 2:
             self.assertGreaterEqual(matches[0].match_score, matches[1].match_score)
 
+    def test_match_cycle_with_index(self):
+        """测试匹配循环 - 使用类别索引与全量扫描结果一致"""
+        now = datetime.now()
+        lost = LostItem(
+            item_id=1, user_id=1, item_name="钱包",
+            category="钱包", lost_location="图书馆",
+            lost_time=now, description="黑色"
+        )
+        found_items = [
+            FoundItem(
+                item_id=i, user_id=2, item_name="物品",
+                category=category, found_location="图书馆",
+                found_time=now, description="黑色"
+            )
+            for i, category in enumerate(["钱包", "手机", "其他", "钱包"], start=1)
+        ]
+        expected = self.agent.match_cycle(lost, found_items)
+        matches = self.agent.match_cycle(lost, index=CategoryIndex(found_items))
+        self.assertEqual(matches, expected)
+        self.assertEqual([m.found_item_id for m in matches], [1, 4])
+
+    def test_match_cycle_top_k_same_as_full_sort(self):
+        """测试Top-K匹配 - 与全量排序后取前K个一致（含同分情况）"""
+        import random
+        rng = random.Random(7)
+        now = datetime.now()
+        lost = LostItem(
+            item_id=1, user_id=1, item_name="钱包",
+            category="钱包", lost_location="图书馆",
+            lost_time=now, description="黑色 皮质 钱包", color="黑色", brand="LV"
+        )
+        found_items = [
+            FoundItem(
+                item_id=i, user_id=2, item_name="物品",
+                category=rng.choice(["钱包", "手机"]),
+                found_location=rng.choice(["图书馆", "图书馆一楼", "食堂"]),
+                found_time=now + timedelta(hours=rng.uniform(-200, 200)),
+                description=" ".join(rng.sample(["黑色", "皮质", "钱包", "卡"], 2)),
+                color=rng.choice([None, "黑色"]), brand=rng.choice([None, "lv"])
+            )
+            for i in range(1, 301)
+        ]
+        full = self.agent.match_cycle(lost, found_items)
+        for k in (1, 5, 20, 1000):
+            top = RuleAgent(top_k=k).match_cycle(lost, found_items)
+            self.assertEqual(top, full[:k])
+
+    def test_match_cycle_threshold(self):
+        """测试匹配循环 - 自定义阈值"""
+        now = datetime.now()
+        lost = LostItem(
+            item_id=1, user_id=1, item_name="钱包",
+            category="钱包", lost_location="图书馆",
+            lost_time=now, description=""
+        )
+        found_items = [
+            FoundItem(
+                item_id=1, user_id=2, item_name="钱包",
+                category="钱包", found_location="图书馆",
+                found_time=now, description=""
+            ),
+            FoundItem(
+                item_id=2, user_id=3, item_name="钱包",
+                category="钱包", found_location="教学楼",
+                found_time=now - timedelta(days=30), description=""
+            )
+        ]
+        for agent in (RuleAgent(threshold=80.0), RuleAgent(top_k=5, threshold=80.0)):
+            matches = agent.match_cycle(lost, found_items)
+            self.assertEqual([m.found_item_id for m in matches], [1])
+
+    def test_reverse_match_cycle(self):
+        """测试反向匹配 - 新招领与未解决失物评分"""
+        now = datetime.now()
+        lost_items = [
+            LostItem(
+                item_id=i, user_id=i, item_name="钱包",
+                category=category, lost_location="图书馆",
+                lost_time=now - timedelta(hours=hours), description="黑色 钱包"
+            )
+            for i, (category, hours) in enumerate([("钱包", 200), ("手机", 1), ("钱包", 2)], start=1)
+        ]
+        found = FoundItem(
+            item_id=10, user_id=20, item_name="钱包",
+            category="钱包", found_location="图书馆",
+            found_time=now, description="黑色 钱包"
+        )
+        index = CategoryIndex(lost_items, time_field="lost_time")
+        matches = self.agent.reverse_match_cycle(found, index)
+        self.assertEqual([m.lost_item_id for m in matches], [3, 1])
+        self.assertTrue(all(m.found_item_id == 10 for m in matches))
+        for m in matches:
+            lost = lost_items[m.lost_item_id - 1]
+            self.assertEqual(m.match_score, self.agent.matcher.calculate_total_score(lost, found))
+
+    def test_indexed_building_groups_same_as_scan(self):
+        """测试按楼宇分组剪枝 - 地点无空格、大量同分时仍与全量扫描一致"""
+        import random
+        rng = random.Random(11)
+        now = datetime(2024, 5, 1, 12)
+        locations = ["教学楼A-二楼走廊", "教学楼A-三楼", "教学楼A", "教学楼B-一楼", "图书馆", "图书馆东门", "食堂"]
+        found_items = [
+            FoundItem(
+                item_id=i, user_id=2, item_name="物品", category="钱包",
+                found_location=rng.choice(locations),
+                found_time=now + timedelta(hours=rng.choice([-100, -30, 0, 30, 100, 300])),
+                description=rng.choice(["", "黑色", "黑色 钱包"]), color=rng.choice([None, "黑色"])
+            )
+            for i in range(1, 301)
+        ]
+        # 一部分候选带发布时解析的地点层级（按楼宇分组），其余楼宇未知
+        for item in found_items[::2]:
+            item.location_levels = location_levels(item.found_location)
+        index = CategoryIndex(found_items)
+        for location in ("教学楼A-二楼走廊", "图书馆", "操场"):
+            lost = LostItem(item_id=1, user_id=1, item_name="钱包", category="钱包", lost_location=location,
+                            lost_time=now, description="黑色 钱包", color="黑色",
+                            location_levels=location_levels(location))
+            for k in (1, 7, 50, None):
+                agent = RuleAgent(top_k=k)
+                self.assertEqual(agent.match_cycle(lost, index=index), agent.match_cycle(lost, found_items))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,91 @@
+"""测试定时任务调度器与租约"""
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from app.database.leases import acquire_lease, get_leases, renew_lease
+from app.scheduler import Scheduler
+from tests.base import DatabaseTestCase
+
+
+class TestScheduler(DatabaseTestCase):
+    """调度器测试类"""
+
+    def setUp(self):
+        super().setUp()
+        self.schedulers = []
+
+    def tearDown(self):
+        for scheduler in self.schedulers:
+            scheduler.stop()
+
+    def _scheduler(self, owner: str) -> Scheduler:
+        scheduler = Scheduler(self.dbm, owner=owner)
+        self.schedulers.append(scheduler)
+        return scheduler
+
+    def test_lease(self):
+        """测试租约 - 到期前只属于持有者，持有者可续期，到期后其他进程接手"""
+        now = datetime(2024, 5, 1, 12)
+        self.assertTrue(acquire_lease(self.session, "reminders", "a", now + timedelta(minutes=1), now=now))
+        self.assertFalse(acquire_lease(self.session, "reminders", "b", now + timedelta(minutes=1), now=now))
+        self.assertTrue(acquire_lease(self.session, "reminders", "a", now + timedelta(minutes=2), now=now))
+        self.assertFalse(renew_lease(self.session, "reminders", "b", now))
+        later = now + timedelta(minutes=3)
+        self.assertTrue(acquire_lease(self.session, "reminders", "b", later + timedelta(minutes=1), now=later))
+        self.assertEqual(get_leases(self.session)["reminders"], ("b", later + timedelta(minutes=1)))
+
+    def test_single_leader_and_metrics(self):
+        """测试多进程 - 同一任务在一个间隔内只由一个调度器执行，统计次数与耗时"""
+        calls = []
+        first, second = self._scheduler("a"), self._scheduler("b")
+        for scheduler in (first, second):
+            scheduler.add_job("reminders", lambda: calls.append(1) or {'sent': len(calls)}, interval=3600)
+        self.assertTrue(first.run_job("reminders"))
+        self.assertFalse(second.run_job("reminders"))
+        self.assertTrue(first.run_job("reminders"))
+        self.assertEqual(len(calls), 2)
+
+        metrics = first.metrics()[0]
+        self.assertEqual((metrics['runs'], metrics['failures'], metrics['last_result']), (2, 0, {'sent': 2}))
+        self.assertIsNotNone(metrics['avg_duration'])
+        self.assertEqual(second.metrics()[0]['skipped_lease'], 1)
+        self.assertEqual(get_leases(self.session)["reminders"][0], "a")
+
+    def test_no_overlap_and_failures(self):
+        """测试不重叠 - 上一次未结束时跳过；任务异常计入失败并保留错误信息"""
+        started, release = threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            raise RuntimeError("数据库繁忙")
+
+        scheduler = self._scheduler("a")
+        scheduler.add_job("sweep", slow, interval=60)
+        thread = threading.Thread(target=scheduler.run_job, args=("sweep",))
+        thread.start()
+        self.assertTrue(started.wait(5))
+        self.assertFalse(scheduler.run_job("sweep"))
+        release.set()
+        thread.join()
+        metrics = scheduler.metrics()[0]
+        self.assertEqual((metrics['runs'], metrics['failures'], metrics['skipped_overlap']), (1, 1, 1))
+        self.assertEqual(metrics['last_error'], "数据库繁忙")
+        self.assertFalse(metrics['running'])
+
+    def test_runs_on_interval(self):
+        """测试调度线程 - 按间隔反复执行，停止后不再执行"""
+        calls = []
+        scheduler = self._scheduler("a")
+        scheduler.add_job("tick", lambda: calls.append(1), interval=0.05, jitter=0.01)
+        scheduler.start()
+        deadline = time.monotonic() + 5
+        while len(calls) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        scheduler.stop()
+        self.assertGreaterEqual(len(calls), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
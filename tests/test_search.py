@@ -0,0 +1,108 @@
+"""测试物品全文搜索"""
+import unittest
+from datetime import datetime
+from sqlalchemy import event
+from app.models import LostItem, FoundItem
+from app.database.search import bigram_text, fts_query
+from tests.base import DatabaseTestCase
+
+
+class TestSearch(DatabaseTestCase):
+    """全文搜索测试类"""
+
+    def setUp(self):
+        """测试前准备：临时数据库，几条失物与招领"""
+        super().setUp()
+        now = datetime(2024, 5, 1, 12)
+        self.lost = [self.dbm.create_lost_item(self.session, LostItem(
+            item_id=None, user_id=1, item_name=name, category=category,
+            lost_location=location, lost_time=now, description=description))
+            for name, category, location, description in (
+                ("黑色钱包", "钱包", "图书馆3楼", "里面有校园卡"),
+                ("水杯", "其他", "食堂", "黑色钱包图案的贴纸"),
+                ("耳机", "电子产品", "教学楼A", "AirPods Pro 白色"),
+                ("雨伞", "其他", "体育馆", None),
+                ("钥匙", "钥匙", "宿舍", "三把"),
+                ("课本", "书籍", "教学楼B", "高等数学"),
+            )]
+        self.found = self.dbm.create_found_item(self.session, FoundItem(
+            item_id=None, user_id=2, item_name="校园卡", category="证件",
+            found_location="图书馆", found_time=now, description="姓名张三"))
+
+    def _ids(self, side, search, **kwargs):
+        return [r['id'] for r in self.dbm.search_items(self.session, side, search, **kwargs)]
+
+    def test_bm25_ranking(self):
+        """测试全文搜索 - 名称命中排在描述命中之前，并返回相关度得分"""
+        results = self.dbm.search_items(self.session, 'lost', "黑色钱包", ranked=True)
+        self.assertEqual([r['id'] for r in results], [self.lost[0].id, self.lost[1].id])
+        self.assertGreater(results[0]['score'], results[1]['score'])
+        self.assertEqual(self._ids('lost', "airpods", ranked=True), [self.lost[2].id])
+        self.assertEqual(self._ids('lost', "黑色钱包 校园卡", ranked=True), [self.lost[0].id])
+        self.assertEqual(self._ids('found', "校园卡", ranked=True), [self.found.id])
+
+    def test_default_sorts_by_relevance(self):
+        """测试全文搜索 - 默认按相关度排序；ranked=False 时按时间倒序（同一时间按ID倒序），不计算相关度"""
+        results = self.dbm.search_items(self.session, 'lost', "黑色钱包")
+        self.assertEqual([r['id'] for r in results], [self.lost[0].id, self.lost[1].id])
+        self.assertIn('score', results[0])
+        results = self.dbm.search_items(self.session, 'lost', "黑色钱包", ranked=False)
+        self.assertEqual([r['id'] for r in results], [self.lost[1].id, self.lost[0].id])
+        self.assertNotIn('score', results[0])
+
+    def test_two_char_terms_use_index(self):
+        """测试全文搜索 - 两个字的词转换为二元短语走全文索引，不跨词匹配"""
+        self.assertEqual(fts_query(["钱包"]), '"钱包"')
+        self.assertEqual(fts_query(["校园卡", "AirPods"]), '"校园 园卡" "ai ir rp po od ds"')
+        self.assertEqual(bigram_text("教学楼A AirPods Pro"), "教学 学楼 楼a brk ai ir rp po od ds brk pr ro")
+        self.assertEqual(self._ids('lost', "钱包"), [self.lost[0].id, self.lost[1].id])
+        self.assertEqual(self._ids('lost', "钱包", category="其他"), [self.lost[1].id])
+        self.assertEqual(sorted(self._ids('lost', "学楼")), [self.lost[2].id, self.lost[5].id])
+        # "白色" 与 "Pro" 在不同的词中，"色p" 不能跨词匹配
+        self.assertEqual(self._ids('lost', "色pro"), [])
+
+    def test_driven_by_fulltext_hits(self):
+        """测试全文搜索 - 按时间和按相关度都先取全文索引的命中，再按主键取物品（不沿时间索引逐行 MATCH）"""
+        statements = []
+        listener = lambda conn, cursor, statement, parameters, *args: statements.append((statement, parameters))
+        event.listen(self.engine, "before_cursor_execute", listener)
+        try:
+            for ranked in (False, True):
+                self._ids('lost', "钱包", ranked=ranked)
+        finally:
+            event.remove(self.engine, "before_cursor_execute", listener)
+        with self.engine.connect() as conn:
+            for statement, parameters in statements[-2:]:
+                self.assertIn("MATCH", statement)
+                self.assertNotIn("LIKE", statement)
+                plan = [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+                self.assertTrue(plan[0].startswith("SCAN lost_items_fts"), plan)
+                self.assertIn("INTEGER PRIMARY KEY", plan[1])
+
+    def test_single_char_terms_fall_back_to_like(self):
+        """测试全文搜索 - 单字的词退回 LIKE，通配符按字面匹配"""
+        self.assertIsNone(fts_query(["包"]))
+        self.assertIsNone(fts_query(['a"bc']))
+        self.assertIsNone(fts_query(["%"]))
+        self.assertEqual(sorted(self._ids('lost', "包")), [self.lost[0].id, self.lost[1].id])
+        self.assertEqual(self._ids('lost', "%"), [])
+
+    def test_index_follows_updates(self):
+        """测试全文搜索 - 修改、删除物品后索引同步，已解决的默认不返回"""
+        self.lost[2].description = "索尼降噪耳机"
+        self.session.commit()
+        self.assertEqual(self._ids('lost', "airpods"), [])
+        self.assertEqual(self._ids('lost', "降噪耳机"), [self.lost[2].id])
+        self.dbm.mark_lost_item_resolved(self.session, self.lost[2].id, 1)
+        self.assertEqual(self._ids('lost', "降噪耳机"), [])
+        self.assertEqual(self._ids('lost', "降噪耳机", include_resolved=True), [self.lost[2].id])
+        self.session.delete(self.lost[0])
+        self.session.commit()
+        self.assertEqual(self._ids('lost', "黑色钱包"), [self.lost[1].id])
+        # 外部内容表与物品表不一致时 integrity-check 报错
+        with self.engine.connect() as conn:
+            conn.exec_driver_sql("INSERT INTO lost_items_fts(lost_items_fts) VALUES ('integrity-check')")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""测试用户未读通知计数"""
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app.models import LostItem, User
+from app.agent.notification_agent import NotificationAgent
+from app.database.counters import recount_unread
+from app.database import models_db
+from tests.base import DatabaseTestCase
+
+
+class TestUnreadCounter(DatabaseTestCase):
+    """未读计数测试类"""
+
+    def setUp(self):
+        super().setUp()
+        self.agent = NotificationAgent(self.dbm)
+        self.user_ids = [self.dbm.create_user(self.session, User(None, f"2024{i:04d}", f"用户{i}"), "x").id
+                         for i in range(3)]
+
+    def _counts(self):
+        return [self.dbm.get_unread_notification_count(self.session, user_id) for user_id in self.user_ids]
+
+    def _actual(self):
+        return [self.session.query(models_db.NotificationDB).filter_by(user_id=user_id, is_read=False).count()
+                for user_id in self.user_ids]
+
+    def test_counter_follows_writes(self):
+        """测试计数 - 公告、提醒批量写入加一，标记已读减一，重复标记不重复减"""
+        self.agent.send_announcement(self.session, [], "系统维护", "今晚22点维护")
+        self.dbm.create_lost_item(self.session, LostItem(
+            item_id=None, user_id=self.user_ids[0], item_name="钱包", category="钱包",
+            lost_location="图书馆", lost_time=datetime.utcnow() - timedelta(days=8), description=""))
+        self.agent.check_and_remind_unresolved(self.session)
+        self.assertEqual(self._counts(), [2, 1, 1])
+
+        notification = self.session.query(models_db.NotificationDB).filter_by(user_id=self.user_ids[0]).first()
+        self.assertTrue(self.agent.mark_as_read(self.session, notification.id, self.user_ids[0]))
+        self.assertTrue(self.dbm.mark_notification_as_read(self.session, notification.id, self.user_ids[0]))
+        self.assertFalse(self.agent.mark_as_read(self.session, notification.id, self.user_ids[1]))
+        self.session.delete(self.session.query(models_db.NotificationDB).filter_by(user_id=self.user_ids[1]).one())
+        self.session.commit()
+        self.assertEqual(self._counts(), [1, 0, 1])
+        self.assertEqual(self._counts(), self._actual())
+
+    def test_count_reads_one_user_row(self):
+        """测试读取 - 只读用户的一行，不查询通知表"""
+        self.agent.send_announcement(self.session, [], "系统维护", "今晚22点维护")
+        statements = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        self.assertEqual(self.dbm.get_unread_notification_count(self.session, self.user_ids[0]), 1)
+        self.assertEqual(len(statements), 1)
+        self.assertNotIn("notifications WHERE", statements[0].replace("\n", " "))
+
+    def test_recount_and_late_users(self):
+        """测试重新计算 - 计数被改坏后可按通知表修复；通知早于用户写入时新用户从已有未读开始"""
+        self.agent.send_announcement(self.session, [self.user_ids[0], 99], "测试", "通知早于用户")
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql("UPDATE users SET unread_notifications = 7")
+            recount_unread(conn)
+        self.assertEqual(self._counts(), [1, 0, 0])
+        user = models_db.UserDB(id=99, student_id="20240099", name="新用户", password_hash="x")
+        self.session.add(user)
+        self.session.commit()
+        self.assertEqual(self.dbm.get_unread_notification_count(self.session, 99), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()